@@ -9,92 +9,667 @@ AIプロセッサー
 
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List
-from utils.helpers import select_gemini_api_key
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+from utils.helpers import select_gemini_api_key, clean_html
 
-from .gemini_api import GeminiAPI
+from .gemini_api import GeminiAPI, resolve_api_keys
+from .backends import create_backend
+from .key_pool import GeminiKeyPool
+from .governor import AIGovernor, use_lane
+from .hedging import HedgePolicy
+from .usage import UsageRecorder, usage_context
 from .summarizer import Summarizer
 from .classifier import Classifier
+from .prompts import PromptRegistry
+from .result_cache import AIResultCache
+from .simple_summarizer import simple_summarize
+from .pipeline import StageGraph
+from .text_utils import is_japanese, PromptBudget, truncate_head_tail
+from .embeddings import create_embedder
+from .qa_cache import QACache
+from .context_cache import ContextCache, QAContext
+from .model_router import ModelRouter, route_text
+from .local_classifier import LocalClassifier, classification_text, evaluate_thresholds
+from .keyword_extractor import KeywordExtractor
+from .textrank import textrank_summarize
 
 logger = logging.getLogger(__name__)
 
+# AI処理結果キャッシュの種類とモデルルーティングのタスクの対応
+CACHE_KIND_TASKS = {"summary": "summary", "title": "title", "category": "classify", "keywords": "keywords"}
+
 class AIProcessor:
     """AI処理クラス"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], backend: Any = None):
         """
         初期化
         
         Args:
             config: 設定辞書
+            backend: Gemini APIのバックエンド（指定がない場合は設定のai_backendから生成）
         """
         self.config = config
+        self.backend = backend or create_backend(config)
         
         # AIモデルの設定（Google Geminiのみを利用）
         self.ai_provider = "gemini"
         self.ai_model = config.get("ai_model", "gemini-2.0-flash")
 
+        # 全APIインスタンスで共有するキープール（キーごとのRPM/TPM予算を一元管理）
+        self.key_pool = GeminiKeyPool(
+            resolve_api_keys(config.get("gemini_api_key", ""), config.get("gemini_api_keys")),
+            rpm_per_key=config.get("gemini_rpm_per_key", 15),
+            tpm_per_key=config.get("gemini_tpm_per_key", 1_000_000),
+            max_in_flight_per_key=config.get("gemini_max_in_flight_per_key", 4),
+        )
+
+        # 全APIインスタンスで共有する同時実行数の制御（記事処理・質問応答・手動確認のレーンごとに重み付け）
+        self.governor = AIGovernor(
+            max_concurrency=config.get("ai_max_concurrency", 6),
+            weights=config.get("ai_lane_weights"),
+        )
+
+        # 応答が遅いリクエストを別のキーで重複して送るヘッジリクエストの制御（全APIインスタンスで共有）
+        self.hedge_policy = HedgePolicy(
+            enabled=config.get("gemini_hedging", True),
+            quantile=config.get("gemini_hedge_quantile", 0.95),
+            budget=config.get("gemini_hedge_budget", 0.1),
+            min_samples=config.get("gemini_hedge_min_samples", 20),
+        )
+
+        # API呼び出しごとの使用量（フィードURL・タスク・モデル別）の記録（記事ストアにまとめて書き込む）
+        self.usage_recorder = UsageRecorder()
+
         self.api = self._create_api(self.ai_model)
 
+        # タスクと記事の長さによるモデルの選択（モデルごとのクライアントは初回の使用時に生成する）
+        self.qa_model = config.get("qa_model", "gemini-2.5-flash")
+        self.router = ModelRouter(
+            self.ai_model,
+            self._create_api,
+            routes=config.get("model_routes"),
+            short_tokens=config.get("model_route_short_tokens", 500),
+            long_tokens=config.get("model_route_long_tokens", 3000),
+            task_defaults={"qa": self.qa_model},
+            apis={self.ai_model: self.api},
+            deadlines=config.get("ai_task_deadlines"),
+        )
+        self._qa_semaphore = asyncio.Semaphore(max(1, config.get("qa_concurrency", 2)))
+
+        # 記事処理ステージの同時実行数（全記事で共有）
+        self._stage_semaphore = asyncio.Semaphore(max(1, config.get("ai_stage_concurrency", 6)))
+
+        # タスクごとのプロンプトのトークン予算（全プロンプトで共有）
+        self.prompt_budget = PromptBudget(
+            config.get("prompt_token_budgets"),
+            config.get("prompt_truncation", "salient"),
+        )
+
+        # バージョン付きのプロンプト（設定でプロンプトごとのバージョンを切り替えられる）
+        self.prompts = PromptRegistry(versions=config.get("prompt_versions"))
+
         # 各処理クラスの初期化
-        self.summarizer = Summarizer(self.api)
-        self.classifier = Classifier(self.api)
+        self.summarizer = Summarizer(
+            self.api,
+            fallback_summarize=self._fallback_summary,
+            budget=self.prompt_budget,
+            router=self.router,
+            prompts=self.prompts,
+        )
+        self.classifier = Classifier(self.api, budget=self.prompt_budget, router=self.router, prompts=self.prompts)
+
+        # AI処理結果キャッシュ
+        self.result_cache: Optional[AIResultCache] = None
+        if config.get("ai_cache_enabled", True):
+            self.result_cache = AIResultCache(
+                config.get("ai_cache_path"),
+                max_entries=config.get("ai_cache_max_entries", 5000),
+                max_age_days=config.get("ai_cache_max_age_days", 30),
+            )
+
+        # ローカルジャンル分類器（信頼度が閾値未満の場合のみAPIで分類する）
+        self.local_classifier: Optional[LocalClassifier] = None
+        if config.get("local_classifier_enabled", True):
+            self.local_classifier = LocalClassifier(config.get("local_classifier_path"))
+
+        # 検索用キーワードの抽出方法（local: TF-IDF, gemini: API）
+        self.keyword_extractor: Optional[KeywordExtractor] = None
+        if config.get("keyword_extractor", "local") == "local":
+            self.keyword_extractor = KeywordExtractor(config.get("keyword_max_count", 7))
+
+        # 関連記事検索用の埋め込み（hashing: ローカル, gemini: API）
+        self.embedder = create_embedder(config, self.api)
+        self._embeddings_backfilled = False
+
+        # 質問応答の回答キャッシュ（同じ記事への同じ質問は1回の回答生成にまとめる）
+        self.qa_cache = QACache(
+            ttl=config.get("qa_cache_ttl", 300),
+            max_entries=config.get("qa_cache_max_entries", 256),
+        )
+
+        # 記事ごとの質問応答コンテキスト（続けての質問では質問文だけを送る）
+        self.context_cache = ContextCache(
+            ttl=config.get("qa_context_cache_ttl", 3600),
+            min_tokens=config.get("qa_context_cache_min_tokens", 1024),
+            explicit=config.get("qa_context_cache", True),
+        )
+
+        # ローカル処理により省略したAPI呼び出しの回数
+        self.stats: Dict[str, int] = {
+            "title_translation_skipped": 0,
+            "local_summaries": 0,
+            "local_classifications": 0,
+            "local_keywords": 0,
+            "extractive_summaries": 0,
+        }
 
         logger.info("AIプロセッサーを初期化しました")
 
     def _create_api(self, model: Optional[str] = None):
         """Google Gemini APIインスタンスを生成する"""
-        api_key = self.config.get("gemini_api_key", "")
-        keys = self.config.get("gemini_api_keys")
         selected_model = model or "gemini-2.0-flash"
         logger.info(f"Google Gemini APIを使用します: {selected_model}")
-        return GeminiAPI(api_key, model=selected_model, api_keys=keys)
+        return GeminiAPI(
+            model=selected_model,
+            key_pool=self.key_pool,
+            governor=self.governor,
+            hedge_policy=self.hedge_policy,
+            timeout=self.config.get("ai_request_timeout", 120),
+            backend=self.backend,
+            usage_recorder=self.usage_recorder,
+        )
+
+    def _get_qa_api(self):
+        """質問応答用のAPIインスタンスを取得する（qaのルート、既定はqa_model）"""
+        return self.router.api_for("qa")
+
+    @property
+    def calls_avoided(self) -> int:
+        """ローカル処理により省略したAPI呼び出しの合計回数"""
+        return sum(self.stats.values())
+
+    def _needs_translation(self, title: str) -> bool:
+        """
+        タイトルの翻訳が必要かどうかを判定する
+
+        既に日本語のタイトルは翻訳せず、省略した回数を記録する。
+        """
+        if not title:
+            return False
+        if self.config.get("skip_japanese_translation", True) and is_japanese(title):
+            self.stats["title_translation_skipped"] += 1
+            return False
+        return True
+
+    def _local_summary(self, content: str, max_length: int) -> Optional[str]:
+        """
+        短い日本語の本文をAPIを使わずに要約する
+
+        Args:
+            content: 記事本文
+            max_length: 要約の最大文字数
+
+        Returns:
+            要約（ローカルで処理しない場合はNone）
+        """
+        limit = self.config.get("local_summary_max_chars", 400)
+        if limit <= 0:
+            return None
+        text = clean_html(content)
+        if len(text) > limit or not is_japanese(text):
+            return None
+        self.stats["local_summaries"] += 1
+        return simple_summarize(text, max_length)
+
+    def _fallback_summary(self, text: str, max_length: int) -> str:
+        """
+        APIを使わずに要約する（APIエラー時のフォールバック）
+
+        fallback_summarizerの設定に応じて、TextRankによる抽出型要約か
+        先頭の文を詰める簡易要約を使う。
+        """
+        if self.config.get("fallback_summarizer", "textrank") == "textrank":
+            return textrank_summarize(clean_html(text), max_length)
+        return simple_summarize(text, max_length)
+
+    def _extractive_summary(self, content: str, feed_info: Dict[str, Any], max_length: int) -> Optional[str]:
+        """
+        抽出型要約モードのフィードの記事をTextRankで要約する
+
+        Returns:
+            要約（抽出型要約モードでない場合はNone）
+        """
+        if feed_info.get("summary_mode") != "extractive":
+            return None
+        self.stats["extractive_summaries"] += 1
+        return textrank_summarize(clean_html(content), max_length)
+
+    def _cache_model(self, kind: str, content: str) -> str:
+        """
+        キャッシュキーに使うモデル名（その結果を生成するルートのモデル）
+
+        contentは呼び出しのルーティングに使うテキストと同じもの（分類とキーワードはroute_text）を渡す。
+        """
+        return self.router.model_for(CACHE_KIND_TASKS.get(kind, kind), content)
+
+    async def _cache_get(self, kind: str, content: str, variant: str, version: str) -> Optional[str]:
+        """AI処理結果キャッシュから値を取得する"""
+        if not self.result_cache or not content:
+            return None
+        return await self.result_cache.get(kind, content, variant, self._cache_model(kind, content), version)
+
+    async def _cache_set(self, kind: str, content: str, variant: str, version: str, value: str) -> None:
+        """AI処理結果をキャッシュに保存する（空の結果は保存しない）"""
+        if not self.result_cache or not content or not value:
+            return
+        await self.result_cache.set(kind, content, variant, self._cache_model(kind, content), version, value)
+
+    async def _cached(self, kind: str, content: str, variant: str, version: str, compute) -> str:
+        """
+        キャッシュを参照し、なければcomputeを実行して結果を保存する
+
+        Args:
+            kind: 結果の種類
+            content: 処理対象のコンテンツ
+            variant: 処理バリエーション
+            version: プロンプトのバージョン
+            compute: 結果を生成するコルーチン関数（失敗時は例外を送出すること）
+
+        Returns:
+            処理結果
+        """
+        cached = await self._cache_get(kind, content, variant, version)
+        if cached is not None:
+            return cached
+        value = await compute()
+        await self._cache_set(kind, content, variant, version, value)
+        return value
+
+    def _summary_version(self) -> str:
+        """要約とタイトル翻訳の結果キャッシュのバージョン（単独・バッチのテンプレートとシステムインストラクション）"""
+        return self.prompts.version("summary", "summary_batch", "summary_system")
+
+    async def _cached_summary(self, text: str, summary_type: str, max_length: int) -> str:
+        """キャッシュを参照して要約（タイトルの場合は翻訳）を取得する"""
+        kind = "title" if summary_type == "title" else "summary"
+        try:
+            return await self._cached(
+                kind,
+                text,
+                f"{summary_type}:{max_length}",
+                self._summary_version(),
+                lambda: self.summarizer.summarize(text, max_length, summary_type, fallback=False),
+            )
+        except Exception:
+            logger.info("外部APIが利用できないため、簡易要約にフォールバックします")
+            return self._fallback_summary(text, max_length)
+
+    async def load_keyword_corpus(self, article_store) -> None:
+        """
+        記事ストアの記事からキーワード抽出の文書頻度を学習する（初回のみ）
+
+        Args:
+            article_store: 記事ストア
+        """
+        extractor = self.keyword_extractor
+        if not extractor or extractor.corpus_loaded:
+            return
+        extractor.corpus_loaded = True
+        texts = await article_store.get_article_texts(self.config.get("keyword_corpus_size", 2000))
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, lambda: extractor.add_documents(clean_html(text) for text in texts))
+        logger.info(f"キーワード抽出のコーパスを読み込みました: {len(texts)}件")
+
+    def _embedding_text(self, article: Dict[str, Any]) -> str:
+        """埋め込みに使うテキスト（タイトルと本文、トークン上限内）"""
+        text = f"{article.get('title') or ''}\n{clean_html(article.get('content') or '')}"
+        return truncate_head_tail(text, self.config.get("embedding_max_tokens", 2000))
+
+    async def embed_articles(self, articles: List[Dict[str, Any]]) -> List[Any]:
+        """
+        複数記事の埋め込みベクトルをまとめて計算する
+
+        Args:
+            articles: 記事データのリスト
+
+        Returns:
+            記事ごとのベクトル（失敗した場合はNoneのリスト）
+        """
+        if not articles:
+            return []
+        try:
+            return list(await self.embedder.embed([self._embedding_text(a) for a in articles]))
+        except Exception as e:
+            logger.error(f"埋め込みベクトルの計算中にエラーが発生しました: {e}", exc_info=True)
+            return [None] * len(articles)
+
+    async def index_missing_articles(self, article_store) -> None:
+        """
+        ベクトル索引に未登録の保存済み記事を登録する（初回のみ）
+
+        Args:
+            article_store: 記事ストア
+        """
+        if self._embeddings_backfilled or not getattr(article_store, "vector_index", None):
+            return
+        self._embeddings_backfilled = True
+        rows = await article_store.get_unindexed_articles(self.config.get("keyword_corpus_size", 2000))
+        # 古い記事から登録し、索引内の順序を保存日時の順にそろえる
+        rows.reverse()
+        for start in range(0, len(rows), 64):
+            chunk = rows[start:start + 64]
+            vectors = await self.embed_articles(chunk)
+            await article_store.add_embeddings([
+                (row["channel_id"], row["message_id"], vector)
+                for row, vector in zip(chunk, vectors) if vector is not None
+            ])
+        if rows:
+            logger.info(f"保存済み記事をベクトル索引に登録しました: {len(rows)}件")
+
+    async def find_related_articles(
+        self, article_store, original_article: Dict[str, Any], question: str, limit: int = 15
+    ) -> List[Dict[str, Any]]:
+        """
+        質問に関連する記事を検索する
+
+        ベクトル索引がある場合は元記事と同じチャンネルの記事を元記事のタイトルと質問の埋め込みで検索し
+        （類似度がrelated_min_similarity未満の記事は関連記事としない）、
+        見つからない場合は検索キーワードによる検索にフォールバックする。
+
+        Args:
+            article_store: 記事ストア
+            original_article: 質問対象の記事
+            question: 質問
+            limit: 取得する最大件数
+
+        Returns:
+            関連記事のリスト
+        """
+        message_id = str(original_article.get("message_id", ""))
+        if getattr(article_store, "vector_index", None):
+            query = f"{original_article.get('title') or ''}\n{question}"
+            try:
+                vector = (await self.embedder.embed([query]))[0]
+                related = await article_store.find_related_articles(
+                    [], message_id, limit, embedding=vector,
+                    channel_id=original_article.get("channel_id"),
+                    min_score=self.config.get("related_min_similarity", 0.3),
+                )
+                if related:
+                    return related
+            except Exception as e:
+                logger.warning(f"ベクトル検索に失敗しました。キーワード検索を使います: {e}")
+        keywords = await self._generate_search_keywords(original_article, question)
+        return await article_store.find_related_articles(keywords, message_id, limit)
+
+    def extract_keywords_local(self, articles: List[Dict[str, Any]]) -> List[str]:
+        """
+        ローカルのTF-IDFで複数記事の検索用キーワードをまとめて抽出する
+
+        Args:
+            articles: 記事データのリスト
+
+        Returns:
+            記事ごとのカンマ区切りのキーワード
+        """
+        texts = [f"{a.get('title', '')}\n{clean_html(a.get('content', ''))}" for a in articles]
+        self.stats["local_keywords"] += len(texts)
+        return [", ".join(keywords) for keywords in self.keyword_extractor.extract_batch(texts)]
 
     async def extract_keywords_for_storage(self, article: Dict[str, Any]) -> str:
         """記事から検索用キーワードを抽出する"""
+        if self.keyword_extractor:
+            return self.extract_keywords_local([article])[0]
+
         title = article.get("title", "")
         content = article.get("content", "")
-        prompt = (
-            "You are a data indexer. Analyze the following article and extract the 5-7 most important and representative keywords in English. "
-            "The keywords should be suitable for later searching. Output them as a single, comma-separated string.\n\n"
-            f"Title: {title}\n\nContent:\n{content}"
-        )
-        try:
-            text = await self.api.generate_text(prompt, max_tokens=50, temperature=0.3)
+        template = self.prompts.get("keywords")
+        prompt = template.render(title=title, content=self.prompt_budget.fit("keywords", content))
+
+        routed = route_text(title, content)
+
+        async def generate() -> str:
+            self.prompt_budget.record("keywords", prompt)
+            api = self.router.api_for("keywords", routed)
+            with usage_context(prompt=template.key):
+                text = await api.generate_text(prompt, max_tokens=50, temperature=0.3)
             return text.strip()
+
+        try:
+            return await self._cached("keywords", routed, "", template.version, generate)
         except Exception as e:
             logger.error(f"キーワード抽出中にエラーが発生しました: {e}", exc_info=True)
             return ""
     
-    async def process_article(self, article: Dict[str, Any], feed_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def build_digest(self, articles: List[Dict[str, Any]], feed_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        フィードの複数の記事を1回のAPI呼び出しでダイジェストにまとめる
+
+        Args:
+            articles: 記事データのリスト
+            feed_info: フィード情報
+
+        Returns:
+            {"feed_title", "overview", "items"}（itemsは記事ごとの{"title", "summary", "link", "published"}）
+        """
+        contents = [
+            {"title": article.get("title", ""), "content": clean_html(article.get("content", "") or "")}
+            for article in articles
+        ]
+        with usage_context(feed_url=feed_info.get("url")):
+            digest = await self.summarizer.summarize_digest(
+                contents, item_length=self.config.get("digest_item_max_length", 200)
+            )
+        for item, article in zip(digest["items"], articles):
+            item["link"] = article.get("link", "")
+            item["published"] = article.get("published", "")
+        digest["feed_title"] = feed_info.get("title") or (articles[0].get("feed_title", "") if articles else "")
+        return digest
+
+    async def process_articles(
+        self, items: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        複数の記事をまとめて処理する
+
+        要約とタイトル翻訳は複数記事を1回のリクエストにまとめて実行し、
+        それ以外の処理は記事ごとに行う。
+
+        Args:
+            items: (記事データ, フィード情報)のリスト
+
+        Returns:
+            処理済み記事データのリスト（itemsと同じ順序）
+        """
+        batch_results: Dict[int, Dict[str, Any]] = {}
+        if (
+            len(items) > 1
+            and self.config.get("summarize", True)
+            and self.config.get("batch_summarize", True)
+        ):
+            try:
+                # まとめた呼び出しの使用量は含まれる記事のフィードごとの記事数で按分する
+                with usage_context(feed_url=[feed_info.get("url") or "" for _, feed_info in items]):
+                    batch_results = await self._summarize_batch(items)
+            except Exception as e:
+                logger.warning(f"バッチ要約に失敗しました。記事ごとに要約します: {e}")
+
+        # ローカル抽出の場合は検索用キーワードも一括で抽出する
+        if self.keyword_extractor and len(items) > 1:
+            keywords = self.extract_keywords_local([article for article, _ in items])
+            for i, text in enumerate(keywords):
+                batch_results.setdefault(i, {})["keywords"] = text
+
+        # 埋め込みベクトルも1回でまとめて計算する
+        if len(items) > 1:
+            vectors = await self.embed_articles([article for article, _ in items])
+            for i, vector in enumerate(vectors):
+                batch_results.setdefault(i, {})["embedding"] = vector
+
+        # 記事ごとの処理は並行して実行し、キープールで複数キーに分散させる
+        return list(await asyncio.gather(*(
+            self.process_article(article, feed_info, batch_results.get(i))
+            for i, (article, feed_info) in enumerate(items)
+        )))
+
+    async def _summarize_batch(
+        self, items: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Dict[int, Dict[str, str]]:
+        """
+        複数記事の要約とタイトル翻訳をまとめて実行する
+
+        Args:
+            items: (記事データ, フィード情報)のリスト
+
+        Returns:
+            itemsのインデックスをキー、{"summary", "title"}を値とする辞書
+        """
+        max_length = self.config.get("summary_length", 4000)
+        token_budget = self.config.get("batch_token_budget", 6000)
+
+        summaries: Dict[str, str] = {}
+        translated: Dict[str, str] = {}
+
+        # キャッシュにない本文を要約タイプごとにまとめる
+        bodies_by_type: Dict[str, Dict[str, str]] = {}
+        titles: Dict[str, str] = {}
+        for i, (article, feed_info) in enumerate(items):
+            summary_type = feed_info.get("summary_type") or "normal"
+            content = article.get("content", "")
+            if content:
+                local = self._extractive_summary(content, feed_info, max_length)
+                if local is None:
+                    local = self._local_summary(content, max_length)
+                if local is None:
+                    local = await self._cache_get(
+                        "summary", content, f"{summary_type}:{max_length}", self._summary_version()
+                    )
+                if local is not None:
+                    summaries[str(i)] = local
+                else:
+                    bodies_by_type.setdefault(summary_type, {})[str(i)] = content
+
+            title = article.get("title", "")
+            if not self._needs_translation(title):
+                continue
+            cached = await self._cache_get("title", title, f"title:{max_length}", self._summary_version())
+            if cached is not None:
+                translated[str(i)] = cached
+            else:
+                titles[str(i)] = title
+
+        for summary_type, bodies in bodies_by_type.items():
+            results = await self.summarizer.summarize_batch(
+                bodies, max_length, summary_type, token_budget, fallback=False
+            )
+            for key, text in bodies.items():
+                if results.get(key):
+                    summaries[key] = results[key]
+                    await self._cache_set(
+                        "summary", text, f"{summary_type}:{max_length}", self._summary_version(), results[key]
+                    )
+                else:
+                    summaries[key] = self._fallback_summary(text, max_length)
+
+        if titles:
+            results = await self.summarizer.summarize_batch(
+                titles, max_length, "title", token_budget, fallback=False
+            )
+            for key, title in titles.items():
+                if results.get(key):
+                    translated[key] = results[key]
+                    await self._cache_set(
+                        "title", title, f"title:{max_length}", self._summary_version(), results[key]
+                    )
+
+        return {
+            i: {"summary": summaries.get(str(i), ""), "title": translated.get(str(i), "")}
+            for i in range(len(items))
+        }
+
+    async def process_article(
+        self,
+        article: Dict[str, Any],
+        feed_info: Dict[str, Any],
+        batch_result: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         記事を処理する
         
         Args:
             article: 記事データ
             feed_info: フィード情報
+            batch_result: バッチ処理済みの結果（{"summary", "title", "keywords", "embedding"}のうち処理済みのもの）
             
         Returns:
             処理済み記事データ
         """
+        with usage_context(feed_url=feed_info.get("url")):
+            return await self._process_article(article, feed_info, batch_result)
+
+    async def _process_article(
+        self,
+        article: Dict[str, Any],
+        feed_info: Dict[str, Any],
+        batch_result: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """記事を処理する（API呼び出しは記事のフィードの使用量として記録する）"""
         processed = article.copy()
 
         try:
+            # 互いに独立した処理を依存グラフとして並行実行する
+            graph = StageGraph(self._stage_semaphore)
+            summarize = self.config.get("summarize", True)
+            batch_result = batch_result or {}
+            if summarize and "summary" not in batch_result:
+                graph.add("summary", lambda _: self._summarize_body(article, feed_info))
+                graph.add("title", lambda _: self._translate_title(article))
+            if self.config.get("classify", False):
+                graph.add("classify", lambda _: self._classify_article(
+                    {"title": article.get("title", ""), "content": article.get("content", "")}
+                ))
+            if "keywords" not in batch_result:
+                graph.add("keywords", lambda _: self.extract_keywords_for_storage(article))
+            if "embedding" not in batch_result:
+                graph.add("embedding", lambda _: self.embed_articles([article]))
+
+            results = await graph.run()
+
             # 要約（翻訳を兼ねる）
-            if self.config.get("summarize", True):
-                try:
-                    processed = await self._summarize_article(processed, feed_info)
-                except Exception as e:
-                    logger.warning(f"要約に失敗しました: {e}")
+            if summarize:
+                if "summary" in batch_result:
+                    processed = self._apply_summary(
+                        processed, batch_result.get("summary", ""), batch_result.get("title", "")
+                    )
+                elif "summary" in results:
+                    processed = self._apply_summary(processed, results["summary"], results.get("title", ""))
+                else:
+                    logger.warning(f"要約に失敗しました: {graph.errors.get('summary')}")
                     processed["summarized"] = False
 
             # ジャンル分類
-            if self.config.get("classify", False):
-                processed = await self._classify_article(processed)
+            if "classify" in results:
+                processed["category"] = results["classify"].get("category", "other")
+                processed["classified"] = results["classify"].get("classified", False)
+                processed["category_source"] = results["classify"].get("category_source")
+
+            # 検索用キーワード
+            processed["keywords_en"] = batch_result.get("keywords", results.get("keywords", ""))
 
-            # 検索用キーワード抽出
-            keywords_en = await self.extract_keywords_for_storage(processed)
-            processed["keywords_en"] = keywords_en
+            # 関連記事検索用の埋め込みベクトル
+            if "embedding" in batch_result:
+                processed["embedding"] = batch_result["embedding"]
+            elif results.get("embedding"):
+                processed["embedding"] = results["embedding"][0]
+
+            # ステージごとの処理時間とクリティカルパス
+            processed["ai_timings"] = graph.timings
+            path, elapsed = graph.critical_path()
+            logger.info(
+                f"記事処理時間: {elapsed:.2f}秒 (クリティカルパス: {' -> '.join(path) or 'なし'}) "
+                + ", ".join(f"{name}={t:.2f}s" for name, t in graph.timings.items())
+            )
 
             # 処理フラグを追加
             processed["ai_processed"] = True
@@ -109,38 +684,59 @@ class AIProcessor:
             processed["ai_error"] = str(e)
             return processed
     
-    async def _summarize_article(
-        self,
-        article: Dict[str, Any],
-        feed_info: Dict[str, Any],
-    ) -> Dict[str, Any]:
+    async def _summarize_body(self, article: Dict[str, Any], feed_info: Dict[str, Any]) -> str:
         """
-        記事を要約する
+        記事本文を要約する
         
         Args:
             article: 記事データ
+            feed_info: フィード情報
             
         Returns:
-            要約済み記事データ
+            要約
         """
-        # 要約対象のコンテンツ
         content = article.get("content", "")
-
-        # 要約の最大文字数
+        if not content:
+            return ""
         max_length = self.config.get("summary_length", 4000)
-        summary_type = feed_info.get("summary_type")
+        local = self._extractive_summary(content, feed_info, max_length)
+        if local is None:
+            local = self._local_summary(content, max_length)
+        if local is not None:
+            return local
+        summary_type = feed_info.get("summary_type") or "normal"
+        return await self._cached_summary(content, summary_type, max_length)
 
-        summarizer = self.summarizer
+    async def _translate_title(self, article: Dict[str, Any]) -> str:
+        """
+        記事タイトルを翻訳する
 
-        # 要約の生成
-        summary = await summarizer.summarize(content, max_length, summary_type or "normal")
+        Args:
+            article: 記事データ
 
-        # タイトルの翻訳
+        Returns:
+            翻訳済みタイトル（タイトルがない場合や既に日本語の場合は空文字列）
+        """
         title = article.get("title", "")
-        if title:
-            translated = await summarizer.summarize(title, max_length, "title")
-            if translated:
-                article["title"] = translated
+        if not self._needs_translation(title):
+            return ""
+        max_length = self.config.get("summary_length", 4000)
+        return await self._cached_summary(title, "title", max_length)
+
+    def _apply_summary(self, article: Dict[str, Any], summary: str, translated_title: str) -> Dict[str, Any]:
+        """
+        要約結果と翻訳タイトルを記事に反映する
+
+        Args:
+            article: 記事データ
+            summary: 要約
+            translated_title: 翻訳済みタイトル
+
+        Returns:
+            要約済み記事データ
+        """
+        if translated_title:
+            article["title"] = translated_title
 
         # 要約結果を記事に追加
         article["summary"] = summary
@@ -169,11 +765,22 @@ class AIProcessor:
             categories = self.config.get("categories", [])
             category_names = [cat.get("name") for cat in categories]
             
-            # ジャンル分類
-            category = await self.classifier.classify(title, content, category_names)
+            # ジャンル分類（ローカル分類器の信頼度が低い場合のみAPIを使用）
+            category = self._classify_locally(title, content, category_names)
+            source = "local"
+            if category is None:
+                category = await self._cached(
+                    "category",
+                    route_text(title, content),
+                    ",".join(category_names),
+                    self.prompts.version("classify"),
+                    lambda: self.classifier.classify(title, content, category_names, fallback=False),
+                )
+                source = "llm"
             
             # 分類結果を記事に追加
             article["category"] = category
+            article["category_source"] = source
             article["classified"] = True
             
             logger.info(f"記事を分類しました: {article.get('title')} -> {category}")
@@ -185,24 +792,127 @@ class AIProcessor:
             article["category"] = "other"  # デフォルトカテゴリ
             return article
 
+    def _classify_locally(self, title: str, content: str, category_names: List[str]) -> Optional[str]:
+        """
+        ローカル分類器でジャンルを分類する
+
+        Args:
+            title: 記事タイトル
+            content: 記事内容
+            category_names: 分類カテゴリ名のリスト
+
+        Returns:
+            カテゴリ（未学習、または信頼度が閾値未満の場合はNone）
+        """
+        if not self.local_classifier or not self.local_classifier.is_trained:
+            return None
+        category, confidence = self.local_classifier.predict(classification_text(title, content))
+        if category not in category_names or confidence < self.config.get("local_classifier_threshold", 0.9):
+            return None
+        self.stats["local_classifications"] += 1
+        logger.debug(f"ローカル分類器で分類しました: {title} -> {category} ({confidence:.2f})")
+        return category
+
+    async def retrain_classifier(self, article_store) -> Dict[str, Any]:
+        """
+        記事ストアのAPI分類結果からローカル分類器を再学習する
+
+        Args:
+            article_store: 記事ストア
+
+        Returns:
+            学習件数と閾値ごとの正解率・API呼び出し削減率のレポート
+            （記事が足りない場合はerrorを含む）
+        """
+        if not self.local_classifier:
+            return {"error": "ローカル分類器が無効になっています"}
+        rows = await article_store.get_labeled_articles("llm", self.config.get("local_classifier_max_samples", 5000))
+        samples = [(classification_text(row["title"], row["content"]), row["category"]) for row in rows]
+        min_samples = self.config.get("local_classifier_min_samples", 50)
+        if len(samples) < min_samples or len({label for _, label in samples}) < 2:
+            return {"error": f"学習データが不足しています（{len(samples)}件、最低{min_samples}件）"}
+
+        def train() -> Tuple[Dict[str, Any], LocalClassifier]:
+            # 学習中も既存のモデルで分類できるよう、新しいインスタンスに学習してから差し替える
+            report = evaluate_thresholds(samples)
+            model = LocalClassifier(self.local_classifier.model_path, autoload=False).fit(samples)
+            model.save()
+            return report, model
+
+        loop = asyncio.get_event_loop()
+        report, self.local_classifier = await loop.run_in_executor(None, train)
+        report["samples"] = len(samples)
+        report["current_threshold"] = self.config.get("local_classifier_threshold", 0.9)
+        logger.info(f"ローカル分類器を再学習しました: {len(samples)}件, 正解率 {report['accuracy']:.1%}")
+        return report
+
     async def _generate_search_keywords(
         self, original_article: Dict[str, Any], question: str
     ) -> List[str]:
         """質問と記事から検索用キーワードを生成する"""
+        if self.keyword_extractor:
+            # 記事側と同じ方法で質問から語を抽出し、元記事のキーワードで補う
+            keywords = self.keyword_extractor.extract(question, update=False)[:3]
+            stored = [k.strip() for k in (original_article.get("keywords_en") or "").split(",") if k.strip()]
+            keywords += [k for k in stored if k not in keywords]
+            return keywords[:5]
+
         title = original_article.get("title", "")
         content = original_article.get("content", "")
-        prompt = (
-            "You are a search query expert. Extract up to 5 important English keywords from the user's question and the original article to find related information."\
-            f"\n\nTitle: {title}\n\nContent:\n{content}\n\nQuestion: {question}\n\nKeywords:"
+        template = self.prompts.get("search_keywords")
+        prompt = template.render(
+            title=title, content=self.prompt_budget.fit("search_keywords", content), question=question
         )
         try:
-            text = await self.api.generate_text(prompt, max_tokens=30, temperature=0.3)
+            self.prompt_budget.record("search_keywords", prompt)
+            with usage_context(prompt=template.key):
+                text = await self.router.api_for("search_keywords").generate_text(prompt, max_tokens=30, temperature=0.3)
             keywords = [k.strip() for k in text.replace("\n", "").split(",") if k.strip()]
             return keywords[:5]
         except Exception as e:
             logger.error(f"検索用キーワード生成中にエラーが発生しました: {e}", exc_info=True)
             return []
 
+    async def answer_reply(
+        self,
+        article_store,
+        original_article: Dict[str, Any],
+        question: str,
+        on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> str:
+        """
+        記事への返信の質問に回答する
+
+        関連記事の検索から回答生成までを行い、同じ記事への同じ質問は
+        キャッシュした回答を返すか、処理中の回答生成の結果を共有する。
+        元記事と関連記事からなるプロンプトの共通部分は記事ごとに再利用し、
+        続けての質問では関連記事の検索を省略する。
+        on_textは実際に回答を生成する場合のみ呼ばれ、キャッシュや処理中の
+        回答を共有した場合は最終的な回答だけが返る。
+
+        Args:
+            article_store: 記事ストア
+            original_article: 質問対象の記事
+            question: 質問
+            on_text: 生成途中の回答を受け取るコルーチン関数（ストリーミング表示用）
+
+        Returns:
+            回答
+        """
+        message_id = str(original_article.get("message_id", ""))
+
+        async def build_context() -> str:
+            related_articles = await self.find_related_articles(article_store, original_article, question)
+            return self._qa_context(original_article, related_articles)
+
+        async def generate():
+            context = await self.context_cache.get_or_create(message_id, build_context, self._get_qa_api())
+            return await self._generate_answer(context, question, on_text)
+
+        # 質問応答のAPI呼び出しはinteractiveレーンで実行し、元記事のフィードの使用量として記録する
+        with use_lane("interactive"), usage_context(feed_url=original_article.get("feed_url")):
+            return await self.qa_cache.get_or_create(message_id, question, generate)
+
     async def answer_question(
         self,
         original_article: Dict[str, Any],
@@ -210,26 +920,107 @@ class AIProcessor:
         question: str,
     ) -> str:
         """元記事と関連記事を基に質問に回答する"""
+        answer, _ = await self._answer_question(original_article, related_articles, question)
+        return answer
+
+    async def answer_question_stream(
+        self,
+        original_article: Dict[str, Any],
+        related_articles: List[Dict[str, Any]],
+        question: str,
+        on_text: Callable[[str], Awaitable[None]],
+    ) -> str:
+        """元記事と関連記事を基に質問に回答し、生成途中の回答をon_textに渡す"""
+        answer, _ = await self._answer_question(original_article, related_articles, question, on_text)
+        return answer
+
+    async def _answer_question(
+        self,
+        original_article: Dict[str, Any],
+        related_articles: List[Dict[str, Any]],
+        question: str,
+        on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[str, bool]:
+        """質問に回答し、回答と成功したかどうかを返す"""
+        context = QAContext(self._qa_context(original_article, related_articles), 0.0)
+        return await self._generate_answer(context, question, on_text)
+
+    def _qa_context(self, original_article: Dict[str, Any], related_articles: List[Dict[str, Any]]) -> str:
+        """質問応答プロンプトの共通部分（指示、元記事、関連記事）を組み立てる"""
         main_title = original_article.get("title", "")
-        main_content = original_article.get("content", "")
-
-        related_parts = []
-        for i, art in enumerate(related_articles, 1):
-            title = art.get("title", "")
-            content = (art.get("content", "") or "")[:600]
-            related_parts.append(f"{i}. Title: {title}\n   Content: {content}...")
-        related_block = "\n".join(related_parts)
-
-        prompt = (
-            "You are an expert news commentator. Based on the following articles, please answer the user's question in Japanese.\n\n"
-            f"**Main Article:**\nTitle: {main_title}\nContent: {main_content}\n\n"
-            f"**Related Articles:**\n{related_block}\n\n"
-            f"**User's Question:**\n{question}\n\n**Answer (in Japanese):**"
+        main_content = self.prompt_budget.fit("qa_article", original_article.get("content", ""))
+
+        item_template = self.prompts.get("qa_related_item")
+        related_block = "\n".join(
+            item_template.render(
+                number=i,
+                title=art.get("title", ""),
+                content=self.prompt_budget.fit("qa_related", art.get("content", "") or ""),
+            )
+            for i, art in enumerate(related_articles, 1)
         )
+        return self.prompts.render("qa_context", title=main_title, content=main_content, related=related_block)
+
+    async def _generate_answer(
+        self,
+        context: QAContext,
+        question: str,
+        on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[str, bool]:
+        """
+        コンテキストと質問から回答を生成する
+
+        コンテキストがGeminiのキャッシュに登録されている場合は質問文だけを送り、
+        キャッシュが使えない場合はプロンプト全体を送る。
+
+        Returns:
+            (回答, 成功したかどうか)
+        """
+        question_template = self.prompts.get("qa_question")
+        question_part = question_template.render(question=question)
+        question_key = question_template.key
         try:
-            api = self._create_api("gemini-2.5-flash")
-            return await api.generate_text(prompt, max_tokens=1000, temperature=0.3)
+            async with self._qa_semaphore:
+                api = self._get_qa_api()
+                if context.cache_name and context.api is api:
+                    try:
+                        self.prompt_budget.record("qa", question_part)
+                        return await self._call_qa_api(
+                            api, question_part, question_key, on_text,
+                            cached_content=context.cache_name, key_index=context.key_index,
+                        ), True
+                    except Exception as e:
+                        logger.warning(f"コンテキストキャッシュを使った回答生成に失敗しました。プロンプト全体を送ります: {e}")
+                        self.context_cache.discard_remote(context)
+
+                prompt = context.prefix + question_part
+                self.prompt_budget.record("qa", prompt)
+                return await self._call_qa_api(
+                    api, prompt, f"{self.prompts.get('qa_context').key}+{question_key}", on_text
+                ), True
         except Exception as e:
             logger.error(f"回答生成中にエラーが発生しました: {e}", exc_info=True)
-            return "回答を生成できませんでした。"
+            return "回答を生成できませんでした。", False
+
+    async def _call_qa_api(
+        self,
+        api,
+        prompt: str,
+        prompt_key: str,
+        on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        質問応答のテキスト生成を呼び出す（on_textがある場合はストリーミング）
+
+        Args:
+            api: 使用するAPI
+            prompt: 送るプロンプト
+            prompt_key: 使用量の記録に付ける、送ったテンプレートのID@バージョン
+            on_text: 生成途中のテキストを受け取るコルーチン関数
+        """
+        with usage_context(prompt=prompt_key):
+            if on_text is not None and hasattr(api, "stream_text"):
+                return await api.stream_text(prompt, on_text, max_tokens=1000, temperature=0.3, **kwargs)
+            return await api.generate_text(prompt, max_tokens=1000, temperature=0.3, **kwargs)
 
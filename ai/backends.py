@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gemini APIのバックエンド
+
+GeminiAPIが実際にリクエストを送る先を切り替える。GoogleBackendはgoogle.generativeaiを使い、
+FakeGeminiBackendはAPIを呼ばずにプロセス内で応答を返す（負荷試験やオフラインでの動作確認用）
+"""
+
+import math
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from .gemini_client import get_client
+from .embeddings import HashingEmbedder
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+class GoogleBackend:
+    """google.generativeaiでGemini APIを呼び出すバックエンド"""
+
+    name = "google"
+
+    def create_model(
+        self, model_name: str, system_instruction: Optional[str] = None, cached_content: Optional[str] = None
+    ) -> genai.GenerativeModel:
+        """
+        モデルインスタンスを生成する
+
+        Args:
+            model_name: モデル名
+            system_instruction: システムインストラクション
+            cached_content: コンテキストキャッシュの名前
+
+        Returns:
+            generate_content_asyncを持つモデルインスタンス
+        """
+        if system_instruction:
+            model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        else:
+            model = genai.GenerativeModel(model_name)
+        if cached_content:
+            # コンテキストキャッシュを前提にリクエストを送る（キャッシュの取得処理は行わない）
+            model._cached_content = cached_content
+        return model
+
+    def bind(self, model: genai.GenerativeModel, api_key: str) -> None:
+        """モデルにAPIキー専用のクライアントを割り当てる"""
+        get_client(api_key).bind(model)
+
+    async def create_cached_content(self, api_key: str, request: glm.CreateCachedContentRequest) -> str:
+        """コンテキストキャッシュを作成し、その名前を返す"""
+        cached = await get_client(api_key).cache_client.create_cached_content(request)
+        return cached.name
+
+    async def delete_cached_content(self, api_key: str, name: str) -> None:
+        """コンテキストキャッシュを削除する"""
+        await get_client(api_key).cache_client.delete_cached_content(name=name)
+
+    async def batch_embed_contents(self, api_key: str, request: glm.BatchEmbedContentsRequest) -> List[List[float]]:
+        """テキストの埋め込みベクトルを取得する"""
+        response = await get_client(api_key).async_client.batch_embed_contents(request)
+        return [list(embedding.values) for embedding in response.embeddings]
+
+
+class FakeResponse:
+    """FakeGeminiBackendの応答（GenerateContentResponseのうちGeminiAPIが参照する属性のみ）"""
+
+    def __init__(self, text: str, total_tokens: int, input_tokens: int = 0):
+        self.text = text
+        self.candidates: List[Any] = []
+        self.prompt_feedback = None
+        self.usage_metadata = SimpleNamespace(
+            total_token_count=total_tokens,
+            prompt_token_count=input_tokens,
+            candidates_token_count=total_tokens - input_tokens,
+        )
+
+
+class FakeModel:
+    """FakeGeminiBackendのモデルインスタンス"""
+
+    def __init__(self, backend: "FakeGeminiBackend", model_name: str, system_instruction: Optional[str]):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_instruction = system_instruction or ""
+        self.api_key = ""
+
+    async def generate_content_async(self, contents: Any, generation_config: Any = None, stream: bool = False):
+        """テキストを生成する（streamがTrueの場合はチャンクを順に返す非同期イテレーター）"""
+        max_tokens = getattr(generation_config, "max_output_tokens", None) or 1000
+        prompt = f"{self.system_instruction}\n{contents}"
+        # 先頭のチャンクまでの待ち時間は通常の応答と同じにする
+        text, total_tokens = await self.backend.respond(self.api_key, self.model_name, prompt, max_tokens)
+        input_tokens = estimate_tokens(prompt)
+        if not stream:
+            return FakeResponse(text, total_tokens, input_tokens)
+        return self._stream(text, total_tokens, input_tokens)
+
+    async def _stream(self, text: str, total_tokens: int, input_tokens: int) -> AsyncIterator[FakeResponse]:
+        """応答を複数のチャンクに分けて返す（使用トークン数は最後のチャンクのみ）"""
+        size = max(1, len(text) // 4)
+        for start in range(0, len(text), size):
+            last = start + size >= len(text)
+            yield FakeResponse(text[start:start + size], total_tokens if last else 0, input_tokens if last else 0)
+            await asyncio.sleep(0)
+
+
+class FakeGeminiBackend:
+    """APIを呼ばずにプロセス内で応答を返すバックエンド
+
+    応答までの時間は対数正規分布（中央値とばらつきを指定）か任意の関数で決める。
+    一定の割合、またはキーごとのRPM上限を超えた場合にレート制限エラー（429）を返し、
+    キーごとのリクエスト数、レート制限の回数、入出力のトークン数を記録する。
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        latency_sigma: float = 0.5,
+        rate_limit_rate: float = 0.0,
+        rpm_limit: int = 0,
+        retry_after: float = 1.0,
+        output_tokens: int = 200,
+        latency: Optional[Callable[[], float]] = None,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            latency_ms: 応答までの時間の中央値（ミリ秒）
+            latency_sigma: 応答までの時間の対数のばらつき（0で一定）
+            rate_limit_rate: レート制限エラーを返す割合（0〜1）
+            rpm_limit: キーごとの1分あたりのリクエスト数の上限（0で上限なし）
+            retry_after: レート制限エラーで返す再試行までの秒数
+            output_tokens: 応答の出力トークン数（max_output_tokensが小さい場合はそちら）
+            latency: 応答までの秒数を返す関数（指定した場合はlatency_msとlatency_sigmaより優先）
+            seed: 乱数のシード
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm_limit = rpm_limit
+        self.retry_after = retry_after
+        self.output_tokens = output_tokens
+        self.latency = latency
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._recent: Dict[str, Deque[float]] = {}
+        self._caches: Dict[str, str] = {}
+        self._embedder = HashingEmbedder(768)
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def create_model(
+        self, model_name: str, system_instruction: Optional[str] = None, cached_content: Optional[str] = None
+    ) -> FakeModel:
+        """モデルインスタンスを生成する（コンテキストキャッシュの内容はプロンプトの前に付ける）"""
+        prefix = self._caches.get(cached_content or "", "")
+        return FakeModel(self, model_name, "\n".join(part for part in (prefix, system_instruction) if part))
+
+    def bind(self, model: FakeModel, api_key: str) -> None:
+        """モデルにAPIキーを割り当てる"""
+        model.api_key = api_key
+
+    def _sample_latency(self) -> float:
+        """応答までの秒数を決める"""
+        if self.latency is not None:
+            return max(0.0, self.latency())
+        return self.latency_ms / 1000 * math.exp(self.latency_sigma * self._random.gauss(0, 1))
+
+    def _key_stats(self, api_key: str) -> Dict[str, int]:
+        """キーごとの集計先を取得する"""
+        stats = self.stats.get(api_key)
+        if stats is None:
+            stats = self.stats[api_key] = {"requests": 0, "rate_limited": 0, "input_tokens": 0, "output_tokens": 0}
+        return stats
+
+    def _check_rate_limit(self, api_key: str) -> None:
+        """レート制限エラーを返すか判定する"""
+        stats = self._key_stats(api_key)
+        stats["requests"] += 1
+        limited = self._random.random() < self.rate_limit_rate
+        if self.rpm_limit:
+            now = self.clock()
+            recent = self._recent.setdefault(api_key, deque())
+            while recent and recent[0] <= now - 60:
+                recent.popleft()
+            if len(recent) >= self.rpm_limit:
+                limited = True
+            else:
+                recent.append(now)
+        if limited:
+            stats["rate_limited"] += 1
+            raise google_exceptions.TooManyRequests(
+                f"Quota exceeded (fake backend). Please retry in {self.retry_after}s."
+            )
+
+    async def respond(self, api_key: str, model_name: str, prompt: str, max_tokens: int):
+        """
+        プロンプトへの応答を返す
+
+        Args:
+            api_key: APIキー
+            model_name: モデル名
+            prompt: システムインストラクションを含むプロンプト
+            max_tokens: 最大出力トークン数
+
+        Returns:
+            (応答のテキスト, 入出力の合計トークン数)
+        """
+        self._check_rate_limit(api_key)
+        await asyncio.sleep(self._sample_latency())
+
+        tokens = min(self.output_tokens, max_tokens)
+        text = ("負荷試験用の応答です。" * (tokens // 5 + 1))[: tokens * 2]
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        stats = self._key_stats(api_key)
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        return text, input_tokens + output_tokens
+
+    async def create_cached_content(self, api_key: str, request: glm.CreateCachedContentRequest) -> str:
+        """コンテキストキャッシュを作成し、その名前を返す"""
+        self._check_rate_limit(api_key)
+        name = f"cachedContents/fake-{len(self._caches) + 1}"
+        self._caches[name] = "".join(
+            part.text for content in request.cached_content.contents for part in content.parts
+        )
+        return name
+
+    async def delete_cached_content(self, api_key: str, name: str) -> None:
+        """コンテキストキャッシュを削除する"""
+        self._caches.pop(name, None)
+
+    async def batch_embed_contents(self, api_key: str, request: glm.BatchEmbedContentsRequest) -> List[List[float]]:
+        """テキストの埋め込みベクトルを取得する（ハッシュによるベクトルで代用する）"""
+        self._check_rate_limit(api_key)
+        texts = ["".join(part.text for part in item.content.parts) for item in request.requests]
+        self._key_stats(api_key)["input_tokens"] += sum(estimate_tokens(text) for text in texts)
+        return (await self._embedder.embed(texts)).tolist()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        全キーの合計の統計情報を取得する
+
+        Returns:
+            リクエスト数、レート制限の回数、入出力のトークン数
+        """
+        total = {"requests": 0, "rate_limited": 0, "input_tokens": 0, "output_tokens": 0}
+        for stats in self.stats.values():
+            for key in total:
+                total[key] += stats[key]
+        return total
+
+
+def create_backend(config: Dict[str, Any]):
+    """
+    設定に応じたバックエンドを生成する
+
+    Args:
+        config: 設定辞書（ai_backend: google/fake、fake_backend: FakeGeminiBackendの引数）
+
+    Returns:
+        バックエンドのインスタンス
+    """
+    if config.get("ai_backend", "google") == "fake":
+        logger.warning("Gemini APIの代わりにフェイクのバックエンドを使用します")
+        return FakeGeminiBackend(**(config.get("fake_backend") or {}))
+    return GoogleBackend()
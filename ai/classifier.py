@@ -10,22 +10,45 @@
 import logging
 from typing import Dict, Any, List, Optional
 
+from .text_utils import PromptBudget
+from .model_router import ModelRouter, route_text
+from .prompts import PromptRegistry
+from .usage import usage_context
+
 logger = logging.getLogger(__name__)
 
 class Classifier:
     """ジャンル分類クラス"""
     
-    def __init__(self, api):
+    def __init__(
+        self,
+        api,
+        budget: Optional[PromptBudget] = None,
+        router: Optional[ModelRouter] = None,
+        prompts: Optional[PromptRegistry] = None,
+    ):
         """
         初期化
         
         Args:
             api: APIインスタンス（GeminiAPI）
+            budget: プロンプトのトークン予算
+            router: モデルルーター（指定した場合はapiの代わりに記事の長さで選んだモデルを使う）
+            prompts: プロンプトの登録簿（指定がない場合は組み込みのプロンプト）
         """
         self.api = api
+        self.router = router
+        self.prompts = prompts or PromptRegistry()
+        self.budget = budget or PromptBudget()
         logger.info("ジャンル分類機能を初期化しました")
     
-    async def classify(self, title: str, content: str, categories: List[str] = None) -> str:
+    async def classify(
+        self,
+        title: str,
+        content: str,
+        categories: List[str] = None,
+        fallback: bool = True,
+    ) -> str:
         """
         記事のジャンルを分類する
         
@@ -33,6 +56,7 @@ class Classifier:
             title: 記事タイトル
             content: 記事内容
             categories: 分類カテゴリリスト（指定がない場合はデフォルトカテゴリを使用）
+            fallback: APIエラー時にotherを返すか（Falseの場合は例外を送出）
             
         Returns:
             分類されたジャンル
@@ -48,23 +72,18 @@ class Classifier:
             ]
         
         try:
-            # 分類用のテキスト（タイトルと内容の先頭部分）
-            classification_text = f"{title}\n\n{content[:500]}..."
+            # 分類用のテキスト（タイトルと予算内に収めた内容）
+            classification_text = f"{title}\n\n{self.budget.fit('classify', content)}"
             
             # 分類プロンプトの作成
-            categories_str = ", ".join(categories)
-            prompt = f"""
-次の記事のジャンルを以下のカテゴリから最も適切なもの一つだけ選んでください:
-{categories_str}
-
-記事:
-{classification_text}
-
-出力は選んだカテゴリ名のみを英語で一語だけ返してください。余計な説明や句読点、改行は不要です。
-"""
+            template = self.prompts.get("classify")
+            prompt = template.render(categories=", ".join(categories), text=classification_text)
             
             # APIを使用して分類
-            result = await self.api.generate_text(prompt, max_tokens=50, temperature=0.1)
+            self.budget.record("classify", prompt)
+            api = self.router.api_for("classify", route_text(title, content)) if self.router else self.api
+            with usage_context(prompt=template.key):
+                result = await api.generate_text(prompt, max_tokens=50, temperature=0.1)
             
             # 結果の正規化
             result = result.strip().lower()
@@ -79,6 +98,8 @@ class Classifier:
             
         except Exception as e:
             logger.error(f"ジャンル分類中にエラーが発生しました: {e}", exc_info=True)
+            if not fallback:
+                raise
             # エラーの場合はその他を返す
             return "other"
 
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+質問応答のコンテキストキャッシュ
+
+記事ごとに質問応答プロンプトの共通部分（元記事と関連記事）を保持し、
+十分な長さがある場合はGeminiのコンテキストキャッシュに登録して、以降の質問では質問文だけを送る
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+class QAContext:
+    """記事ごとの質問応答コンテキスト"""
+
+    def __init__(self, prefix: str, expires_at: float):
+        """
+        初期化
+
+        Args:
+            prefix: プロンプトの共通部分
+            expires_at: ローカルの有効期限（clockの時刻）
+        """
+        self.prefix = prefix
+        self.tokens = estimate_tokens(prefix)
+        self.expires_at = expires_at
+        # Geminiのコンテキストキャッシュ（作成したAPIとキーでしか使えない）
+        self.cache_name: Optional[str] = None
+        self.key_index: Optional[int] = None
+        self.api = None
+
+
+class ContextCache:
+    """記事ごとの質問応答コンテキストのキャッシュ
+
+    コンテキストは記事のメッセージIDごとに作成し、同じ記事への質問で共有する。
+    Gemini側のキャッシュはTTLで自動的に削除されるが、記事が記事ストアから
+    削除された場合はevictで即座に削除する。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        min_tokens: int = 1024,
+        explicit: bool = True,
+        max_entries: int = 128,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            ttl: コンテキストの有効期間（秒、Gemini側のキャッシュのTTLにも使う）
+            min_tokens: Geminiのキャッシュを作成する最小トークン数（これ未満は共通部分の再利用のみ）
+            explicit: Geminiのコンテキストキャッシュを使うか
+            max_entries: 保持する最大コンテキスト数（超過分は最終参照が古い順に削除）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.explicit = explicit
+        self.max_entries = max(1, max_entries)
+        self.clock = clock
+        self._entries: "OrderedDict[str, QAContext]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.tokens_saved = 0
+
+    def _get(self, message_id: str) -> Optional[QAContext]:
+        """有効期限内のコンテキストを取得する"""
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            # Gemini側のキャッシュも同じ頃にTTLで削除される
+            del self._entries[message_id]
+            return None
+        self._entries.move_to_end(message_id)
+        return entry
+
+    async def get_or_create(
+        self, message_id: str, build: Callable[[], Awaitable[str]], api: Any = None
+    ) -> QAContext:
+        """
+        記事のコンテキストを取得し、なければ作成する
+
+        Args:
+            message_id: 記事のメッセージID
+            build: プロンプトの共通部分を組み立てるコルーチン関数
+            api: Geminiのキャッシュを作成するAPIインスタンス
+
+        Returns:
+            コンテキスト
+        """
+        entry = self._get(message_id)
+        if entry is None:
+            # 同じ記事のコンテキストを同時に作成しない
+            lock = self._locks.setdefault(message_id, asyncio.Lock())
+            try:
+                async with lock:
+                    entry = self._get(message_id)
+                    if entry is None:
+                        return await self._create(message_id, build, api)
+            finally:
+                self._locks.pop(message_id, None)
+        self.hits += 1
+        if entry.cache_name:
+            self.tokens_saved += entry.tokens
+        return entry
+
+    async def _create(self, message_id: str, build: Callable[[], Awaitable[str]], api: Any) -> QAContext:
+        """コンテキストを作成し、十分な長さがあればGeminiのキャッシュに登録する"""
+        self.misses += 1
+        prefix = await build()
+        # Gemini側のキャッシュより少し早く期限切れにし、削除済みのキャッシュを参照しないようにする
+        entry = QAContext(prefix, self.clock() + self.ttl - min(60.0, self.ttl * 0.1))
+        if self.explicit and api is not None and entry.tokens >= self.min_tokens:
+            try:
+                entry.cache_name, entry.key_index = await api.create_cached_content(prefix, self.ttl)
+                entry.api = api
+                self.created += 1
+                logger.info(f"コンテキストキャッシュを作成しました: {message_id} ({entry.tokens}トークン)")
+            except Exception as e:
+                logger.warning(f"コンテキストキャッシュを作成できませんでした。プロンプト全体を送ります: {e}")
+
+        self._entries[message_id] = entry
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            await self._delete(evicted)
+        return entry
+
+    def discard_remote(self, entry: QAContext) -> None:
+        """
+        使えなくなったGeminiのキャッシュの参照を外す（以降はプロンプト全体を送る）
+
+        Args:
+            entry: 対象のコンテキスト
+        """
+        entry.cache_name = None
+        entry.key_index = None
+        entry.api = None
+
+    async def evict(self, message_ids: Iterable[str]) -> None:
+        """
+        記事のコンテキストを削除する（記事ストアから削除された記事用）
+
+        Args:
+            message_ids: 削除する記事のメッセージID
+        """
+        for message_id in message_ids:
+            entry = self._entries.pop(str(message_id), None)
+            if entry is not None:
+                await self._delete(entry)
+
+    async def _delete(self, entry: QAContext) -> None:
+        """Gemini側のキャッシュを削除する"""
+        if not entry.cache_name:
+            return
+        try:
+            await entry.api.delete_cached_content(entry.cache_name, entry.key_index)
+        except Exception as e:
+            logger.warning(f"コンテキストキャッシュの削除に失敗しました: {entry.cache_name}: {e}")
+        self.discard_remote(entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            再利用数、作成数、Geminiのキャッシュ数、送信を省略したトークン数、エントリ数
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "tokens_saved": self.tokens_saved,
+            "entries": len(self._entries),
+        }
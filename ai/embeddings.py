@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+埋め込みベクトル
+
+関連記事検索に使うテキストの埋め込みベクトルを計算する
+"""
+
+import zlib
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """行ごとにL2正規化する（ゼロベクトルはそのまま）"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class HashingEmbedder:
+    """特徴ハッシングによる埋め込み
+
+    語をハッシュ値で固定次元に割り当てる決定的な埋め込みで、ネットワークを使わない。
+    """
+
+    def __init__(self, dim: int = 512):
+        """
+        初期化
+
+        Args:
+            dim: ベクトルの次元数
+        """
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        テキストの埋め込みベクトルを計算する
+
+        Args:
+            texts: 対象のテキストのリスト
+
+        Returns:
+            L2正規化した(テキスト数, 次元数)のfloat32配列
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[str, int] = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                # プロセスごとに変わるhash()ではなくcrc32を使い、ハッシュの最下位ビットで符号を決める
+                h = zlib.crc32(token.encode("utf-8"))
+                sign = 1.0 if h & 1 else -1.0
+                vectors[row, (h >> 1) % self.dim] += sign * (1.0 + np.log(count))
+        return normalize_rows(vectors)
+
+
+class GeminiEmbedder:
+    """Gemini APIによる埋め込み"""
+
+    def __init__(self, api, model: str = "models/text-embedding-004"):
+        """
+        初期化
+
+        Args:
+            api: APIインスタンス（GeminiAPI）
+            model: 埋め込みモデル名
+        """
+        self.api = api
+        self.model = model
+        self.name = f"gemini:{model}"
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        テキストの埋め込みベクトルを取得する
+
+        Args:
+            texts: 対象のテキストのリスト
+
+        Returns:
+            L2正規化した(テキスト数, 次元数)のfloat32配列
+        """
+        vectors = await self.api.embed_texts(texts, self.model)
+        return normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+def create_embedder(config: Dict[str, Any], api=None):
+    """
+    設定に応じた埋め込みクラスを生成する
+
+    Args:
+        config: 設定辞書（embedder: hashing/gemini）
+        api: GeminiEmbedderで使うAPIインスタンス
+
+    Returns:
+        埋め込みクラスのインスタンス
+    """
+    if config.get("embedder", "hashing") == "gemini" and api is not None:
+        return GeminiEmbedder(api, config.get("embedding_model", "models/text-embedding-004"))
+    return HashingEmbedder(config.get("embedding_dim", 512))
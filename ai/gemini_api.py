@@ -8,54 +8,118 @@ Google Gemini APIを使用してAI処理を行う
 """
 
 import os
+import re
 import logging
+import time
 import asyncio
-from typing import Optional, List
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Iterable, Optional, List, Dict, Tuple
 
 from google.api_core import exceptions as google_exceptions
+import google.ai.generativelanguage as glm
 import google.generativeai as genai
+
+from .backends import GoogleBackend
+from .governor import AIGovernor, current_lane
+from .hedging import HedgePolicy
+from .key_pool import GeminiKeyPool, KeyState
+from .text_utils import estimate_tokens
+from .usage import UsageRecorder
 # from google.generativeai import types as genai_types # Old import
 # For new SDK, types are often directly under genai.types or not explicitly needed for basic usage
 
 logger = logging.getLogger(__name__)
 
+# system_instructionごとにキャッシュするモデルインスタンスの上限
+MODEL_CACHE_SIZE = 32
+
+# Retry-Afterの指示がないレート制限エラーでキーを休ませる秒数
+DEFAULT_RATE_LIMIT_COOLDOWN = 10.0
+
+RETRY_IN_RE = re.compile(r"retry in\s*([\d.]+)\s*s", re.IGNORECASE)
+RETRY_DELAY_RE = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+def resolve_api_keys(api_key: str = None, api_keys: Optional[List[str]] = None) -> List[str]:
+    """
+    設定と環境変数からGemini APIキーのリストを組み立てる
+
+    Args:
+        api_key: 優先して使用するAPIキー
+        api_keys: APIキーのリスト
+
+    Returns:
+        重複を除いたAPIキーのリスト
+    """
+    keys = [k for k in (api_keys or []) if k]
+
+    if api_key:
+        if api_key not in keys:
+            keys.insert(0, api_key)
+
+    env_keys = []
+    # Consolidated environment variable fetching
+    gemini_api_1 = os.environ.get("GEMINI_API_1")
+    gemini_api_2 = os.environ.get("GEMINI_API_2")
+    gemini_api_keys_env = os.environ.get("GEMINI_API_KEYS")
+    gemini_api_key_env = os.environ.get("GEMINI_API_KEY")
+
+    if gemini_api_1: env_keys.append(gemini_api_1)
+    if gemini_api_2: env_keys.append(gemini_api_2)
+    if not env_keys and gemini_api_keys_env: # Only if GEMINI_API_1/2 are not set
+        env_keys.extend([k.strip() for k in gemini_api_keys_env.split(',') if k.strip()])
+    if not env_keys and gemini_api_key_env: # Only if no other keys found yet
+        env_keys.append(gemini_api_key_env)
+
+    for key in env_keys:
+        if key not in keys:
+            keys.append(key)
+
+    return keys
+
 class GeminiAPI:
     """Google Gemini API連携クラス"""
 
-    def __init__(self, api_key: str = None, model: str = "gemini-1.5-pro", api_keys: Optional[List[str]] = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = "gemini-1.5-pro",
+        api_keys: Optional[List[str]] = None,
+        key_pool: Optional[GeminiKeyPool] = None,
+        governor: Optional[AIGovernor] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        timeout: Optional[float] = None,
+        backend: Any = None,
+        usage_recorder: Optional[UsageRecorder] = None,
+    ):
         """
         初期化
 
         Args:
             api_key: Google Gemini API Key（指定がない場合は環境変数から取得）
             model: 使用するモデル名
+            api_keys: APIキーのリスト
+            key_pool: 共有するAPIキープール（指定がない場合はキーから生成）
+            governor: 共有する同時実行数の制御（指定がない場合は制限しない）
+            hedge_policy: 共有するヘッジリクエストの制御（指定がない場合はヘッジしない）
+            timeout: タイムアウトを指定しない呼び出しの期限（秒、Noneで無期限）
+            backend: リクエストの送信先（指定がない場合はGoogleBackend）
+            usage_recorder: 呼び出しごとの使用量の記録先（指定がない場合は記録しない）
         """
-        self.api_keys = [k for k in (api_keys or []) if k]
-
-        if api_key:
-            if api_key not in self.api_keys:
-                self.api_keys.insert(0, api_key)
-
-        env_keys = []
-        # Consolidated environment variable fetching
-        gemini_api_1 = os.environ.get("GEMINI_API_1")
-        gemini_api_2 = os.environ.get("GEMINI_API_2")
-        gemini_api_keys_env = os.environ.get("GEMINI_API_KEYS")
-        gemini_api_key_env = os.environ.get("GEMINI_API_KEY")
-
-        if gemini_api_1: env_keys.append(gemini_api_1)
-        if gemini_api_2: env_keys.append(gemini_api_2)
-        if not env_keys and gemini_api_keys_env: # Only if GEMINI_API_1/2 are not set
-            env_keys.extend([k.strip() for k in gemini_api_keys_env.split(',') if k.strip()])
-        if not env_keys and gemini_api_key_env: # Only if no other keys found yet
-            env_keys.append(gemini_api_key_env)
-
-        for key in env_keys:
-            if key not in self.api_keys:
-                self.api_keys.append(key)
+        self.backend = backend or GoogleBackend()
+        self.governor = governor
+        self.hedge_policy = hedge_policy
+        self.timeout = timeout
+        self.usage_recorder = usage_recorder
+        if key_pool is not None:
+            self.api_keys = key_pool.keys
+        else:
+            self.api_keys = resolve_api_keys(api_key, api_keys)
+        self.key_pool = key_pool or GeminiKeyPool(self.api_keys)
 
         self.model_name = model if model.startswith("models/") else f"models/{model}"
         self.generative_model: Optional[genai.GenerativeModel] = None # Type hint for clarity
+        # (model_name, system_instruction, api_key, cached_content) -> GenerativeModel
+        self._model_cache: Dict[Tuple[str, str, str, str], genai.GenerativeModel] = {}
 
         if not self.api_keys:
             logger.warning("Gemini API Keyが設定されていません。API機能は利用できません。")
@@ -85,14 +149,15 @@ class GeminiAPI:
         """APIキーに基づきクライアントを構成する"""
         if self.api_key:
             try:
-                genai.configure(api_key=self.api_key)
+                # 認証情報はリクエスト時にキーごとのクライアントで渡すため、
+                # プロセス全体に影響するgenai.configureは呼ばない
                 # Safety settings can be configured here if needed, e.g.,
                 # safety_settings = [
                 #     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
                 #     {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
                 # ]
                 # self.generative_model = genai.GenerativeModel(self.model_name, safety_settings=safety_settings)
-                self.generative_model = genai.GenerativeModel(self.model_name)
+                self.generative_model = self.backend.create_model(self.model_name)
                 logger.info(f"Geminiクライアントを構成しました。APIキーindex: {self.current_key_index}")
             except Exception as e:
                 logger.error(f"Geminiクライアントの構成中にエラー: {e}", exc_info=True)
@@ -101,18 +166,60 @@ class GeminiAPI:
             self.generative_model = None
             logger.warning("APIキーがないためGeminiクライアントを構成できません。")
 
-    def _switch_api_key(self):
-        """Switch to the next API key in the list"""
-        if not self.api_keys or len(self.api_keys) == 0:
-            logger.warning("切り替えるAPIキーがありません。")
-            self.api_key = "" # Ensure api_key is cleared if no keys are available
-            self._configure_client() # Attempt to configure (will likely set model to None)
-            return
+    def _get_model(
+        self,
+        system_instruction: Optional[str] = None,
+        api_key: Optional[str] = None,
+        cached_content: Optional[str] = None,
+    ) -> genai.GenerativeModel:
+        """
+        APIキーとsystem_instructionに対応するモデルインスタンスを取得する
 
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        self.api_key = self.api_keys[self.current_key_index]
-        logger.info(f"APIキーを切り替えました: index={self.current_key_index}")
-        self._configure_client() # Re-configure with the new key
+        モデルは(model_name, system_instruction, api_key, cached_content)ごとにキャッシュし、
+        呼び出しのたびにGenerativeModelを構築しないようにする。
+        """
+        api_key = api_key or self.api_key
+        cache_key = (self.model_name, system_instruction or "", api_key, cached_content or "")
+        model = self._model_cache.get(cache_key)
+        if model is None:
+            if len(self._model_cache) >= MODEL_CACHE_SIZE:
+                # 最も古いエントリを削除
+                self._model_cache.pop(next(iter(self._model_cache)))
+            model = self.backend.create_model(self.model_name, system_instruction, cached_content)
+            self._bind_model(model, api_key)
+            self._model_cache[cache_key] = model
+        return model
+
+    def _bind_model(self, model: genai.GenerativeModel, api_key: str) -> None:
+        """モデルにAPIキー専用のクライアントを割り当てる"""
+        self.backend.bind(model, api_key)
+
+    def _retry_after_seconds(self, error: Exception) -> Optional[float]:
+        """
+        レート制限エラーから再試行までの待機秒数を取得する
+
+        Retry-Afterヘッダー、RetryInfo、エラーメッセージの順に参照する。
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers:
+            try:
+                value = headers.get("Retry-After")
+                if value:
+                    return float(value)
+            except (TypeError, ValueError):
+                pass
+
+        for detail in getattr(error, "details", None) or []:
+            delay = getattr(detail, "retry_delay", None)
+            if delay is not None and hasattr(delay, "seconds"):
+                return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+
+        message = str(error)
+        match = RETRY_IN_RE.search(message) or RETRY_DELAY_RE.search(message)
+        if match:
+            return float(match.group(1))
+        return None
 
     def _is_rate_limit_error(self, error: Exception) -> bool:
         # google_exceptions.TooManyRequests should cover most rate limit cases
@@ -130,110 +237,526 @@ class GeminiAPI:
         top_p: Optional[float] = 0.95, # Made Optional as per some SDK versions
         top_k: Optional[int] = 40,   # Made Optional
         system_instruction: Optional[str] = None,
+        cached_content: Optional[str] = None,
+        key_index: Optional[int] = None,
+        timeout: Optional[float] = None,
+        latency_key: Optional[str] = None,
     ) -> str:
         """
         テキストを生成する
+
+        cached_contentを指定した場合は、そのコンテキストキャッシュの続きとしてpromptを送る。
+        キャッシュは作成したキーでしか使えないため、key_indexでキーを固定する。
+        送信してからtimeout秒以内に応答がない場合はasyncio.TimeoutErrorを送出する（実行枠とキーの待機時間は含めない）。
+        キーを固定しない場合は、latency_key（既定はモデル名）ごとのレイテンシの分位点を過ぎても応答がなければ
+        別のキーでヘッジリクエストを送り、先に返った応答を使う。
+        usage_recorderがある場合は、latency_keyをタスク名として呼び出しごとの使用量を記録する。
+        """
+        if not self.generative_model:
+            raise ValueError("Gemini APIが正しく初期化されていません (モデル未設定)。APIキーを確認してください。")
+
+        current_generation_config = self._generation_config(max_tokens, temperature, top_p, top_k)
+
+        # キープールで予算を確保するための推定トークン数（入力＋出力上限）
+        input_tokens = estimate_tokens(prompt) + estimate_tokens(system_instruction or "")
+        estimated_tokens = input_tokens + max_tokens
+        usage = self._usage_state()
+
+        async def call(state: KeyState) -> Tuple[str, Optional[int]]:
+            usage["attempts"] += 1
+            # system_instruction付きのモデルはキャッシュから取得し、生成設定は呼び出しごとに渡す
+            model_to_use = self._get_model(system_instruction, state.api_key, cached_content)
+            response = await model_to_use.generate_content_async(
+                contents=prompt,
+                generation_config=current_generation_config
+            )
+            text = self._extract_text(response)
+            self._update_usage(usage, state, response, text)
+            return text, self._total_tokens(response)
+
+        success = False
+        try:
+            text = await self._run(
+                estimated_tokens, call, key_index, timeout, latency_key, hedge=key_index is None
+            )
+            success = True
+            return text
+        finally:
+            self._record_usage(usage, latency_key, input_tokens, success)
+
+    async def stream_text(
+        self,
+        prompt: str,
+        on_text: Callable[[str], Awaitable[None]],
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        top_p: Optional[float] = 0.95,
+        top_k: Optional[int] = 40,
+        system_instruction: Optional[str] = None,
+        cached_content: Optional[str] = None,
+        key_index: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        テキストをストリーミングで生成する
+
+        チャンクを受信するたびに、それまでに生成されたテキスト全体でon_textを呼び出す。
+        レート制限により別のキーで再試行した場合は、テキストは先頭から生成し直される。
+        cached_content、key_index、timeoutはgenerate_textと同じ（ヘッジリクエストは送らない）。
+
+        Args:
+            prompt: プロンプト
+            on_text: 生成途中のテキストを受け取るコルーチン関数
+            max_tokens: 最大出力トークン数
+            temperature: 温度
+            top_p: top_p
+            top_k: top_k
+            system_instruction: システムインストラクション
+            cached_content: コンテキストキャッシュの名前
+            key_index: 使用するキーのインデックス（キャッシュを作成したキー）
+            timeout: 1回の呼び出しの期限（秒、実行枠とキーの待機時間は含めない）
+
+        Returns:
+            生成されたテキスト全体
+        """
+        if not self.generative_model:
+            raise ValueError("Gemini APIが正しく初期化されていません (モデル未設定)。APIキーを確認してください。")
+
+        current_generation_config = self._generation_config(max_tokens, temperature, top_p, top_k)
+        input_tokens = estimate_tokens(prompt) + estimate_tokens(system_instruction or "")
+        estimated_tokens = input_tokens + max_tokens
+        usage = self._usage_state()
+
+        async def call(state: KeyState) -> Tuple[str, Optional[int]]:
+            usage["attempts"] += 1
+            last_chunk = None
+            model_to_use = self._get_model(system_instruction, state.api_key, cached_content)
+            response = await model_to_use.generate_content_async(
+                contents=prompt,
+                generation_config=current_generation_config,
+                stream=True,
+            )
+            text = ""
+            total_tokens = None
+            async for chunk in response:
+                # 使用トークン数は最後のチャンクに含まれる
+                total_tokens = self._total_tokens(chunk) or total_tokens
+                if self._total_tokens(chunk):
+                    last_chunk = chunk
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    # ブロックされたチャンクなどテキストを持たないもの
+                    piece = ""
+                if piece:
+                    text += piece
+                    await on_text(text)
+            self._update_usage(usage, state, last_chunk, text)
+            return text.strip(), total_tokens
+
+        success = False
+        try:
+            text = await self._run(estimated_tokens, call, key_index, timeout)
+            success = True
+            return text
+        finally:
+            self._record_usage(usage, "stream", input_tokens, success)
+
+    async def create_cached_content(self, contents: str, ttl_seconds: float) -> Tuple[str, int]:
+        """
+        コンテキストキャッシュを作成する
+
+        Args:
+            contents: キャッシュするテキスト（プロンプトの共通部分）
+            ttl_seconds: キャッシュの有効期間（秒）
+
+        Returns:
+            (キャッシュの名前, 作成したキーのインデックス)
+        """
+        if not self.generative_model:
+            raise ValueError("Gemini APIが正しく初期化されていません (モデル未設定)。APIキーを確認してください。")
+
+        request = glm.CreateCachedContentRequest(
+            cached_content=glm.CachedContent(
+                model=self.model_name,
+                contents=[glm.Content(role="user", parts=[glm.Part(text=contents)])],
+                ttl=timedelta(seconds=ttl_seconds),
+            )
+        )
+
+        input_tokens = estimate_tokens(contents)
+        usage = self._usage_state()
+
+        async def call(state: KeyState) -> Tuple[Tuple[str, int], Optional[int]]:
+            usage["attempts"] += 1
+            usage["key_index"] = state.index
+            name = await self.backend.create_cached_content(state.api_key, request)
+            return (name, state.index), None
+
+        success = False
+        try:
+            result = await self._run(input_tokens, call)
+            success = True
+            return result
+        finally:
+            self._record_usage(usage, "context_cache", input_tokens, success)
+
+    async def delete_cached_content(self, name: str, key_index: int) -> None:
+        """
+        コンテキストキャッシュを削除する
+
+        Args:
+            name: キャッシュの名前
+            key_index: キャッシュを作成したキーのインデックス
+        """
+        api_key = self.key_pool.states[key_index].api_key
+        await self.backend.delete_cached_content(api_key, name)
+
+    def _generation_config(
+        self, max_tokens: int, temperature: float, top_p: Optional[float], top_k: Optional[int]
+    ) -> genai.types.GenerationConfig:
+        """生成設定を組み立てる"""
+        generation_config_params = {
+            "max_output_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if top_p is not None:
+            generation_config_params["top_p"] = top_p
+        if top_k is not None:
+            generation_config_params["top_k"] = top_k
+        return genai.types.GenerationConfig(**generation_config_params)
+
+    async def embed_texts(self, texts: List[str], model: str = "models/text-embedding-004") -> List[List[float]]:
         """
+        テキストの埋め込みベクトルを取得する
+
+        Args:
+            texts: 対象のテキストのリスト
+            model: 埋め込みモデル名
+
+        Returns:
+            テキストごとの埋め込みベクトル
+        """
+        if not texts:
+            return []
         if not self.generative_model:
             raise ValueError("Gemini APIが正しく初期化されていません (モデル未設定)。APIキーを確認してください。")
 
-        consecutive_limits = 0
-        max_retries_per_key_cycle = len(self.api_keys) * 2 if self.api_keys else 1
+        request = glm.BatchEmbedContentsRequest(
+            model=model,
+            requests=[
+                glm.EmbedContentRequest(model=model, content=glm.Content(parts=[glm.Part(text=text)]))
+                for text in texts
+            ],
+        )
+
+        input_tokens = sum(estimate_tokens(text) for text in texts)
+        usage = self._usage_state()
+
+        async def call(state: KeyState) -> Tuple[List[List[float]], Optional[int]]:
+            usage["attempts"] += 1
+            usage["key_index"] = state.index
+            return await self.backend.batch_embed_contents(state.api_key, request), None
+
+        success = False
+        try:
+            vectors = await self._run(input_tokens, call)
+            success = True
+            return vectors
+        finally:
+            self._record_usage(usage, "embedding", input_tokens, success, model=model)
+
+    async def _run(
+        self,
+        estimated_tokens: int,
+        call: Callable[[KeyState], Awaitable[Tuple[Any, Optional[int]]]],
+        key_index: Optional[int] = None,
+        timeout: Optional[float] = None,
+        latency_key: Optional[str] = None,
+        hedge: bool = False,
+    ) -> Any:
+        """
+        期限付きでAPIを呼び出す（hedgeがTrueの場合はヘッジリクエストを送ることがある）
+
+        期限は実行枠とキーを取得した後の呼び出しそのものに適用し、実行枠やRPMの待機時間は含めない。
+        期限を過ぎた場合は送信中のリクエストをキャンセルし、キーと実行枠を返却する。
+
+        Args:
+            estimated_tokens: キープールで確保する推定トークン数
+            call: キーの状態を受け取り、(結果, 実際のトークン数)を返すコルーチン関数
+            key_index: 使用するキーのインデックス
+            timeout: 期限（秒、指定がない場合はインスタンスの既定値）
+            latency_key: レイテンシを記録するルート名（指定がない場合はモデル名）
+            hedge: ヘッジリクエストを送ってよいか
+
+        Returns:
+            callの結果
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        if self.hedge_policy is not None and hedge:
+            return await self._call_hedged(estimated_tokens, call, latency_key or self.model_name, timeout)
+        return await self._call_with_key(estimated_tokens, call, key_index, timeout=timeout)
+
+    async def _call_hedged(
+        self,
+        estimated_tokens: int,
+        call: Callable[[KeyState], Awaitable[Tuple[Any, Optional[int]]]],
+        latency_key: str,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        レイテンシの分位点を過ぎても応答がない場合に、別のキーでヘッジリクエストを送る
+
+        レイテンシはキーを取得して送信を始めてから応答までの時間で測り、実行枠やRPMの待機時間は含めない。
+        実行枠の待機が飽和している間は負荷を増やさないようにヘッジしない。
+        先に成功した応答を返し、残りのリクエストはキャンセルする。
+        """
+        policy = self.hedge_policy
+        policy.requests += 1
+        used_keys: List[int] = []
+        call_started: Dict[str, float] = {}
+        primary_started = asyncio.Event()
+
+        def timed(name: str) -> Callable[[KeyState], Awaitable[Tuple[Any, Optional[int]]]]:
+            async def wrapped(state: KeyState) -> Tuple[Any, Optional[int]]:
+                used_keys.append(state.index)
+                call_started[name] = time.monotonic()
+                if name == "primary":
+                    primary_started.set()
+                return await call(state)
+            return wrapped
+
+        primary = asyncio.ensure_future(self._call_with_key(estimated_tokens, timed("primary"), timeout=timeout))
+        pending = {primary}
+        hedged = None
+        try:
+            delay = policy.delay(latency_key) if len(self.api_keys) > 1 else None
+            if delay is not None:
+                # 主リクエストの送信が始まってから分位点の時間だけ待つ
+                started = asyncio.ensure_future(primary_started.wait())
+                try:
+                    await asyncio.wait({primary, started}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    started.cancel()
+                done, _ = await asyncio.wait(pending, timeout=delay) if not primary.done() else ({primary}, set())
+                saturated = self.governor is not None and self.governor.saturated(current_lane.get())
+                if not done and not saturated and policy.allow():
+                    logger.info(f"応答が{delay:.1f}秒を過ぎたため別のキーでヘッジリクエストを送ります: {latency_key}")
+                    hedged = asyncio.ensure_future(
+                        self._call_with_key(estimated_tokens, timed("hedge"), avoid=used_keys, timeout=timeout)
+                    )
+                    pending.add(hedged)
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        name = "hedge" if task is hedged else "primary"
+                        if task is hedged:
+                            policy.hedge_wins += 1
+                        policy.record(latency_key, time.monotonic() - call_started[name])
+                        return task.result()
+                    # 主リクエストのエラーを優先して送出する
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            if pending:
+                policy.cancelled += len(pending)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _call_with_key(
+        self,
+        estimated_tokens: int,
+        call: Callable[[KeyState], Awaitable[Tuple[Any, Optional[int]]]],
+        key_index: Optional[int] = None,
+        avoid: Iterable[int] = (),
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        キープールから取得したキーでAPIを呼び出す
+
+        レート制限を受けた場合はキーをクールダウンさせ、別のキーで再試行する。
+        key_indexでキーを固定した場合は再試行せずにエラーを送出する。
+        governorがある場合は、試行ごとに現在のレーンの実行枠を取得してから呼び出す。
+
+        Args:
+            estimated_tokens: キープールで確保する推定トークン数
+            call: キーの状態を受け取り、(結果, 実際のトークン数)を返すコルーチン関数
+            key_index: 使用するキーのインデックス（指定がない場合は余裕のあるキー）
+            avoid: できるだけ使わないキーのインデックス（ヘッジリクエスト用）
+            timeout: 実行枠とキーを取得した後の呼び出しの期限（秒、Noneで無期限）
+
+        Returns:
+            callの結果
+        """
+        rate_limited = 0
+        max_attempts = len(self.api_keys) * 2 if self.api_keys else 1
+        exclude = list(avoid)
+        if key_index is not None:
+            exclude = [state.index for state in self.key_pool.states if state.index != key_index]
 
         while True:
+            lane, state = await self._acquire(estimated_tokens, exclude)
+            actual_tokens = None
             try:
-                generation_config_params = {
-                    "max_output_tokens": max_tokens,
-                    "temperature": temperature,
-                }
-                if top_p is not None:
-                    generation_config_params["top_p"] = top_p
-                if top_k is not None:
-                    generation_config_params["top_k"] = top_k
-
-                current_generation_config = genai.types.GenerationConfig(**generation_config_params)
-
-                # Use the model instance's system_instruction if provided during its init,
-                # or create a new model instance if system_instruction is provided now.
-                model_to_use = self.generative_model
-                if system_instruction:
-                    # This creates a new model instance for this call if system_instruction is different or not set.
-                    # Consider if this is desired behavior due to potential overhead.
-                    # For persistent system instructions, set it when initializing GeminiAPI or its model.
-                    # logger.info(f"Using dynamic system instruction for this call.")
-                    model_to_use = genai.GenerativeModel(
-                        self.model_name,
-                        system_instruction=system_instruction,
-                        generation_config=current_generation_config # Pass config here
-                    )
-                    # When model is created with system_instruction, pass only prompt to generate_content_async
-                    response = await model_to_use.generate_content_async(contents=prompt)
+                if timeout:
+                    result, actual_tokens = await asyncio.wait_for(call(state), timeout)
                 else:
-                    # If no system_instruction for this call, use the existing model with new config for this call
-                    response = await model_to_use.generate_content_async(
-                        contents=prompt,
-                        generation_config=current_generation_config
-                    )
-
-                # Accessing response text and handling potential errors/empty responses
-                try:
-                    # The new SDK typically provides response.text directly.
-                    # It might also have response.candidates for more detailed inspection if needed.
-                    if hasattr(response, 'text') and response.text:
-                        return response.text.strip()
-                    # Fallback to candidates if .text is not fruitful, though less common for simple success
-                    elif response.candidates and response.candidates[0].content.parts:
-                         all_parts = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
-                         if all_parts:
-                             return all_parts.strip()
-
-                    # If no text, log and return empty or raise error
-                    finish_reason = "N/A"
-                    if response.candidates and hasattr(response.candidates[0], 'finish_reason'):
-                        finish_reason = response.candidates[0].finish_reason.name
-                    elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                         finish_reason = f"Blocked: {response.prompt_feedback.block_reason.name}"
-
-                    logger.warning(f"APIレスポンスに有効なテキストがありません。Finish reason: {finish_reason}. Response: {response}")
-                    return "" # Or raise an error depending on desired strictness
-
-                except ValueError as ve: # Handles cases where .text might raise ValueError (e.g. blocked content)
-                    logger.warning(f"テキスト取得中にValueError: {ve}. Full response: {response}", exc_info=True)
-                    return ""
-                except AttributeError as ae:
-                     logger.warning(f"レスポンス属性エラー: {ae}. Full response: {response}", exc_info=True)
-                     return ""
+                    result, actual_tokens = await call(state)
+                return result
 
+            except asyncio.TimeoutError:
+                if self.hedge_policy is not None:
+                    self.hedge_policy.timeouts += 1
+                logger.warning(f"Gemini API呼び出しが期限（{timeout:.0f}秒）を過ぎたためキャンセルしました: {self.model_name}")
+                raise
 
             except Exception as e:
-                if self._is_rate_limit_error(e) and self.api_keys and len(self.api_keys) > 0:
-                    consecutive_limits += 1
-                    logger.warning(f"レート制限エラー。APIキーを切り替えて再試行します (試行 {consecutive_limits}/{max_retries_per_key_cycle})")
-
-                    if consecutive_limits >= max_retries_per_key_cycle:
-                        logger.error("全てのAPIキーでレート制限に達しました。30秒待機後、エラーを送出します。")
-                        await asyncio.sleep(30)
-                        raise # Re-raise the exception after exhausting retries
-
-                    self._switch_api_key() # Switch key
-                    if not self.api_key: # If switching results in no valid key
-                        logger.error("有効なAPIキーが見つかりませんでした。エラーを送出します。")
-                        raise ValueError("No valid API key available after switching.")
-
-                    if consecutive_limits % len(self.api_keys) == 0 and len(self.api_keys) > 1: # If cycled through all keys once
-                         logger.info(f"APIキーを1周しました。10秒待機します。")
-                         await asyncio.sleep(10)
-                    else: # Wait a bit before retrying with new key
-                        await asyncio.sleep(1) # Short delay before retry
-                    continue # Retry the while loop
-
-                logger.error(f"テキスト生成中に予期せぬエラーが発生しました: {e}", exc_info=True)
+                if self._is_rate_limit_error(e) and self.api_keys:
+                    rate_limited += 1
+                    cooldown = self._retry_after_seconds(e) or DEFAULT_RATE_LIMIT_COOLDOWN
+                    self.key_pool.cooldown(state, cooldown)
+
+                    if key_index is not None:
+                        logger.warning(f"固定したAPIキーがレート制限を受けました (index={state.index})")
+                        raise
+                    if rate_limited >= max_attempts:
+                        logger.error("全てのAPIキーでレート制限に達しました。エラーを送出します。")
+                        raise
+
+                    logger.warning(
+                        f"レート制限エラー。別のAPIキーで再試行します (試行 {rate_limited}/{max_attempts}, "
+                        f"index={state.index}, クールダウン{cooldown:.1f}秒)"
+                    )
+                    continue
+
+                logger.error(f"Gemini API呼び出し中に予期せぬエラーが発生しました: {e}", exc_info=True)
                 raise # Re-raise other exceptions
 
+            finally:
+                self.key_pool.release(state, estimated_tokens, actual_tokens)
+                if lane is not None:
+                    self.governor.release(lane)
+
+    async def _acquire(self, estimated_tokens: int, exclude: Iterable[int]) -> Tuple[Optional[str], KeyState]:
+        """
+        実行枠とキーを取得する
+
+        キーのRPM/TPMの回復を待つ間は実行枠を返却し、他のレーンの呼び出しが実行枠を使えるようにする。
+
+        Args:
+            estimated_tokens: キープールで確保する推定トークン数
+            exclude: できるだけ使わないキーのインデックス
+
+        Returns:
+            (実行枠を取得したレーン名（governorがない場合はNone）, キーの状態)
+        """
+        if not self.governor:
+            # RPM/TPMの余裕が最も大きいキーを取得（全キーが使えない場合は待機）
+            return None, await self.key_pool.acquire(estimated_tokens, exclude)
+        while True:
+            lane = await self.governor.acquire()
+            state = self.key_pool.try_acquire(estimated_tokens, exclude)
+            if state is not None:
+                return lane, state
+            self.governor.release(lane, completed=False)
+            await self.key_pool.wait_for_key(estimated_tokens, exclude)
+
+    def _usage_state(self) -> Dict[str, Any]:
+        """呼び出し1回分の使用量の集計用の辞書を生成する"""
+        return {
+            "started": time.monotonic(),
+            "attempts": 0,
+            "key_index": None,
+            "input_tokens": None,
+            "output_tokens": None,
+        }
+
+    def _update_usage(self, usage: Dict[str, Any], state: KeyState, response: Any, text: str) -> None:
+        """応答を返した試行のキーとトークン数を記録する（メタデータがない場合は出力を推定する）"""
+        metadata = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(metadata, "prompt_token_count", None)
+        output_tokens = getattr(metadata, "candidates_token_count", None)
+        usage["key_index"] = state.index
+        usage["input_tokens"] = prompt_tokens if isinstance(prompt_tokens, int) else None
+        usage["output_tokens"] = output_tokens if isinstance(output_tokens, int) else estimate_tokens(text)
+
+    def _record_usage(
+        self,
+        usage: Dict[str, Any],
+        task: Optional[str],
+        input_tokens: int,
+        success: bool,
+        model: Optional[str] = None,
+    ) -> None:
+        """
+        呼び出し1回分の使用量をusage_recorderに記録する
+
+        Args:
+            usage: _usage_stateで生成し、試行ごとに更新した辞書
+            task: タスク名（タグにタスクがない場合に使う）
+            input_tokens: 推定入力トークン数（応答のメタデータがない場合に使う）
+            success: 成功したか
+            model: モデル名（指定がない場合は生成モデル）
+        """
+        if self.usage_recorder is None or not usage["attempts"]:
+            return
+        self.usage_recorder.record(
+            model=model or self.model_name,
+            task=task,
+            input_tokens=usage["input_tokens"] if usage["input_tokens"] is not None else input_tokens,
+            output_tokens=usage["output_tokens"] or 0,
+            latency=time.monotonic() - usage["started"],
+            retries=usage["attempts"] - 1,
+            key_index=usage["key_index"],
+            success=success,
+        )
+
+    def _total_tokens(self, response) -> Optional[int]:
+        """レスポンスの使用トークン数を取得する"""
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None)
+        return total if isinstance(total, int) else None
+
+    def _extract_text(self, response) -> str:
+        """レスポンスからテキストを取り出す"""
+        # Accessing response text and handling potential errors/empty responses
+        try:
+            # The new SDK typically provides response.text directly.
+            # It might also have response.candidates for more detailed inspection if needed.
+            if hasattr(response, 'text') and response.text:
+                return response.text.strip()
+            # Fallback to candidates if .text is not fruitful, though less common for simple success
+            elif response.candidates and response.candidates[0].content.parts:
+                 all_parts = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
+                 if all_parts:
+                     return all_parts.strip()
+
+            # If no text, log and return empty or raise error
+            finish_reason = "N/A"
+            if response.candidates and hasattr(response.candidates[0], 'finish_reason'):
+                finish_reason = response.candidates[0].finish_reason.name
+            elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+                 finish_reason = f"Blocked: {response.prompt_feedback.block_reason.name}"
+
+            logger.warning(f"APIレスポンスに有効なテキストがありません。Finish reason: {finish_reason}. Response: {response}")
+            return "" # Or raise an error depending on desired strictness
+
+        except ValueError as ve: # Handles cases where .text might raise ValueError (e.g. blocked content)
+            logger.warning(f"テキスト取得中にValueError: {ve}. Full response: {response}", exc_info=True)
+            return ""
+        except AttributeError as ae:
+             logger.warning(f"レスポンス属性エラー: {ae}. Full response: {response}", exc_info=True)
+             return ""
+
     async def close(self):
         """互換性のために存在するダミーメソッド"""
-        # New SDK does not require explicit client closing typically
-        logger.info("Google Gemini API (new SDK) は特別なクローズ処理を必要としません")
+        # キーごとのクライアントは他のインスタンスと共有しているため、終了時にclose_clientsでまとめて閉じる
+        logger.info("Google Gemini APIのクライアントは終了時にまとめて閉じます")
 
 # テスト用コード
 async def test_gemini_api():
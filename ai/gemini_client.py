@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Geminiクライアント
+
+APIキーごとに認証情報を束縛したGeminiクライアントを提供する
+"""
+
+import logging
+from typing import Dict, Optional
+
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+from google.api_core import client_options as client_options_lib
+from google.api_core import gapic_v1
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "discord-rss-bot"
+
+class GeminiClient:
+    """APIキー専用のGeminiクライアント
+
+    genai.configureによるプロセス全体の設定を使わず、クライアント生成時に
+    APIキーを渡すため、複数のキーやモデルを同時に利用しても干渉しない。
+    """
+
+    def __init__(self, api_key: str):
+        """
+        初期化
+
+        Args:
+            api_key: このクライアントで使用するAPIキー
+        """
+        self.api_key = api_key
+        self._async_client: Optional[glm.GenerativeServiceAsyncClient] = None
+        self._cache_client: Optional[glm.CacheServiceAsyncClient] = None
+
+    @property
+    def async_client(self) -> glm.GenerativeServiceAsyncClient:
+        """非同期クライアント（初回参照時に生成する）"""
+        if self._async_client is None:
+            self._async_client = glm.GenerativeServiceAsyncClient(
+                client_options=client_options_lib.ClientOptions(api_key=self.api_key),
+                client_info=gapic_v1.client_info.ClientInfo(user_agent=USER_AGENT),
+            )
+        return self._async_client
+
+    @property
+    def cache_client(self) -> glm.CacheServiceAsyncClient:
+        """コンテキストキャッシュ用の非同期クライアント（初回参照時に生成する）"""
+        if self._cache_client is None:
+            self._cache_client = glm.CacheServiceAsyncClient(
+                client_options=client_options_lib.ClientOptions(api_key=self.api_key),
+                client_info=gapic_v1.client_info.ClientInfo(user_agent=USER_AGENT),
+            )
+        return self._cache_client
+
+    def bind(self, model: genai.GenerativeModel) -> genai.GenerativeModel:
+        """
+        モデルがこのクライアントでリクエストを送るようにする
+
+        GenerativeModelはキーごとのクライアントを受け取る引数を持たないため、
+        内部属性の_async_clientを差し替える（SDKの内部属性に触れるのはここだけにする）。
+
+        Args:
+            model: 対象のモデル
+
+        Returns:
+            クライアントを割り当てたモデル
+
+        Raises:
+            RuntimeError: SDKの変更で_async_clientを差し替えられない場合
+        """
+        if not hasattr(model, "_async_client"):
+            # 差し替えずに送るとgenai.configureの既定のキーが使われるため、黙って続けない
+            raise RuntimeError("このバージョンのgoogle.generativeaiではAPIキーごとのクライアントを割り当てられません")
+        model._async_client = self.async_client
+        return model
+
+    async def close(self) -> None:
+        """クライアントの接続を閉じる"""
+        for client in (self._async_client, self._cache_client):
+            if client is None:
+                continue
+            try:
+                await client.transport.close()
+            except Exception as e:
+                logger.warning(f"Geminiクライアントのクローズ中にエラーが発生しました: {e}")
+        self._async_client = None
+        self._cache_client = None
+
+
+# APIキーごとのクライアント（同じキーを使うGeminiAPIインスタンス間で接続を共有する）
+_clients: Dict[str, GeminiClient] = {}
+
+def get_client(api_key: str) -> GeminiClient:
+    """
+    APIキーに対応するクライアントを取得する
+
+    Args:
+        api_key: APIキー
+
+    Returns:
+        GeminiClient
+    """
+    client = _clients.get(api_key)
+    if client is None:
+        client = GeminiClient(api_key)
+        _clients[api_key] = client
+    return client
+
+
+async def close_clients() -> None:
+    """すべてのAPIキーのクライアントの接続を閉じる（終了時に呼ぶ）"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+    if clients:
+        logger.info(f"Geminiクライアントを閉じました: {len(clients)}件")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI同時実行数の制御
+
+記事処理・質問応答・手動確認の各レーンに重みを付けて、Gemini APIの同時リクエスト数を全体で制限する
+"""
+
+import time
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# レーンごとの既定の重み（空きが出たときに、実行中の数を重みで割った値が小さいレーンを優先する）
+DEFAULT_LANE_WEIGHTS = {"ingest": 2, "interactive": 3, "manual": 1}
+
+# 現在の処理が属するレーン（タスクの生成時にコンテキストごと引き継がれる）
+current_lane: contextvars.ContextVar[str] = contextvars.ContextVar("ai_lane", default="ingest")
+
+@contextmanager
+def use_lane(lane: str) -> Iterator[None]:
+    """
+    ブロック内のAPI呼び出しを指定したレーンで実行する
+
+    Args:
+        lane: レーン名（ingest, interactive, manual）
+    """
+    token = current_lane.set(lane)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+class AIGovernor:
+    """レーンごとに重み付けしたAPI同時実行数の制御クラス
+
+    実行枠に空きがない場合は待機し、枠が空いたときは待機中のレーンのうち
+    実行中の数を重みで割った値が最も小さいレーンに割り当てる。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 6,
+        weights: Optional[Dict[str, float]] = None,
+        saturation: Optional[int] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            max_concurrency: 全レーン合計の同時実行数
+            weights: レーンごとの重み
+            saturation: レーンが飽和したとみなす待機数（指定がない場合は同時実行数）
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.weights: Dict[str, float] = dict(DEFAULT_LANE_WEIGHTS)
+        self.weights.update(weights or {})
+        self.saturation = saturation or self.max_concurrency
+        self.running: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self.completed: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self.wait_time: Dict[str, float] = {lane: 0.0 for lane in self.weights}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in self.weights}
+        self._capacity = asyncio.Event()
+
+    def _lane(self, lane: Optional[str]) -> str:
+        """レーン名を決める（未知のレーンは重み1で追加する）"""
+        lane = lane or current_lane.get()
+        if lane not in self.weights:
+            self.weights[lane] = 1
+            self.running[lane] = 0
+            self.completed[lane] = 0
+            self.wait_time[lane] = 0.0
+            self._waiting[lane] = deque()
+        return lane
+
+    @property
+    def in_flight(self) -> int:
+        """実行中のリクエスト数"""
+        return sum(self.running.values())
+
+    async def acquire(self, lane: Optional[str] = None) -> str:
+        """
+        実行枠を取得する（空きがない場合は割り当てられるまで待機する）
+
+        Args:
+            lane: レーン名（指定がない場合は現在のコンテキストのレーン）
+
+        Returns:
+            実行枠を取得したレーン名（releaseに渡す）
+        """
+        lane = self._lane(lane)
+        if self.in_flight < self.max_concurrency and not any(self._waiting.values()):
+            self.running[lane] += 1
+            return lane
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[lane].append(future)
+        self._update_capacity()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 割り当て後にキャンセルされた場合は枠を返す
+                self.release(lane)
+            elif future in self._waiting[lane]:
+                # 割り当て前にキャンセルされた場合は待ち行列から外す
+                # （キャンセル後に_dispatchが先に取り出している場合は何もしない）
+                self._waiting[lane].remove(future)
+                self._update_capacity()
+            raise
+        self.wait_time[lane] += time.monotonic() - started
+        return lane
+
+    def release(self, lane: str, completed: bool = True) -> None:
+        """
+        実行枠を返却し、待機中のレーンに割り当てる
+
+        Args:
+            lane: acquireが返したレーン名
+            completed: 処理を終えて返却するか（Falseの場合は完了数に数えない）
+        """
+        self.running[lane] = max(0, self.running[lane] - 1)
+        if completed:
+            self.completed[lane] += 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """空いた実行枠を重みに応じて待機中のレーンに割り当てる"""
+        while self.in_flight < self.max_concurrency:
+            candidates = [lane for lane, queue in self._waiting.items() if queue]
+            if not candidates:
+                break
+            lane = min(candidates, key=lambda l: ((self.running[l] + 1) / self.weights[l], -self.weights[l]))
+            future = self._waiting[lane].popleft()
+            if future.done():
+                continue
+            self.running[lane] += 1
+            future.set_result(None)
+        self._update_capacity()
+
+    def _update_capacity(self) -> None:
+        """待機数の変化をwait_for_capacityで待機中の処理に知らせる"""
+        self._capacity.set()
+
+    @asynccontextmanager
+    async def slot(self, lane: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        実行枠を取得してブロックを実行する
+
+        Args:
+            lane: レーン名（指定がない場合は現在のコンテキストのレーン）
+        """
+        acquired = await self.acquire(lane)
+        try:
+            yield acquired
+        finally:
+            self.release(acquired)
+
+    def saturated(self, lane: str) -> bool:
+        """
+        レーンが飽和しているかどうか
+
+        Args:
+            lane: レーン名
+
+        Returns:
+            待機数が飽和とみなす数以上の場合はTrue
+        """
+        return len(self._waiting.get(lane, ())) >= self.saturation
+
+    async def wait_for_capacity(self, lane: str) -> None:
+        """
+        レーンの飽和が解消されるまで待機する（取り込み側のバックプレッシャー用）
+
+        Args:
+            lane: レーン名
+        """
+        if self.saturated(lane):
+            logger.debug(f"AIレーン {lane} が飽和しているため取り込みを待機します")
+        while self.saturated(lane):
+            self._capacity.clear()
+            await self._capacity.wait()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        レーンごとの状態を取得する
+
+        Returns:
+            レーン名をキーとする、実行中・待機中・完了数・平均待機秒数の辞書
+        """
+        return {
+            lane: {
+                "running": self.running[lane],
+                "waiting": len(self._waiting[lane]),
+                "completed": self.completed[lane],
+                "avg_wait": self.wait_time[lane] / self.completed[lane] if self.completed[lane] else 0.0,
+            }
+            for lane in self.weights
+        }
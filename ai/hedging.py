@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ヘッジリクエストの制御
+
+レイテンシの分布を記録し、応答が遅いリクエストに別のキーで重複リクエストを送るかどうかを判断する
+"""
+
+import math
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class HedgePolicy:
+    """ヘッジリクエストの遅延と予算を管理するクラス
+
+    ルートごとに直近の成功したリクエストのレイテンシを保持し、その分位点（既定はp95）を
+    過ぎても応答がない場合にヘッジリクエストを送る。送信数はリクエスト数に対する
+    割合（予算）で制限し、コストが倍にならないようにする。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        quantile: float = 0.95,
+        budget: float = 0.1,
+        min_samples: int = 20,
+        window: int = 200,
+        min_delay: float = 0.5,
+    ):
+        """
+        初期化
+
+        Args:
+            enabled: ヘッジリクエストを送るか
+            quantile: ヘッジリクエストを送るまでの遅延に使うレイテンシの分位点
+            budget: リクエスト数に対するヘッジリクエストの最大割合
+            min_samples: ヘッジリクエストを送るのに必要なレイテンシの記録数
+            window: ルートごとに保持するレイテンシの記録数
+            min_delay: ヘッジリクエストを送るまでの最小の遅延（秒）
+        """
+        self.enabled = enabled
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = max(1, min_samples)
+        self.window = max(self.min_samples, window)
+        self.min_delay = min_delay
+        self._latencies: Dict[str, Deque[float]] = {}
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self.timeouts = 0
+
+    def record(self, key: str, latency: float) -> None:
+        """
+        成功したリクエストのレイテンシを記録する
+
+        Args:
+            key: ルート名（モデル名やタスク名）
+            latency: レイテンシ（秒）
+        """
+        samples = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies[key] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def delay(self, key: str) -> Optional[float]:
+        """
+        ヘッジリクエストを送るまでの遅延を取得する
+
+        Args:
+            key: ルート名
+
+        Returns:
+            遅延（秒）。無効な場合や記録が足りない場合はNone
+        """
+        samples = self._latencies.get(key)
+        if not self.enabled or not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.quantile * len(ordered)) - 1))
+        return max(self.min_delay, ordered[index])
+
+    def allow(self) -> bool:
+        """
+        予算内でヘッジリクエストを送れるか判定し、送れる場合は送信数に数える
+
+        Returns:
+            送れる場合はTrue
+        """
+        if self.hedged + 1 > self.budget * self.requests:
+            return False
+        self.hedged += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        統計情報を取得する
+
+        Returns:
+            リクエスト数、ヘッジリクエスト数、ヘッジが先に応答した数、キャンセル数、期限切れ数
+        """
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "cancelled": self.cancelled,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gemini APIキープール
+
+複数のAPIキーにリクエストを分散し、キーごとのRPM/TPM予算を管理する
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class KeyState:
+    """APIキーごとの状態"""
+
+    def __init__(self, index: int, api_key: str, rpm: float, tpm: float, clock: Callable[[], float]):
+        """
+        初期化
+
+        Args:
+            index: キーのインデックス
+            api_key: APIキー
+            rpm: 1分あたりのリクエスト数上限
+            tpm: 1分あたりのトークン数上限
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.index = index
+        self.api_key = api_key
+        self.clock = clock
+        self.rpm = TokenBucket(rpm, rpm / 60.0, clock)
+        self.tpm = TokenBucket(tpm, tpm / 60.0, clock)
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+
+    def cooling_down(self) -> bool:
+        """クールダウン中かどうか"""
+        return self.clock() < self.cooldown_until
+
+    def headroom(self) -> float:
+        """RPMとTPMのうち余裕の少ない方の残量割合（クールダウン中は0）"""
+        if self.cooling_down():
+            return 0.0
+        return min(self.rpm.fill_ratio(), self.tpm.fill_ratio())
+
+    def wait_time(self, tokens: float) -> float:
+        """このキーでリクエストを送れるようになるまでの秒数"""
+        cooldown = max(0.0, self.cooldown_until - self.clock())
+        return max(cooldown, self.rpm.time_until(1), self.tpm.time_until(tokens))
+
+
+class GeminiKeyPool:
+    """複数APIキーのプール
+
+    各リクエストをRPM/TPMの余裕が最も大きいキーに割り当て、
+    レート制限を受けたキーはRetry-Afterの指示に従って一時的に除外する。
+    """
+
+    def __init__(
+        self,
+        api_keys: Iterable[str],
+        rpm_per_key: float = 15,
+        tpm_per_key: float = 1_000_000,
+        max_in_flight_per_key: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            api_keys: APIキーのリスト
+            rpm_per_key: キーごとの1分あたりのリクエスト数上限
+            tpm_per_key: キーごとの1分あたりのトークン数上限
+            max_in_flight_per_key: キーごとの同時リクエスト数上限
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.clock = clock
+        self.max_in_flight_per_key = max(1, max_in_flight_per_key)
+        self.states: List[KeyState] = [
+            KeyState(i, key, rpm_per_key, tpm_per_key, clock) for i, key in enumerate(api_keys)
+        ]
+        self._released = asyncio.Event()
+        logger.info(f"APIキープールを初期化しました: {len(self.states)}キー")
+
+    @property
+    def keys(self) -> List[str]:
+        """プール内のAPIキー"""
+        return [state.api_key for state in self.states]
+
+    def _pick(self, tokens: float, exclude: Iterable[int]) -> Optional[KeyState]:
+        """今すぐ送信できるキーのうち最も余裕のあるものを選ぶ"""
+        excluded = set(exclude)
+        best = None
+        for state in self.states:
+            if state.index in excluded or state.cooling_down():
+                continue
+            if state.in_flight >= self.max_in_flight_per_key:
+                continue
+            if state.rpm.available() < 1 or state.tpm.available() < min(tokens, state.tpm.capacity):
+                continue
+            if best is None or (state.headroom(), -state.in_flight) > (best.headroom(), -best.in_flight):
+                best = state
+        return best
+
+    async def acquire(self, tokens: float = 0, exclude: Iterable[int] = ()) -> KeyState:
+        """
+        リクエストに使うキーを取得する
+
+        送信できるキーがない場合は、いずれかのキーが利用可能になるまで待機する。
+        使い終わったら必ずreleaseを呼ぶこと。
+
+        Args:
+            tokens: リクエストの推定トークン数
+            exclude: 除外するキーのインデックス
+
+        Returns:
+            割り当てられたキーの状態
+        """
+        while True:
+            state = self.try_acquire(tokens, exclude)
+            if state:
+                return state
+            await self.wait_for_key(tokens, exclude)
+
+    def try_acquire(self, tokens: float = 0, exclude: Iterable[int] = ()) -> Optional[KeyState]:
+        """
+        今すぐ送信できるキーがあれば取得する（待機しない）
+
+        Args:
+            tokens: リクエストの推定トークン数
+            exclude: 除外するキーのインデックス
+
+        Returns:
+            割り当てられたキーの状態（送信できるキーがない場合はNone）
+        """
+        state = self._pick(tokens, self._exclude(exclude))
+        if state:
+            state.rpm.consume(1)
+            state.tpm.consume(tokens)
+            state.in_flight += 1
+            state.requests += 1
+        return state
+
+    async def wait_for_key(self, tokens: float = 0, exclude: Iterable[int] = ()) -> None:
+        """
+        いずれかのキーが利用可能になるか、キーが返却されるまで待機する（キーは取得しない）
+
+        Args:
+            tokens: リクエストの推定トークン数
+            exclude: 除外するキーのインデックス
+        """
+        excluded = set(self._exclude(exclude))
+        candidates = [s for s in self.states if s.index not in excluded]
+        wait = min(s.wait_time(tokens) for s in candidates)
+        if all(s.in_flight >= self.max_in_flight_per_key for s in candidates):
+            wait = max(wait, 1.0)
+        self._released.clear()
+        try:
+            await asyncio.wait_for(self._released.wait(), timeout=max(0.05, min(wait, 5.0)))
+        except asyncio.TimeoutError:
+            pass
+
+    def _exclude(self, exclude: Iterable[int]) -> List[int]:
+        """除外するキーを決める（すべてのキーを除外する指定の場合は除外しない）"""
+        if not self.states:
+            raise ValueError("利用可能なAPIキーがありません")
+        exclude = list(exclude)
+        return [] if len(exclude) >= len(self.states) else exclude
+
+    def release(self, state: KeyState, estimated_tokens: float = 0, actual_tokens: Optional[float] = None) -> None:
+        """
+        キーを返却する
+
+        Args:
+            state: acquireで取得したキーの状態
+            estimated_tokens: acquire時に見積もったトークン数
+            actual_tokens: 実際に使用したトークン数（判明している場合）
+        """
+        state.in_flight = max(0, state.in_flight - 1)
+        if actual_tokens is not None:
+            state.tpm.consume(actual_tokens - estimated_tokens)
+        self._released.set()
+
+    def cooldown(self, state: KeyState, seconds: float) -> None:
+        """
+        キーをクールダウンさせる
+
+        Args:
+            state: 対象のキーの状態
+            seconds: クールダウン秒数
+        """
+        state.rate_limited += 1
+        state.cooldown_until = max(state.cooldown_until, self.clock() + seconds)
+        logger.warning(f"APIキーをクールダウンします: index={state.index}, {seconds:.1f}秒")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        各キーの状態を取得する
+
+        Returns:
+            キーごとの状態の辞書のリスト
+        """
+        return [
+            {
+                "index": state.index,
+                "headroom": state.headroom(),
+                "in_flight": state.in_flight,
+                "cooling_down": state.cooling_down(),
+                "requests": state.requests,
+                "rate_limited": state.rate_limited,
+            }
+            for state in self.states
+        ]
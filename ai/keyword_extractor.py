@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+キーワード抽出
+
+記事ストアの記事をコーパスとしたTF-IDFにより、APIを使わずに検索用キーワードを抽出する
+"""
+
+import math
+import logging
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from .text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+class KeywordExtractor:
+    """TF-IDFによるキーワード抽出クラス
+
+    文書頻度はコーパスから学習し、抽出した記事も順次コーパスに追加する。
+    日本語はカタカナ・漢字の連続部分をそのまま1語として扱う。
+    複数記事をまとめて抽出する場合は、語の出現数をNumPy配列で一括集計する。
+    """
+
+    def __init__(self, max_keywords: int = 7):
+        """
+        初期化
+
+        Args:
+            max_keywords: 1記事あたりに抽出するキーワード数
+        """
+        self.max_keywords = max_keywords
+        self.vocab: Dict[str, int] = {}
+        self.tokens: List[str] = []
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.num_docs = 0
+        self.corpus_loaded = False
+
+    def fit(self, documents: Iterable[str]) -> "KeywordExtractor":
+        """
+        コーパスから文書頻度を学習する（既存の学習結果は破棄する）
+
+        Args:
+            documents: コーパスの文書
+
+        Returns:
+            自身
+        """
+        self.vocab = {}
+        self.tokens = []
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.num_docs = 0
+        self.add_documents(documents)
+        return self
+
+    def add_documents(self, documents: Iterable[str]) -> None:
+        """
+        文書をコーパスに追加する
+
+        Args:
+            documents: 追加する文書
+        """
+        self._add_token_lists([tokenize(doc, bigrams=False) for doc in documents])
+
+    def _add_token_lists(self, token_lists: Sequence[List[str]]) -> None:
+        """分割済みの文書ごとに、出現した語の文書頻度を加算する"""
+        ids = []
+        for tokens in token_lists:
+            ids.extend(self._token_id(token) for token in set(tokens))
+        if len(self.vocab) > len(self.doc_freq):
+            self.doc_freq = np.concatenate(
+                [self.doc_freq, np.zeros(len(self.vocab) - len(self.doc_freq), dtype=np.int64)]
+            )
+        if ids:
+            self.doc_freq += np.bincount(np.asarray(ids, dtype=np.int64), minlength=len(self.vocab))
+        self.num_docs += len(token_lists)
+
+    def _token_id(self, token: str) -> int:
+        """語のIDを取得する（未知語は語彙に追加する）"""
+        index = self.vocab.get(token)
+        if index is None:
+            index = len(self.tokens)
+            self.vocab[token] = index
+            self.tokens.append(token)
+        return index
+
+    def idf(self) -> np.ndarray:
+        """語彙全体の逆文書頻度（平滑化あり）"""
+        return np.log((1 + self.num_docs) / (1 + self.doc_freq)) + 1.0
+
+    def extract(self, text: str, update: bool = True) -> List[str]:
+        """
+        テキストからキーワードを抽出する
+
+        Args:
+            text: 対象のテキスト
+            update: 抽出後にテキストをコーパスに追加するか
+
+        Returns:
+            スコアの高い順のキーワードのリスト
+        """
+        return self.extract_batch([text], update)[0]
+
+    def extract_batch(self, texts: Sequence[str], update: bool = True) -> List[List[str]]:
+        """
+        複数のテキストからまとめてキーワードを抽出する
+
+        Args:
+            texts: 対象のテキストのリスト
+            update: 抽出後にテキストをコーパスに追加するか
+
+        Returns:
+            テキストごとのキーワードのリスト
+        """
+        token_lists = [tokenize(text, bigrams=False) for text in texts]
+        known = len(self.vocab)
+
+        # (文書, 語)の組を平坦な配列にまとめて出現数を集計する
+        doc_ids = np.repeat(np.arange(len(token_lists)), [len(tokens) for tokens in token_lists])
+        token_ids = np.fromiter(
+            (self._token_id(token) for tokens in token_lists for token in tokens),
+            dtype=np.int64,
+            count=len(doc_ids),
+        )
+        results: List[List[str]] = [[] for _ in token_lists]
+        if len(token_ids) == 0:
+            if update:
+                self._add_token_lists(token_lists)
+            return results
+
+        vocab_size = len(self.vocab)
+        pairs, counts = np.unique(doc_ids * vocab_size + token_ids, return_counts=True)
+        pair_docs = pairs // vocab_size
+        pair_tokens = pairs % vocab_size
+
+        # コーパスにない語は文書頻度0として扱う
+        idf = np.full(vocab_size, math.log(1 + self.num_docs) + 1.0)
+        idf[:known] = self.idf()[:known]
+        lengths = np.bincount(doc_ids, minlength=len(token_lists))
+        scores = counts / lengths[pair_docs] * idf[pair_tokens]
+
+        # 文書ごとにスコアの高い順に並べ、上位の語を取り出す
+        order = np.lexsort((-scores, pair_docs))
+        starts = np.searchsorted(pair_docs[order], np.arange(len(token_lists)))
+        ends = np.append(starts[1:], len(order))
+        for doc, (start, end) in enumerate(zip(starts, ends)):
+            top = order[start:min(end, start + self.max_keywords)]
+            results[doc] = [self.tokens[i] for i in pair_tokens[top]]
+
+        if update:
+            self._add_token_lists(token_lists)
+        else:
+            # コーパスに追加しない場合は一時的に追加した語彙を取り除く
+            for token in self.tokens[known:]:
+                del self.vocab[token]
+            del self.tokens[known:]
+        return results
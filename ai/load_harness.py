@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI処理の負荷試験
+
+FakeGeminiBackendを使ってAPIを呼ばずにAIProcessor.process_articleを目標のRPSで実行し、
+スループットとレイテンシのp50/p99を計測する
+
+使い方:
+    python -m ai.load_harness --rps 5 --count 100 --latency-ms 800 --rate-limit-rate 0.05
+"""
+
+import os
+import copy
+import math
+import time
+import random
+import logging
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from config.default_config import DEFAULT_CONFIG
+from .ai_processor import AIProcessor
+from .backends import FakeGeminiBackend
+
+# 合成記事の本文に使う単語
+WORDS = [
+    "model", "market", "company", "developer", "phone", "research", "price", "launch", "data", "chip",
+    "cloud", "security", "update", "network", "startup", "battery", "camera", "software", "energy", "policy",
+]
+
+def make_article(rng: random.Random, index: int) -> Dict[str, Any]:
+    """
+    負荷試験用の記事を生成する（長さはモデルルーティングの区分が混ざるようにばらつかせる）
+
+    Args:
+        rng: 乱数生成器
+        index: 記事の番号
+
+    Returns:
+        記事データ
+    """
+    sentences = rng.choice([5, 20, 80, 200])
+    content = " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "."
+        for _ in range(sentences)
+    )
+    return {
+        "title": f"Load test article {index}: " + " ".join(rng.choice(WORDS) for _ in range(6)),
+        "link": f"https://example.com/load-test/{index}",
+        "content": content,
+        "feed_title": "Load Test",
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    値の分位点を求める（最近傍法）
+
+    Args:
+        values: 値のリスト
+        q: 分位点（0〜1）
+
+    Returns:
+        分位点の値（値がない場合は0）
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+async def run_load(
+    processor: AIProcessor,
+    rps: float,
+    count: int,
+    feed: Optional[Dict[str, Any]] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    目標のRPSで記事の処理を開始し、すべての完了を待って結果を集計する
+
+    処理の完了を待たずに一定間隔で開始する（オープンループ）ため、処理が追いつかない場合は
+    同時に処理中の記事が増えていく。
+
+    Args:
+        processor: AIプロセッサー
+        rps: 1秒あたりに処理を開始する記事数
+        count: 処理する記事数
+        feed: フィード情報
+        seed: 合成記事の乱数のシード
+
+    Returns:
+        記事数、成功数、失敗数、経過秒数、スループット（記事/秒）、レイテンシのp50/p99/最大（秒）
+    """
+    rng = random.Random(seed)
+    feed = feed or {"url": "https://example.com/load-test.xml", "channel_id": "0"}
+    latencies: List[float] = []
+    failures = 0
+
+    async def process(article: Dict[str, Any]) -> None:
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await processor.process_article(article, feed)
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            failures += 1
+
+    started = time.perf_counter()
+    tasks = []
+    for index in range(count):
+        # 開始予定時刻まで待機する（遅れている場合は待たずに開始する）
+        delay = started + index / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(process(make_article(rng, index))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "count": count,
+        "completed": len(latencies),
+        "failed": failures,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=0.0),
+    }
+
+
+def build_processor(args: argparse.Namespace, data_dir: str) -> AIProcessor:
+    """コマンドライン引数から負荷試験用のAIプロセッサーを生成する"""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    config.update({
+        "gemini_api_key": "",
+        "gemini_api_keys": [f"fake-key-{i + 1}" for i in range(args.keys)],
+        "ai_max_concurrency": args.concurrency,
+        "gemini_rpm_per_key": args.rpm_per_key,
+        "classify": args.classify,
+        # 同じ結果の再利用やファイルへの書き込みで計測が変わらないようにする
+        "ai_cache_enabled": False,
+        "local_classifier_path": os.path.join(data_dir, "classifier.json"),
+        "vector_index_path": os.path.join(data_dir, "vectors"),
+    })
+    backend = FakeGeminiBackend(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm_limit=args.rpm_limit,
+        seed=args.seed,
+    )
+    return AIProcessor(config, backend=backend)
+
+
+def print_report(report: Dict[str, Any], processor: AIProcessor) -> None:
+    """計測結果を表示する"""
+    print(f"記事数: {report['count']}（成功 {report['completed']}, 失敗 {report['failed']}）")
+    print(f"経過時間: {report['elapsed']:.1f}秒")
+    print(f"スループット: {report['throughput']:.2f}記事/秒")
+    print(
+        f"レイテンシ: p50 {report['p50'] * 1000:.0f}ms, p99 {report['p99'] * 1000:.0f}ms, "
+        f"最大 {report['max'] * 1000:.0f}ms"
+    )
+    backend = processor.backend.get_stats()
+    print(
+        f"APIリクエスト: {backend['requests']}回（レート制限 {backend['rate_limited']}回）, "
+        f"トークン 入力{backend['input_tokens']:,}/出力{backend['output_tokens']:,}"
+    )
+    hedge = processor.hedge_policy.get_stats()
+    print(f"ヘッジ: {hedge['hedged']}件（先に応答 {hedge['hedge_wins']}件）, 期限切れ: {hedge['timeouts']}件")
+    for lane, stats in processor.governor.snapshot().items():
+        if stats["completed"]:
+            print(f"レーン {lane}: {stats['completed']}回, 平均待機 {stats['avg_wait'] * 1000:.0f}ms")
+
+
+def main() -> None:
+    """コマンドラインから負荷試験を実行する"""
+    parser = argparse.ArgumentParser(description="APIを呼ばずにAI処理の負荷試験を行う")
+    parser.add_argument("--rps", type=float, default=2.0, help="1秒あたりに処理を開始する記事数")
+    parser.add_argument("--count", type=int, default=50, help="処理する記事数")
+    parser.add_argument("--keys", type=int, default=3, help="APIキーの数")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONFIG["ai_max_concurrency"], help="API呼び出しの同時実行数")
+    parser.add_argument("--rpm-per-key", type=int, default=DEFAULT_CONFIG["gemini_rpm_per_key"], help="キープールで確保するキーごとのRPM")
+    parser.add_argument("--latency-ms", type=float, default=800, help="応答までの時間の中央値（ミリ秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="応答までの時間の対数のばらつき")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="レート制限エラーを返す割合")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="キーごとの1分あたりのリクエスト数の上限")
+    parser.add_argument("--classify", action="store_true", help="ジャンル分類も行う")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        processor = build_processor(args, data_dir)
+        report = asyncio.run(run_load(processor, args.rps, args.count, seed=args.seed))
+        print_report(report, processor)
+
+
+if __name__ == "__main__":
+    main()
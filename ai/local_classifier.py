@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ローカルジャンル分類器
+
+記事ストアに保存された分類結果から学習する多項ナイーブベイズ分類器を提供する
+"""
+
+import os
+import json
+import math
+import random
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from utils.helpers import clean_html
+from .text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 精度レポートで評価する信頼度の閾値
+DEFAULT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+def classification_text(title: str, content: str, max_chars: int = 2000) -> str:
+    """分類に使うテキスト（タイトルと本文の先頭部分）を作成する"""
+    return f"{title or ''}\n{clean_html(content or '')[:max_chars]}"
+
+
+class LocalClassifier:
+    """多項ナイーブベイズによるジャンル分類器
+
+    学習済みモデルはJSONファイルに保存し、起動時に読み込む。
+    """
+
+    def __init__(self, model_path: Optional[str] = None, alpha: float = 1.0, autoload: bool = True):
+        """
+        初期化
+
+        Args:
+            model_path: モデルファイルのパス（指定がない場合はデフォルト）
+            alpha: ラプラス平滑化の係数
+            autoload: 保存済みのモデルを読み込むか
+        """
+        self.model_path = model_path or os.path.join("data", "classifier.json")
+        self.alpha = alpha
+        self.class_counts: Dict[str, int] = {}
+        self.token_counts: Dict[str, Dict[str, int]] = {}
+        self.total_tokens: Dict[str, int] = {}
+        self.vocab_size = 0
+        self.trained_at: Optional[str] = None
+        if autoload:
+            self.load()
+
+    @property
+    def is_trained(self) -> bool:
+        """2つ以上のカテゴリを学習済みかどうか"""
+        return len(self.class_counts) >= 2
+
+    @property
+    def samples(self) -> int:
+        """学習に使った記事数"""
+        return sum(self.class_counts.values())
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> "LocalClassifier":
+        """
+        分類器を学習する（既存の学習結果は破棄する）
+
+        Args:
+            samples: (テキスト, カテゴリ)のリスト
+
+        Returns:
+            自身
+        """
+        class_counts: Dict[str, int] = {}
+        token_counts: Dict[str, Dict[str, int]] = {}
+        vocab = set()
+        for text, label in samples:
+            class_counts[label] = class_counts.get(label, 0) + 1
+            counts = token_counts.setdefault(label, {})
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+                vocab.add(token)
+
+        self.class_counts = class_counts
+        self.token_counts = token_counts
+        self.total_tokens = {label: sum(counts.values()) for label, counts in token_counts.items()}
+        self.vocab_size = len(vocab)
+        self.trained_at = datetime.now(timezone.utc).isoformat()
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """
+        カテゴリごとの事後確率を計算する
+
+        Args:
+            text: 分類するテキスト
+
+        Returns:
+            カテゴリをキー、確率を値とする辞書（未学習の場合は空）
+        """
+        if not self.is_trained:
+            return {}
+        tokens = tokenize(text)
+        total = self.samples
+        vocab = self.vocab_size + 1
+        log_probs = {}
+        for label, count in self.class_counts.items():
+            counts = self.token_counts.get(label, {})
+            denominator = math.log(self.total_tokens.get(label, 0) + self.alpha * vocab)
+            score = math.log(count / total)
+            for token in tokens:
+                score += math.log(counts.get(token, 0) + self.alpha) - denominator
+            log_probs[label] = score
+
+        # 対数尤度をソフトマックスで確率に変換する
+        best = max(log_probs.values())
+        exp = {label: math.exp(score - best) for label, score in log_probs.items()}
+        norm = sum(exp.values())
+        return {label: value / norm for label, value in exp.items()}
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        最も確率の高いカテゴリを予測する
+
+        Args:
+            text: 分類するテキスト
+
+        Returns:
+            (カテゴリ, 信頼度)（未学習の場合は(None, 0.0)）
+        """
+        proba = self.predict_proba(text)
+        if not proba:
+            return None, 0.0
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+
+    def save(self) -> None:
+        """モデルをファイルに保存する"""
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        data = {
+            "alpha": self.alpha,
+            "class_counts": self.class_counts,
+            "token_counts": self.token_counts,
+            "vocab_size": self.vocab_size,
+            "trained_at": self.trained_at,
+        }
+        tmp_path = f"{self.model_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.model_path)
+        logger.info(f"ローカル分類器を保存しました: {self.model_path}")
+
+    def load(self) -> bool:
+        """
+        保存されたモデルを読み込む
+
+        Returns:
+            読み込めた場合はTrue
+        """
+        if not os.path.exists(self.model_path):
+            return False
+        try:
+            with open(self.model_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.alpha = data.get("alpha", self.alpha)
+            self.class_counts = data.get("class_counts", {})
+            self.token_counts = data.get("token_counts", {})
+            self.total_tokens = {label: sum(counts.values()) for label, counts in self.token_counts.items()}
+            self.vocab_size = data.get("vocab_size", 0)
+            self.trained_at = data.get("trained_at")
+            logger.info(f"ローカル分類器を読み込みました: {self.model_path} ({self.samples}件)")
+            return True
+        except Exception as e:
+            logger.error(f"ローカル分類器の読み込み中にエラーが発生しました: {e}", exc_info=True)
+            return False
+
+
+def evaluate_thresholds(
+    samples: Sequence[Tuple[str, str]],
+    thresholds: Iterable[float] = DEFAULT_THRESHOLDS,
+    holdout: float = 0.2,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    ホールドアウト検証で閾値ごとの正解率と削減できるAPI呼び出しの割合を評価する
+
+    Args:
+        samples: (テキスト, カテゴリ)のリスト
+        thresholds: 評価する信頼度の閾値
+        holdout: 評価に使う記事の割合
+        seed: 分割に使う乱数シード
+
+    Returns:
+        {"train", "test", "accuracy", "thresholds": [{"threshold", "coverage", "accuracy"}]}
+        coverageはローカルで分類できる（API呼び出しを省略できる）記事の割合
+    """
+    # 同じテキストが学習用と評価用の両方に入らないように重複を除いてから分割する
+    unique: Dict[str, Tuple[str, str]] = {}
+    for text, label in samples:
+        unique.setdefault(text, (text, label))
+    samples = list(unique.values())
+    random.Random(seed).shuffle(samples)
+    test_size = max(1, int(len(samples) * holdout))
+    test, train = samples[:test_size], samples[test_size:]
+
+    model = LocalClassifier(autoload=False).fit(train)
+    predictions = [(model.predict(text), label) for text, label in test]
+
+    rows = []
+    for threshold in thresholds:
+        covered = [(pred, label) for (pred, conf), label in predictions if conf >= threshold]
+        correct = sum(1 for pred, label in covered if pred == label)
+        rows.append({
+            "threshold": threshold,
+            "coverage": len(covered) / len(test) if test else 0.0,
+            "accuracy": correct / len(covered) if covered else 0.0,
+        })
+
+    overall = sum(1 for (pred, _), label in predictions if pred == label)
+    return {
+        "train": len(train),
+        "test": len(test),
+        "accuracy": overall / len(test) if test else 0.0,
+        "thresholds": rows,
+    }
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+モデルルーティング
+
+タスクと記事の長さに応じて使用するモデルを選び、ルートごとのレイテンシとトークン数を集計する
+"""
+
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .text_utils import estimate_tokens
+from .usage import usage_context
+
+logger = logging.getLogger(__name__)
+
+# ルーティングできるタスク
+ROUTE_TASKS = ("title", "summary", "classify", "keywords", "search_keywords", "qa", "digest")
+
+# 記事の長さの区分
+SIZE_CLASSES = ("short", "medium", "long")
+
+def route_text(title: str, content: str) -> str:
+    """
+    タイトルと本文から、モデルの選択とAI処理結果キャッシュのキーに使うテキストを作る
+
+    呼び出しのルーティングとキャッシュのモデル名で同じテキストを使い、長さの区分を一致させる。
+
+    Args:
+        title: 記事タイトル
+        content: 記事内容
+
+    Returns:
+        タイトルと本文を改行でつないだテキスト
+    """
+    return f"{title}\n{content}"
+
+
+def unwrap_api(api: Any) -> Any:
+    """ルーティング用のラッパーを外した元のAPIインスタンスを取得する"""
+    return api.api if isinstance(api, RoutedAPI) else api
+
+
+class RoutedAPI:
+    """ルートごとにレイテンシとトークン数を記録するAPIラッパー
+
+    generate_textとstream_text以外の属性は元のAPIインスタンスのものを使う。
+    """
+
+    def __init__(
+        self, api: Any, route: str, model: str, stats: Dict[str, float], timeout: Optional[float] = None
+    ):
+        """
+        初期化
+
+        Args:
+            api: 元のAPIインスタンス（GeminiAPI）
+            route: ルート名（タスク/長さの区分）
+            model: モデル名
+            stats: 集計先の辞書
+            timeout: タスクの期限（秒、呼び出し時に指定がない場合に使う）
+        """
+        self.api = api
+        self.route = route
+        self.model = model
+        self.stats = stats
+        self.timeout = timeout
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.api, name)
+
+    def _record(self, started: float, prompt: str, text: Optional[str]) -> None:
+        """呼び出し1回分の結果を集計する（textがNoneの場合は失敗）"""
+        self.stats["calls"] += 1
+        self.stats["latency"] += time.perf_counter() - started
+        self.stats["input_tokens"] += estimate_tokens(prompt)
+        if text is None:
+            self.stats["errors"] += 1
+        else:
+            self.stats["output_tokens"] += estimate_tokens(text)
+
+    async def generate_text(self, prompt: str, *args: Any, **kwargs: Any) -> str:
+        """テキストを生成する（GeminiAPI.generate_textと同じ引数、期限とレイテンシはルートごと）"""
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("latency_key", self.route)
+        started = time.perf_counter()
+        text = None
+        try:
+            text = await self.api.generate_text(prompt, *args, **kwargs)
+            return text
+        finally:
+            self._record(started, prompt, text)
+
+    async def stream_text(self, prompt: str, *args: Any, **kwargs: Any) -> str:
+        """テキストをストリーミングで生成する（GeminiAPI.stream_textと同じ引数、期限と使用量のタスク名はルートごと）"""
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        text = None
+        try:
+            with usage_context(task=self.route):
+                text = await self.api.stream_text(prompt, *args, **kwargs)
+            return text
+        finally:
+            self._record(started, prompt, text)
+
+
+class ModelRouter:
+    """タスクと記事の長さからモデルを選ぶクラス
+
+    ルーティング表は「タスク」または「タスク:長さの区分」をキー、モデル名を値とし、
+    「タスク:長さの区分」、「タスク」、タスクごとの既定値、既定のモデルの順に参照する。
+    長さの区分は対象テキストの推定トークン数で決める。
+    """
+
+    def __init__(
+        self,
+        default_model: str,
+        api_factory: Callable[[str], Any],
+        routes: Optional[Dict[str, str]] = None,
+        short_tokens: int = 500,
+        long_tokens: int = 3000,
+        task_defaults: Optional[Dict[str, str]] = None,
+        apis: Optional[Dict[str, Any]] = None,
+        deadlines: Optional[Dict[str, float]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            default_model: ルートが設定されていないタスクに使うモデル
+            api_factory: モデル名からAPIインスタンスを生成する関数（キープールは共有する）
+            routes: ルーティング表
+            short_tokens: これ未満のテキストをshortとするトークン数
+            long_tokens: これ以上のテキストをlongとするトークン数
+            task_defaults: タスクごとの既定のモデル（ルーティング表より優先度が低い）
+            apis: 生成済みのAPIインスタンス（モデル名をキーとする）
+            deadlines: タスクごとの期限（秒）
+        """
+        self.default_model = default_model
+        self.api_factory = api_factory
+        self.task_defaults = dict(task_defaults or {})
+        self.deadlines = dict(deadlines or {})
+        self.routes: Dict[str, str] = {}
+        self.short_tokens = short_tokens
+        self.long_tokens = long_tokens
+        self._apis: Dict[str, Any] = dict(apis or {})
+        self._wrappers: Dict[Tuple[str, str], RoutedAPI] = {}
+        self._stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.update(routes or {})
+
+    def update(
+        self,
+        routes: Dict[str, str],
+        short_tokens: Optional[int] = None,
+        long_tokens: Optional[int] = None,
+    ) -> None:
+        """
+        ルーティング表と長さの区分を更新する
+
+        Args:
+            routes: ルーティング表
+            short_tokens: shortとするトークン数の上限
+            long_tokens: longとするトークン数の下限
+        """
+        self.routes = {key: model for key, model in routes.items() if model}
+        if short_tokens is not None:
+            self.short_tokens = short_tokens
+        if long_tokens is not None:
+            self.long_tokens = long_tokens
+        logger.info(f"モデルルーティングを更新しました: {self.routes}")
+
+    def size_class(self, text: Optional[str]) -> Optional[str]:
+        """
+        テキストの長さの区分を判定する
+
+        Args:
+            text: 対象のテキスト（Noneの場合は区分なし）
+
+        Returns:
+            short, medium, longのいずれか
+        """
+        if text is None:
+            return None
+        tokens = estimate_tokens(text)
+        if tokens < self.short_tokens:
+            return "short"
+        if tokens >= self.long_tokens:
+            return "long"
+        return "medium"
+
+    def model_for(self, task: str, text: Optional[str] = None) -> str:
+        """
+        タスクとテキストに使うモデルを選ぶ
+
+        Args:
+            task: タスク名
+            text: 対象のテキスト（長さで区分しない場合はNone）
+
+        Returns:
+            モデル名
+        """
+        size = self.size_class(text)
+        if size and f"{task}:{size}" in self.routes:
+            return self.routes[f"{task}:{size}"]
+        return self.routes.get(task) or self.task_defaults.get(task) or self.default_model
+
+    def api_for(self, task: str, text: Optional[str] = None) -> RoutedAPI:
+        """
+        タスクとテキストに使うAPIインスタンスを取得する
+
+        Args:
+            task: タスク名
+            text: 対象のテキスト（長さで区分しない場合はNone）
+
+        Returns:
+            ルートごとに集計するAPIラッパー
+        """
+        size = self.size_class(text)
+        route = f"{task}/{size}" if size else task
+        model = self.model_for(task, text)
+        key = (route, model)
+        wrapper = self._wrappers.get(key)
+        if wrapper is None:
+            api = self._apis.get(model)
+            if api is None:
+                api = self._apis[model] = self.api_factory(model)
+            stats = self._stats.setdefault(
+                key, {"calls": 0, "errors": 0, "latency": 0.0, "input_tokens": 0, "output_tokens": 0}
+            )
+            wrapper = self._wrappers[key] = RoutedAPI(api, route, model, stats, self.deadlines.get(task))
+        return wrapper
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """
+        ルートごとの統計情報を取得する
+
+        Returns:
+            ルート、モデル、呼び出し数、失敗数、平均レイテンシ（秒）、入出力の推定トークン数のリスト
+        """
+        return [
+            {
+                "route": route,
+                "model": model,
+                "calls": int(stats["calls"]),
+                "errors": int(stats["errors"]),
+                "avg_latency": stats["latency"] / stats["calls"] if stats["calls"] else 0.0,
+                "input_tokens": int(stats["input_tokens"]),
+                "output_tokens": int(stats["output_tokens"]),
+            }
+            for (route, model), stats in sorted(self._stats.items())
+            if stats["calls"]
+        ]
+
+    @staticmethod
+    def parse_routes(text: str) -> Dict[str, str]:
+        """
+        「タスク[:長さの区分]=モデル」の行からルーティング表を作る
+
+        Args:
+            text: 1行に1ルートのテキスト
+
+        Returns:
+            ルーティング表
+
+        Raises:
+            ValueError: 書式、タスク名、長さの区分が正しくない場合
+        """
+        routes: Dict[str, str] = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            key, sep, model = (part.strip() for part in line.partition("="))
+            if not sep or not model:
+                raise ValueError(f"「タスク[:長さ]=モデル」の形式ではありません: {line}")
+            task, _, size = key.partition(":")
+            if task not in ROUTE_TASKS:
+                raise ValueError(f"不明なタスクです: {task}（{', '.join(ROUTE_TASKS)}）")
+            if size and size not in SIZE_CLASSES:
+                raise ValueError(f"不明な長さの区分です: {size}（{', '.join(SIZE_CLASSES)}）")
+            routes[key] = model
+        return routes
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+処理パイプライン
+
+依存関係のあるAI処理ステージを並行に実行し、ステージごとの処理時間を記録する
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class StageGraph:
+    """ステージの依存グラフ
+
+    各ステージは依存先のステージがすべて完了してから実行される。
+    依存関係のないステージは並行に実行され、共有セマフォで同時実行数を制限する。
+    失敗したステージに依存するステージは実行されない。
+    """
+
+    def __init__(self, semaphore: Optional[asyncio.Semaphore] = None):
+        """
+        初期化
+
+        Args:
+            semaphore: ステージ実行時に取得するセマフォ（複数のグラフで共有可能）
+        """
+        self.semaphore = semaphore
+        self.stages: Dict[str, Tuple[Callable[[Dict[str, Any]], Awaitable[Any]], List[str]]] = {}
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.spans: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Any]], deps: Iterable[str] = ()) -> None:
+        """
+        ステージを追加する
+
+        Args:
+            name: ステージ名
+            func: 依存先の結果を受け取り、結果を返すコルーチン関数
+            deps: 依存するステージ名
+        """
+        deps = list(deps)
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"未定義のステージに依存しています: {name} -> {dep}")
+        self.stages[name] = (func, deps)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        すべてのステージを実行する
+
+        Returns:
+            ステージ名をキー、結果を値とする辞書（失敗したステージはerrorsに格納）
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> None:
+            func, deps = self.stages[name]
+            if deps:
+                await asyncio.gather(*(tasks[dep] for dep in deps))
+            failed = [dep for dep in deps if dep in self.errors or dep not in self.results]
+            if failed:
+                self.errors[name] = RuntimeError(f"依存ステージが失敗しました: {', '.join(failed)}")
+                return
+
+            if self.semaphore:
+                await self.semaphore.acquire()
+            start = time.perf_counter()
+            try:
+                self.results[name] = await func({dep: self.results[dep] for dep in deps})
+            except Exception as e:
+                logger.warning(f"ステージ「{name}」でエラーが発生しました: {e}")
+                self.errors[name] = e
+            finally:
+                self.spans[name] = (start, time.perf_counter())
+                if self.semaphore:
+                    self.semaphore.release()
+
+        # 追加順（依存先が先）にタスクを作成する
+        for name in self.stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+        await asyncio.gather(*tasks.values())
+        return self.results
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """ステージごとの処理時間（秒）"""
+        return {name: end - start for name, (start, end) in self.spans.items()}
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        クリティカルパスを取得する
+
+        最後に完了したステージから、最も遅く完了した依存先を順にたどる。
+
+        Returns:
+            (ステージ名のリスト, パス全体の所要時間)
+        """
+        if not self.spans:
+            return [], 0.0
+        first_start = min(start for start, _ in self.spans.values())
+        name = max(self.spans, key=lambda n: self.spans[n][1])
+        last_end = self.spans[name][1]
+        path = [name]
+        while True:
+            deps = [dep for dep in self.stages[name][1] if dep in self.spans]
+            if not deps:
+                break
+            name = max(deps, key=lambda n: self.spans[n][1])
+            path.append(name)
+        path.reverse()
+        return path, last_end - first_start
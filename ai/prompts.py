@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+プロンプトの登録簿
+
+AI処理で使うプロンプトをIDとバージョン付きのテンプレートとして管理する。
+テンプレートは登録時に解析しておき、呼び出しごとの組み立てと固定部分のトークン数の見積もりを軽くする。
+結果キャッシュのキーと使用量の記録にはテンプレートのバージョンを使うため、
+文言を変更した場合は新しいバージョンとして登録する（設定で使うバージョンを切り替えて比較できる）。
+"""
+
+import string
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 要約タイプごとの指示文（summaryとsummary_batchのテンプレートに埋め込む。変更時は両方のバージョンを更新する）
+SUMMARY_INSTRUCTIONS = {
+    "title": "次のタイトルを日本語に翻訳してください。",
+    "short": "次の文章を日本語で2〜3文、100文字以内で要約してください。",
+    "long": "次の文章を日本語で詳細に500文字以内で要約してください。読みやすいように適度に改行してください。",
+    "normal": "次の文章を日本語で200文字以内で要約してください。読みやすいように適度に改行してください。",
+}
+
+class PromptTemplate:
+    """IDとバージョン付きのプロンプトテンプレート
+
+    テンプレートはstr.formatと同じ「{名前}」の書式で、書式指定や変換は使えない。
+    """
+
+    def __init__(self, prompt_id: str, version: str, template: str, description: str = ""):
+        """
+        初期化（テンプレートを固定部分と埋め込む値の並びに解析する）
+
+        Args:
+            prompt_id: プロンプトのID
+            version: バージョン
+            template: テンプレート
+            description: 説明
+
+        Raises:
+            ValueError: 書式指定や位置指定の値を含む場合
+        """
+        self.id = prompt_id
+        self.version = str(version)
+        self.template = template
+        self.description = description
+        self._segments: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if field is not None and (not field or field.isdigit() or spec or conversion):
+                raise ValueError(f"プロンプトテンプレートの書式が不正です: {prompt_id}: {{{field}}}")
+            self._segments.append((literal, field))
+        self.fields = tuple(dict.fromkeys(field for _, field in self._segments if field))
+        # 埋め込む値を除いた固定部分の推定トークン数
+        self.base_tokens = estimate_tokens("".join(literal for literal, _ in self._segments))
+
+    @property
+    def key(self) -> str:
+        """使用量の記録などに使う「ID@バージョン」の文字列"""
+        return f"{self.id}@{self.version}"
+
+    def render(self, **values: Any) -> str:
+        """
+        値を埋め込んでプロンプトを組み立てる
+
+        Args:
+            values: テンプレートの値
+
+        Returns:
+            プロンプト
+
+        Raises:
+            KeyError: テンプレートの値が足りない場合
+        """
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise KeyError(f"プロンプト{self.key}の値が足りません: {', '.join(missing)}")
+        return "".join(
+            literal + (str(values[field]) if field else "") for literal, field in self._segments
+        )
+
+    def estimate_tokens(self, **values: Any) -> int:
+        """
+        プロンプトを組み立てずにトークン数を見積もる
+
+        Args:
+            values: テンプレートの値（省略した値は0トークンとして数える）
+
+        Returns:
+            推定トークン数
+        """
+        return self.base_tokens + sum(estimate_tokens(str(values[field])) for field in self.fields if field in values)
+
+
+# 組み込みのプロンプト
+BUILTIN_PROMPTS = [
+    PromptTemplate(
+        "summary_system", "1",
+        "あなたは日本語編集者です。要点を抽出し、日本語のみで短くまとめます。"
+        "長文は読みやすいように適度に改行してください。",
+        "要約・翻訳・ダイジェストのシステムインストラクション",
+    ),
+    PromptTemplate(
+        "summary", "1",
+        "{instruction}\n\n{text}\n\n{label}",
+        "記事本文の要約とタイトルの翻訳",
+    ),
+    PromptTemplate(
+        "summary_batch", "1",
+        "以下の{count}件について、それぞれ個別に処理してください。{instruction}\n"
+        "各項目は「[[番号]]」の行で始まります。出力も同じ形式で、各項目の「[[番号]]」の行に続けて"
+        "{what}結果のみを書いてください。\n\n{blocks}",
+        "複数記事の要約とタイトルの翻訳（1回のリクエスト）",
+    ),
+    PromptTemplate(
+        "digest", "1",
+        "以下の{count}件の記事から日本語のダイジェストを作成してください。\n"
+        "最初に「[[0]]」の行に続けて、全体の要点を2〜3文で書いてください。\n"
+        "続いて各記事の「[[番号]]」の行に続けて、1行目に日本語のタイトル、"
+        "2行目以降に{item_length}文字以内の要約を書いてください。\n\n{blocks}",
+        "フィードのダイジェスト",
+    ),
+    PromptTemplate(
+        "digest_item", "1",
+        "[[{number}]]\nタイトル: {title}\n{content}",
+        "ダイジェストの記事1件分",
+    ),
+    PromptTemplate(
+        "classify", "1",
+        "\n次の記事のジャンルを以下のカテゴリから最も適切なもの一つだけ選んでください:\n{categories}\n\n"
+        "記事:\n{text}\n\n"
+        "出力は選んだカテゴリ名のみを英語で一語だけ返してください。余計な説明や句読点、改行は不要です。\n",
+        "ジャンル分類",
+    ),
+    PromptTemplate(
+        "keywords", "1",
+        "You are a data indexer. Analyze the following article and extract the 5-7 most important and representative keywords in English. "
+        "The keywords should be suitable for later searching. Output them as a single, comma-separated string.\n\n"
+        "Title: {title}\n\nContent:\n{content}",
+        "保存用の検索キーワード抽出",
+    ),
+    PromptTemplate(
+        "search_keywords", "1",
+        "You are a search query expert. Extract up to 5 important English keywords from the user's question and the original article to find related information."
+        "\n\nTitle: {title}\n\nContent:\n{content}\n\nQuestion: {question}\n\nKeywords:",
+        "質問からの検索キーワード生成",
+    ),
+    PromptTemplate(
+        "qa_context", "1",
+        "You are an expert news commentator. Based on the following articles, please answer the user's question in Japanese.\n\n"
+        "**Main Article:**\nTitle: {title}\nContent: {content}\n\n"
+        "**Related Articles:**\n{related}\n\n",
+        "質問応答の共通部分（コンテキストキャッシュに登録する）",
+    ),
+    PromptTemplate(
+        "qa_related_item", "1",
+        "{number}. Title: {title}\n   Content: {content}",
+        "質問応答の関連記事1件分",
+    ),
+    PromptTemplate(
+        "qa_question", "1",
+        "**User's Question:**\n{question}\n\n**Answer (in Japanese):**",
+        "質問応答の質問部分",
+    ),
+]
+
+
+class PromptRegistry:
+    """プロンプトテンプレートの登録簿
+
+    同じIDに複数のバージョンを登録でき、使うバージョンは設定で選ぶ（指定がない場合は最後に登録したもの）。
+    """
+
+    def __init__(
+        self,
+        templates: Optional[List[PromptTemplate]] = None,
+        versions: Optional[Dict[str, str]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            templates: 登録するテンプレート（指定がない場合は組み込みのプロンプト）
+            versions: プロンプトIDごとに使うバージョン（A/B比較用）
+        """
+        self._templates: Dict[str, Dict[str, PromptTemplate]] = {}
+        self._active: Dict[str, str] = {}
+        for template in BUILTIN_PROMPTS if templates is None else templates:
+            self.register(template)
+        for prompt_id, version in (versions or {}).items():
+            self.select(prompt_id, version)
+
+    def register(self, template: PromptTemplate, activate: bool = True) -> None:
+        """
+        テンプレートを登録する
+
+        Args:
+            template: テンプレート
+            activate: 登録したバージョンを使うか
+        """
+        self._templates.setdefault(template.id, {})[template.version] = template
+        if activate or template.id not in self._active:
+            self._active[template.id] = template.version
+
+    def select(self, prompt_id: str, version: str) -> bool:
+        """
+        使うバージョンを選ぶ
+
+        Args:
+            prompt_id: プロンプトのID
+            version: バージョン
+
+        Returns:
+            選べた場合はTrue（登録されていない場合は現在のバージョンのまま）
+        """
+        version = str(version)
+        if version not in self._templates.get(prompt_id, {}):
+            logger.warning(f"登録されていないプロンプトのバージョンです: {prompt_id}@{version}")
+            return False
+        self._active[prompt_id] = version
+        return True
+
+    def get(self, prompt_id: str) -> PromptTemplate:
+        """
+        使うバージョンのテンプレートを取得する
+
+        Raises:
+            KeyError: 登録されていないIDの場合
+        """
+        if prompt_id not in self._active:
+            raise KeyError(f"登録されていないプロンプトです: {prompt_id}")
+        return self._templates[prompt_id][self._active[prompt_id]]
+
+    def render(self, prompt_id: str, **values: Any) -> str:
+        """使うバージョンのテンプレートに値を埋め込んでプロンプトを組み立てる"""
+        return self.get(prompt_id).render(**values)
+
+    def version(self, *prompt_ids: str) -> str:
+        """
+        結果キャッシュのキーに使うバージョンを取得する
+
+        Args:
+            prompt_ids: 結果に影響するプロンプトのID（複数の場合は「.」でつなぐ）
+
+        Returns:
+            バージョン
+        """
+        return ".".join(self.get(prompt_id).version for prompt_id in prompt_ids)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        登録されているプロンプトの一覧を取得する
+
+        Returns:
+            プロンプトIDごとの使うバージョン、登録されているバージョン、固定部分の推定トークン数
+        """
+        return {
+            prompt_id: {
+                "version": self._active[prompt_id],
+                "versions": list(versions),
+                "base_tokens": versions[self._active[prompt_id]].base_tokens,
+            }
+            for prompt_id, versions in self._templates.items()
+        }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+質問応答キャッシュ
+
+同じ記事への同じ質問の回答を短時間キャッシュし、処理中の同じ質問は1回の処理にまとめる
+"""
+
+import re
+import time
+import asyncio
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 質問の末尾から取り除く記号
+TRAILING_PUNCT_RE = re.compile(r"[\s?？!！。．.、,，…]+$")
+
+class QACache:
+    """質問応答の回答キャッシュと処理中リクエストのまとめ"""
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            ttl: 回答を保持する秒数（0以下でキャッシュせず、処理中のまとめのみ行う）
+            max_entries: 保持する最大エントリ数（超過分は最終参照が古い順に削除）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.clock = clock
+        self._answers: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """
+        キャッシュキー用に質問を正規化する
+
+        Unicode正規化、空白の統一、小文字化、末尾の記号の除去を行う。
+        """
+        text = unicodedata.normalize("NFKC", question or "")
+        text = re.sub(r"\s+", " ", text).strip().lower()
+        return TRAILING_PUNCT_RE.sub("", text)
+
+    def _get(self, key: Tuple[str, str]) -> Optional[str]:
+        """期限内のキャッシュされた回答を取得する"""
+        entry = self._answers.get(key)
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at <= self.clock():
+            del self._answers[key]
+            return None
+        self._answers.move_to_end(key)
+        return answer
+
+    def _set(self, key: Tuple[str, str], answer: str) -> None:
+        """回答をキャッシュする"""
+        if self.ttl <= 0:
+            return
+        self._answers[key] = (self.clock() + self.ttl, answer)
+        self._answers.move_to_end(key)
+        while len(self._answers) > self.max_entries:
+            self._answers.popitem(last=False)
+
+    async def get_or_create(
+        self,
+        message_id: str,
+        question: str,
+        factory: Callable[[], Awaitable[Tuple[str, bool]]],
+    ) -> str:
+        """
+        キャッシュされた回答を取得し、なければ生成する
+
+        同じ記事への同じ質問が処理中の場合は、その結果を待って共有する。
+
+        Args:
+            message_id: 質問対象の記事のメッセージID
+            question: 質問
+            factory: 回答と、その回答をキャッシュしてよいかを返すコルーチン関数
+
+        Returns:
+            回答
+        """
+        key = (str(message_id), self.normalize_question(question))
+        answer = self._get(key)
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # 待っている側がキャンセルされても処理中の回答生成は止めない
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            answer, cacheable = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 待っている側がいない場合に「取得されなかった例外」の警告を出さない
+            future.exception()
+            raise
+        else:
+            if cacheable:
+                self._set(key, answer)
+            future.set_result(answer)
+            return answer
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            ヒット数、まとめた数、生成数、ヒット率、エントリ数
+        """
+        total = self.hits + self.coalesced + self.misses
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+            "entries": len(self._answers),
+        }
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI処理結果キャッシュ
+
+記事内容のハッシュをキーにAI処理結果（要約、タイトル翻訳、分類、キーワード）を永続化する
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import sqlite3
+import asyncio
+import unicodedata
+from typing import Dict, Any, Optional
+
+from utils.helpers import clean_html
+
+logger = logging.getLogger(__name__)
+
+class AIResultCache:
+    """AI処理結果のコンテンツアドレスキャッシュ"""
+
+    def __init__(
+        self,
+        db_path: str = None,
+        max_entries: int = 5000,
+        max_age_days: int = 30,
+        evict_interval: int = 50,
+    ):
+        """
+        初期化
+
+        Args:
+            db_path: データベースファイルのパス（指定がない場合はデフォルト）
+            max_entries: 保持する最大エントリ数（超過分は最終参照が古い順に削除）
+            max_age_days: エントリの最大保持日数
+            evict_interval: 何回の書き込みごとに削除処理を行うか
+        """
+        self.db_path = db_path or os.path.join("data", "ai_cache.db")
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.evict_interval = max(1, evict_interval)
+        self.lock = asyncio.Lock()  # 同時アクセス防止用ロック
+
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+        self._init_db()
+        self._evict()
+
+    def _init_db(self) -> None:
+        """データベースを初期化する"""
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS ai_results (
+                        cache_key TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_results_access ON ai_results (last_access)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_results_created ON ai_results (created_at)')
+                conn.commit()
+            finally:
+                conn.close()
+            logger.info(f"AI結果キャッシュを初期化しました: {self.db_path}")
+        except Exception as e:
+            logger.error(f"AI結果キャッシュの初期化中にエラーが発生しました: {e}", exc_info=True)
+
+    @staticmethod
+    def normalize_content(content: str) -> str:
+        """
+        キャッシュキー用にコンテンツを正規化する
+
+        HTMLタグの除去、Unicode正規化、空白の統一、小文字化を行い、
+        配信元ごとの体裁の違いを吸収する。
+        """
+        text = clean_html(content or "")
+        text = unicodedata.normalize("NFKC", text)
+        text = re.sub(r"\s+", " ", text).strip()
+        return text.lower()
+
+    @classmethod
+    def make_key(cls, kind: str, content: str, variant: str, model: str, prompt_version: str) -> str:
+        """
+        キャッシュキーを生成する
+
+        Args:
+            kind: 結果の種類（summary, title, category, keywords）
+            content: 処理対象のコンテンツ
+            variant: 要約タイプなどの処理バリエーション
+            model: 使用モデル名
+            prompt_version: プロンプトのバージョン
+
+        Returns:
+            SHA-256ハッシュ
+        """
+        normalized = cls.normalize_content(content)
+        material = "\x1f".join([kind, variant or "", model or "", str(prompt_version), normalized])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(
+        self, kind: str, content: str, variant: str, model: str, prompt_version: str
+    ) -> Optional[str]:
+        """
+        キャッシュされた結果を取得する
+
+        Returns:
+            キャッシュされた値、存在しない場合はNone
+        """
+        key = self.make_key(kind, content, variant, model, prompt_version)
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                value = await loop.run_in_executor(None, lambda: self._get(key))
+            except Exception as e:
+                logger.error(f"AI結果キャッシュの取得中にエラーが発生しました: {e}", exc_info=True)
+                value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.debug(f"AI結果キャッシュにヒットしました: {kind}")
+        return value
+
+    def _get(self, key: str) -> Optional[str]:
+        """キャッシュから値を取得する（同期処理）"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cutoff = time.time() - self.max_age_days * 86400
+            row = conn.execute(
+                'SELECT value FROM ai_results WHERE cache_key = ? AND created_at >= ?',
+                (key, cutoff),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE ai_results SET last_access = ? WHERE cache_key = ?', (time.time(), key))
+            conn.commit()
+            return row[0]
+        finally:
+            conn.close()
+
+    async def set(
+        self, kind: str, content: str, variant: str, model: str, prompt_version: str, value: str
+    ) -> None:
+        """
+        結果をキャッシュに保存する
+
+        Args:
+            value: 保存する値
+        """
+        key = self.make_key(kind, content, variant, model, prompt_version)
+        async with self.lock:
+            try:
+                self._writes += 1
+                evict = self._writes % self.evict_interval == 0
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, lambda: self._set(key, kind, value, evict))
+            except Exception as e:
+                logger.error(f"AI結果キャッシュの保存中にエラーが発生しました: {e}", exc_info=True)
+
+    def _set(self, key: str, kind: str, value: str, evict: bool) -> None:
+        """キャッシュに値を保存する（同期処理）"""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO ai_results (cache_key, kind, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, kind, value, now, now),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        if evict:
+            self._evict()
+
+    def _evict(self) -> int:
+        """
+        期限切れおよび上限超過のエントリを削除する（同期処理）
+
+        Returns:
+            削除されたエントリ数
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cutoff = time.time() - self.max_age_days * 86400
+                cursor = conn.execute('DELETE FROM ai_results WHERE created_at < ?', (cutoff,))
+                deleted = cursor.rowcount
+                cursor = conn.execute(
+                    'DELETE FROM ai_results WHERE cache_key IN ('
+                    'SELECT cache_key FROM ai_results ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,),
+                )
+                deleted += cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            if deleted:
+                logger.info(f"AI結果キャッシュから{deleted}件を削除しました")
+            return deleted
+        except Exception as e:
+            logger.error(f"AI結果キャッシュの削除処理中にエラーが発生しました: {e}", exc_info=True)
+            return 0
+
+    def _count(self) -> int:
+        """エントリ数を取得する（同期処理）"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM ai_results').fetchone()[0]
+        finally:
+            conn.close()
+
+    @property
+    def hit_rate(self) -> float:
+        """キャッシュヒット率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報を取得する
+
+        Returns:
+            ヒット数、ミス数、ヒット率、エントリ数の辞書
+        """
+        try:
+            entries = self._count()
+        except Exception:
+            entries = 0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": entries,
+        }
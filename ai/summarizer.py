@@ -9,38 +9,68 @@
 
 import logging
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, List
 
 from .gemini_api import GeminiAPI
+from .model_router import ModelRouter, unwrap_api
 
 from .simple_summarizer import simple_summarize
+from .text_utils import estimate_tokens, PromptBudget
+from .prompts import PromptRegistry, PromptTemplate, SUMMARY_INSTRUCTIONS
+from .usage import usage_context
 
 logger = logging.getLogger(__name__)
 
+# バッチ要約で記事の区切りに使うマーカー
+BATCH_MARKER_RE = re.compile(r"^\s*\[\[(\d+)\]\]\s*$", re.MULTILINE)
+
 class Summarizer:
     """要約クラス"""
     
-    def __init__(self, api, system_instruction: Optional[str] = None):
+    def __init__(
+        self,
+        api,
+        system_instruction: Optional[str] = None,
+        fallback_summarize: Callable[[str, int], str] = simple_summarize,
+        budget: Optional[PromptBudget] = None,
+        router: Optional[ModelRouter] = None,
+        prompts: Optional[PromptRegistry] = None,
+    ):
         """
         初期化
         
         Args:
             api: APIインスタンス（GeminiAPI）
+            system_instruction: システム指示（指定がない場合は登録簿のsummary_system）
+            fallback_summarize: APIエラー時に使う要約関数（テキスト, 最大文字数）
+            budget: プロンプトのトークン予算
+            router: モデルルーター（指定した場合はapiの代わりにタスクと長さで選んだモデルを使う）
+            prompts: プロンプトの登録簿（指定がない場合は組み込みのプロンプト）
         """
         self.api = api
-        self.system_instruction = system_instruction or (
-            "あなたは日本語編集者です。要点を抽出し、日本語のみで短くまとめます。"
-            "長文は読みやすいように適度に改行してください。"
-        )
+        self.router = router
+        self.prompts = prompts or PromptRegistry()
+        self.fallback_summarize = fallback_summarize
+        self.budget = budget or PromptBudget()
+        # 指定がない場合は登録簿のsummary_systemを使う
+        self.system_instruction = system_instruction
         logger.info("要約機能を初期化しました")
     
-    async def summarize(self, text: str, max_length: int = 4000, summary_type: str = "normal") -> str:
+    async def summarize(
+        self,
+        text: str,
+        max_length: int = 4000,
+        summary_type: str = "normal",
+        fallback: bool = True,
+    ) -> str:
         """
         テキストを要約する
         
         Args:
             text: 要約するテキスト
             max_length: 要約の最大文字数
+            summary_type: 要約タイプ
+            fallback: APIエラー時に簡易要約を返すか（Falseの場合は例外を送出）
             
         Returns:
             要約されたテキスト
@@ -50,52 +80,236 @@ class Summarizer:
         
         try:
             # 要約および翻訳プロンプトの作成
-            if summary_type == "title":
-                prompt = (
-                    "次のタイトルを日本語に翻訳してください。\n\n"
-                    f"{text}\n\n翻訳:"
-                )
-            else:
-                if summary_type == "short":
-                    prompt = (
-                        "次の文章を日本語で2〜3文、100文字以内で要約してください。\n\n"
-                        f"{text}\n\n要約:"
-                    )
-                elif summary_type == "long":
-                    prompt = (
-                        "次の文章を日本語で詳細に500文字以内で要約してください。読みやすいように適度に改行してください。\n\n"
-                        f"{text}\n\n要約:"
-                    )
-                else:
-                    prompt = (
-                        "次の文章を日本語で200文字以内で要約してください。読みやすいように適度に改行してください。\n\n"
-                        f"{text}\n\n要約:"
-                    )
+            instruction = SUMMARY_INSTRUCTIONS.get(summary_type, SUMMARY_INSTRUCTIONS["normal"])
+            label = "翻訳:" if summary_type == "title" else "要約:"
+            task = self._budget_task(summary_type)
+            template = self.prompts.get("summary")
+            prompt = template.render(instruction=instruction, text=self.budget.fit(task, text), label=label)
+            self.budget.record(task, prompt)
             
             # APIを使用して要約
-            if isinstance(self.api, GeminiAPI):
-                summary = await self.api.generate_text(
-                    prompt,
-                    max_tokens=1000,
-                    temperature=0.3,
-                    system_instruction=self.system_instruction,
-                )
-            else:
-                summary = await self.api.generate_text(prompt, max_tokens=1000, temperature=0.3)
-            
-            # 余計なプレフィックスを削除
-            prefixes = ["要約:", "要約結果:", "翻訳:", "翻訳結果:"]
-            for prefix in prefixes:
-                if summary.startswith(prefix):
-                    summary = summary[len(prefix):].strip()
-            
-            # 最大長を超えた場合は切り詰め
-            if len(summary) > max_length:
-                summary = summary[:max_length - 3] + "..."
-            
-            return summary
+            summary = await self._generate(prompt, template, max_tokens=1000, api=self._api(task, text))
+            return self._clean_summary(summary, max_length)
 
         except Exception as e:
             logger.error(f"要約中にエラーが発生しました: {e}", exc_info=True)
+            if not fallback:
+                raise
             logger.info("外部APIが利用できないため、簡易要約にフォールバックします")
-            return simple_summarize(text, max_length)
+            return self.fallback_summarize(text, max_length)
+
+    async def summarize_batch(
+        self,
+        texts: Dict[str, str],
+        max_length: int = 4000,
+        summary_type: str = "normal",
+        token_budget: int = 6000,
+        fallback: bool = True,
+    ) -> Dict[str, str]:
+        """
+        複数のテキストをまとめて要約する
+
+        トークン予算に収まる範囲で複数のテキストを1回のリクエストに詰め込み、
+        応答を記事ごとに分割する。応答に含まれなかったテキストは個別に要約し直す。
+
+        Args:
+            texts: IDをキー、要約するテキストを値とする辞書
+            max_length: 要約の最大文字数
+            summary_type: 要約タイプ
+            token_budget: 1リクエストあたりの入力トークン予算
+            fallback: APIエラー時に簡易要約を使うか（Falseの場合は失敗したIDを結果から除く）
+
+        Returns:
+            IDをキー、要約結果を値とする辞書
+        """
+        results: Dict[str, str] = {}
+        pending = {key: text for key, text in texts.items() if text}
+        task = self._budget_task(summary_type)
+        fitted = {key: self.budget.fit(task, text) for key, text in pending.items()}
+        batched: List[str] = []
+
+        # モデルルーターがある場合は同じモデルを使う長さの区分ごとにまとめる
+        by_size: Dict[Optional[str], Dict[str, str]] = {}
+        for key, text in fitted.items():
+            size = self.router.size_class(pending[key]) if self.router else None
+            by_size.setdefault(size, {})[key] = text
+
+        for size_texts in by_size.values():
+            for group in self._pack_batches(size_texts, summary_type, token_budget):
+                if len(group) == 1:
+                    # 1件しか入らない場合は通常の要約を使う
+                    continue
+                batched.extend(group)
+                try:
+                    api = self._api(task, pending[group[0]])
+                    results.update(await self._summarize_group(group, fitted, max_length, summary_type, api))
+                except Exception as e:
+                    logger.warning(f"バッチ要約に失敗しました。個別要約で再試行します: {e}")
+
+        # バッチ応答に含まれなかった記事は個別に要約する
+        dropped = [key for key in batched if not results.get(key)]
+        if dropped:
+            logger.info(f"バッチ応答に含まれなかった{len(dropped)}件を個別に要約します")
+        missing = [key for key in pending if not results.get(key)]
+        for key in missing:
+            try:
+                results[key] = await self.summarize(pending[key], max_length, summary_type, fallback)
+            except Exception as e:
+                logger.warning(f"個別要約に失敗しました: {key}: {e}")
+
+        return results
+
+    async def summarize_digest(
+        self,
+        articles: List[Dict[str, str]],
+        item_length: int = 200,
+        fallback: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        複数の記事を1回のリクエストで日本語のダイジェストにまとめる
+
+        応答に含まれなかった記事は、元のタイトルと簡易要約で補う。
+
+        Args:
+            articles: 記事ごとの{"title", "content"}のリスト
+            item_length: 記事ごとの要約の最大文字数
+            fallback: APIエラー時に簡易要約を使うか（Falseの場合は例外を送出）
+
+        Returns:
+            {"overview": 全体の要点, "items": 記事ごとの{"title", "summary"}のリスト}
+        """
+        item_template = self.prompts.get("digest_item")
+        blocks = [
+            item_template.render(
+                number=i, title=article.get("title", ""), content=self.budget.fit("digest", article.get("content", ""))
+            )
+            for i, article in enumerate(articles, 1)
+        ]
+        template = self.prompts.get("digest")
+        prompt = template.render(count=len(articles), item_length=item_length, blocks="\n\n".join(blocks))
+        self.budget.record("digest", prompt)
+
+        parts: Dict[int, str] = {}
+        try:
+            api = self._api("digest", prompt)
+            response = await self._generate(
+                prompt, template, max_tokens=min(300 * (len(articles) + 1), 8192), api=api
+            )
+            parts = self._split_batch_response(response)
+        except Exception as e:
+            logger.error(f"ダイジェストの生成中にエラーが発生しました: {e}", exc_info=True)
+            if not fallback:
+                raise
+
+        items = []
+        for i, article in enumerate(articles, 1):
+            title, _, summary = parts.get(i, "").partition("\n")
+            title = title.strip()
+            if title.startswith("タイトル:"):
+                title = title[len("タイトル:"):].strip()
+            if not summary.strip():
+                title = ""
+                summary = self.fallback_summarize(article.get("content", ""), item_length)
+            items.append({
+                "title": title or article.get("title", ""),
+                "summary": self._clean_summary(summary.strip(), item_length),
+            })
+        logger.info(f"ダイジェストを作成しました: {sum(1 for i in range(1, len(articles) + 1) if i in parts)}/{len(articles)}件")
+        return {"overview": self._clean_summary(parts.get(0, ""), 1000), "items": items}
+
+    def _api(self, task: str, text: str):
+        """タスクとテキストの長さに応じたAPIインスタンスを取得する"""
+        return self.router.api_for(task, text) if self.router else self.api
+
+    @staticmethod
+    def _budget_task(summary_type: str) -> str:
+        """要約タイプに対応するトークン予算のタスク名"""
+        return "title" if summary_type == "title" else "summary"
+
+    def _pack_batches(self, texts: Dict[str, str], summary_type: str, token_budget: int) -> List[List[str]]:
+        """トークン予算に収まるようにテキストをグループ分けする"""
+        # 指示文を含む固定部分と「[[番号]]」の行の分を見込む
+        overhead = self.prompts.get("summary_batch").estimate_tokens(
+            instruction=SUMMARY_INSTRUCTIONS.get(summary_type, ""), what="要約"
+        ) + 50
+        groups: List[List[str]] = []
+        current: List[str] = []
+        used = overhead
+        for key, text in texts.items():
+            cost = estimate_tokens(text) + 10
+            if current and used + cost > token_budget:
+                groups.append(current)
+                current = []
+                used = overhead
+            current.append(key)
+            used += cost
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _summarize_group(
+        self,
+        keys: List[str],
+        texts: Dict[str, str],
+        max_length: int,
+        summary_type: str,
+        api=None,
+    ) -> Dict[str, str]:
+        """1回のリクエストで複数テキストを要約し、IDごとに分割する"""
+        instruction = SUMMARY_INSTRUCTIONS.get(summary_type, SUMMARY_INSTRUCTIONS["normal"])
+        what = "翻訳" if summary_type == "title" else "要約"
+        blocks = [f"[[{i}]]\n{texts[key]}" for i, key in enumerate(keys, 1)]
+        template = self.prompts.get("summary_batch")
+        prompt = template.render(count=len(keys), instruction=instruction, what=what, blocks="\n\n".join(blocks))
+        self.budget.record(f"{self._budget_task(summary_type)}_batch", prompt)
+
+        response = await self._generate(prompt, template, max_tokens=min(1000 * len(keys), 8192), api=api)
+
+        results: Dict[str, str] = {}
+        for number, body in self._split_batch_response(response).items():
+            if 1 <= number <= len(keys) and body:
+                results[keys[number - 1]] = self._clean_summary(body, max_length)
+        logger.info(f"バッチ{what}を実行しました: {len(results)}/{len(keys)}件")
+        return results
+
+    def _split_batch_response(self, response: str) -> Dict[int, str]:
+        """バッチ応答を番号ごとに分割する"""
+        parts: Dict[int, str] = {}
+        matches = list(BATCH_MARKER_RE.finditer(response or ""))
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+            parts[int(match.group(1))] = response[match.end():end].strip()
+        return parts
+
+    async def _generate(self, prompt: str, template: PromptTemplate, max_tokens: int, api=None) -> str:
+        """
+        APIを使用してテキストを生成する（apiの指定がない場合はself.api）
+
+        使用量の記録には、組み立てたテンプレートと送ったシステムインストラクションのID@バージョンを付ける。
+        """
+        api = api or self.api
+        if isinstance(unwrap_api(api), GeminiAPI):
+            system = self.prompts.get("summary_system")
+            prompt_key = template.key if self.system_instruction else f"{template.key}+{system.key}"
+            with usage_context(prompt=prompt_key):
+                return await api.generate_text(
+                    prompt,
+                    max_tokens=max_tokens,
+                    temperature=0.3,
+                    system_instruction=self.system_instruction or system.render(),
+                )
+        with usage_context(prompt=template.key):
+            return await api.generate_text(prompt, max_tokens=max_tokens, temperature=0.3)
+
+    def _clean_summary(self, summary: str, max_length: int) -> str:
+        """余計なプレフィックスを削除し、最大長に切り詰める"""
+        prefixes = ["要約:", "要約結果:", "翻訳:", "翻訳結果:"]
+        for prefix in prefixes:
+            if summary.startswith(prefix):
+                summary = summary[len(prefix):].strip()
+
+        # 最大長を超えた場合は切り詰め
+        if len(summary) > max_length:
+            summary = summary[:max_length - 3] + "..."
+
+        return summary
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+テキストユーティリティ
+
+プロンプト構築時に利用するテキスト処理の補助関数を提供する
+"""
+
+import re
+import math
+import logging
+import unicodedata
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 英単語と日本語の文字列を切り出す正規表現
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff々〆ヶ]+")
+# 文字種の境界で日本語の文字列を区切る正規表現（ひらがなは語として使わない）
+JA_SEGMENT_RE = re.compile(r"[\u30a0-\u30ff]+|[\u3400-\u4dbf\u4e00-\u9fff々〆ヶ]+")
+
+# タスクごとのプロンプトに埋め込むテキストのトークン予算
+DEFAULT_TOKEN_BUDGETS = {
+    "summary": 3000,         # 記事本文の要約
+    "title": 200,            # タイトルの翻訳
+    "classify": 500,         # ジャンル分類
+    "keywords": 1500,        # 検索用キーワード抽出
+    "search_keywords": 800,  # 質問からの検索キーワード生成
+    "qa_article": 4000,      # 質問応答の元記事
+    "qa_related": 300,       # 質問応答の関連記事（1件あたり）
+    "digest": 400,           # ダイジェストの記事本文（1件あたり）
+}
+
+# 前後を残して切り詰めた箇所に挿入する文字列
+OMISSION_MARKER = "\n…（中略）…\n"
+
+# 英語のストップワード
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for from had has have
+he her his how i if in into is it its just more most new not of on or our out over said she so some than
+that the their them then there these they this to up was we were what when which who will with would you your
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """テキストのトークン数を概算する
+
+    ネットワークを使わない簡易な見積もりで、ASCII文字は4文字で1トークン、
+    日本語などの非ASCII文字は1文字で1トークンとして数える。
+    実際のトークナイザーより多めに見積もる保守的な値を返す。
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4) + other_chars
+
+
+def truncate_head_tail(text: str, max_tokens: int, head_ratio: float = 0.7) -> str:
+    """
+    先頭と末尾を残してテキストをトークン予算内に切り詰める
+
+    Args:
+        text: 対象のテキスト
+        max_tokens: トークン予算
+        head_ratio: 予算のうち先頭部分に割り当てる割合
+
+    Returns:
+        切り詰めたテキスト（予算内の場合はそのまま）
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(OMISSION_MARKER) - 1
+    if budget <= 0:
+        return ""
+    costs = [0.25 if ord(ch) < 128 else 1.0 for ch in text]
+
+    head_budget = budget * head_ratio
+    used = 0.0
+    head_end = 0
+    while head_end < len(text) and used + costs[head_end] <= head_budget:
+        used += costs[head_end]
+        head_end += 1
+
+    used = 0.0
+    tail_start = len(text)
+    while tail_start > head_end and used + costs[tail_start - 1] <= budget - head_budget:
+        tail_start -= 1
+        used += costs[tail_start]
+
+    return text[:head_end] + OMISSION_MARKER + text[tail_start:]
+
+
+def truncate_to_tokens(text: str, max_tokens: int, strategy: str = "salient") -> str:
+    """
+    テキストをトークン予算内に切り詰める
+
+    Args:
+        text: 対象のテキスト
+        max_tokens: トークン予算
+        strategy: salient（重要な文を選ぶ）またはhead_tail（先頭と末尾を残す）
+
+    Returns:
+        切り詰めたテキスト（予算内の場合はそのまま）
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    if strategy == "salient":
+        # textrankはこのモジュールに依存するため使用時にインポートする
+        from .textrank import select_salient
+        return select_salient(text, max_tokens)
+    return truncate_head_tail(text, max_tokens)
+
+
+class PromptBudget:
+    """タスクごとのプロンプトのトークン予算
+
+    プロンプトに埋め込むテキストを予算内に切り詰め、送信したトークン数をタスクごとに集計する。
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, strategy: str = "salient"):
+        """
+        初期化
+
+        Args:
+            budgets: タスク名をキー、トークン予算を値とする辞書（DEFAULT_TOKEN_BUDGETSを上書き）
+            strategy: 切り詰め方法（salient/head_tail）
+        """
+        self.budgets = {**DEFAULT_TOKEN_BUDGETS, **(budgets or {})}
+        self.strategy = strategy
+        self.sent: Dict[str, int] = {}
+        self.truncated: Dict[str, int] = {}
+
+    def fit(self, task: str, text: str) -> str:
+        """
+        テキストをタスクの予算内に切り詰める
+
+        Args:
+            task: タスク名
+            text: プロンプトに埋め込むテキスト
+
+        Returns:
+            切り詰めたテキスト（予算が未設定の場合はそのまま）
+        """
+        budget = self.budgets.get(task)
+        if not text or not budget:
+            return text
+        tokens = estimate_tokens(text)
+        if tokens <= budget:
+            return text
+        fitted = truncate_to_tokens(text, budget, self.strategy)
+        self.truncated[task] = self.truncated.get(task, 0) + 1
+        logger.info(f"プロンプトのテキストを切り詰めました: {task} {tokens}→{estimate_tokens(fitted)}トークン")
+        return fitted
+
+    def record(self, task: str, prompt: str) -> int:
+        """
+        送信するプロンプトのトークン数を記録する
+
+        Args:
+            task: タスク名
+            prompt: 送信するプロンプト
+
+        Returns:
+            推定トークン数
+        """
+        tokens = estimate_tokens(prompt)
+        self.sent[task] = self.sent.get(task, 0) + tokens
+        logger.info(f"プロンプト送信: {task} {tokens}トークン（累計 {self.sent[task]}）")
+        return tokens
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """
+    文字種ごとの文字数を数える
+
+    Returns:
+        hiragana, katakana, kanji, latin, otherの各文字数（空白・数字・記号は数えない）
+    """
+    counts = {"hiragana": 0, "katakana": 0, "kanji": 0, "latin": 0, "other": 0}
+    for ch in text or "":
+        code = ord(ch)
+        if 0x3041 <= code <= 0x309F:
+            counts["hiragana"] += 1
+        elif 0x30A0 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF or 0xFF66 <= code <= 0xFF9F:
+            counts["katakana"] += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF or ch in "々〆ヶ":
+            counts["kanji"] += 1
+        elif ch.isalpha():
+            if code < 0x250 or 0xFF21 <= code <= 0xFF5A:
+                counts["latin"] += 1
+            else:
+                counts["other"] += 1
+    return counts
+
+
+def detect_language(text: str) -> str:
+    """
+    文字種の統計から言語を推定する
+
+    かなを含み、日本語の文字が3割以上であれば日本語とみなす（日本語の見出しには
+    英字の製品名などが多く含まれるため閾値を低めにしている）。
+    漢字のみでかなを含まないテキストは中国語の可能性があるため日本語とはしない。
+
+    Returns:
+        "ja"、"en"、"other"のいずれか（判定できない場合は"other"）
+    """
+    counts = script_counts(text)
+    kana = counts["hiragana"] + counts["katakana"]
+    japanese = kana + counts["kanji"]
+    letters = japanese + counts["latin"] + counts["other"]
+    if letters == 0:
+        return "other"
+    if kana > 0 and japanese / letters >= 0.3:
+        return "ja"
+    if counts["latin"] / letters >= 0.5:
+        return "en"
+    return "other"
+
+
+def is_japanese(text: str) -> bool:
+    """テキストが日本語かどうかを判定する"""
+    return detect_language(text) == "ja"
+
+
+def tokenize(text: str, bigrams: bool = True) -> List[str]:
+    """
+    分類や検索のためにテキストを語に分割する
+
+    英数字は小文字化した単語（ストップワードと1文字の語を除く）、日本語は
+    カタカナ・漢字の連続部分を2文字ずつのbigramとして切り出す。
+
+    Args:
+        text: 対象のテキスト
+        bigrams: Falseの場合は日本語の連続部分をそのまま1語とする
+
+    Returns:
+        語のリスト
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        word = match.group()
+        if word[0].isascii():
+            if len(word) > 1 and word not in STOPWORDS:
+                tokens.append(word)
+            continue
+        for segment in JA_SEGMENT_RE.findall(word):
+            if len(segment) == 1 or not bigrams:
+                tokens.append(segment)
+            else:
+                tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抽出型要約（TextRank）
+
+文の類似度グラフにPageRankを適用して重要な文を選ぶ、APIを使わない要約を提供する
+"""
+
+import re
+import time
+import random
+from typing import List, Optional
+
+import numpy as np
+
+from .text_utils import tokenize, is_japanese, estimate_tokens, truncate_head_tail
+
+# 文の区切り（日本語の句点・感嘆符・疑問符、英語の文末記号＋空白、改行）
+SENTENCE_RE = re.compile(
+    r"[^\n]+?(?:[。！？!?]+[」』）)\"']*|\.+[\"')]*(?=\s|$)|(?=\n)|$)"
+)
+
+# グラフを作る文の最大数（これを超える部分は計算対象にしない）
+MAX_SENTENCES = 500
+
+def split_sentences(text: str) -> List[str]:
+    """
+    テキストを文に分割する
+
+    Args:
+        text: 対象のテキスト
+
+    Returns:
+        空の文を除いた文のリスト
+    """
+    if not text:
+        return []
+    sentences = (match.group().strip() for match in SENTENCE_RE.finditer(text))
+    return [sentence for sentence in sentences if sentence]
+
+
+def pagerank(matrix: np.ndarray, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+    """
+    重み付き隣接行列からPageRankを計算する
+
+    Args:
+        matrix: 非負の重み付き隣接行列（n×n）
+        damping: ダンピング係数
+        tol: 収束判定の閾値
+        max_iter: 最大反復回数
+
+    Returns:
+        各ノードのスコア（合計1）
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = matrix.sum(axis=1, keepdims=True)
+    # 出ていく辺のないノードからは全ノードに均等に遷移する
+    transition = np.where(out_weight > 0, matrix / np.where(out_weight > 0, out_weight, 1.0), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def rank_sentences(sentences: List[str]) -> np.ndarray:
+    """
+    文ごとの重要度を計算する
+
+    文をTF-IDFベクトルに変換し、コサイン類似度を辺の重みとするグラフのPageRankを求める。
+
+    Args:
+        sentences: 文のリスト
+
+    Returns:
+        文ごとのスコア
+    """
+    n = len(sentences)
+    vocab = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for token in tokenize(sentence):
+            rows.append(i)
+            cols.append(vocab.setdefault(token, len(vocab)))
+    if not vocab:
+        return np.full(n, 1.0 / n) if n else np.zeros(0)
+
+    # 文×語の出現数行列をまとめて作る
+    counts = np.zeros((n, len(vocab)))
+    np.add.at(counts, (np.asarray(rows), np.asarray(cols)), 1.0)
+    idf = np.log((1 + n) / (1 + (counts > 0).sum(axis=0))) + 1.0
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1.0)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    return pagerank(similarity)
+
+
+def textrank_summarize(text: str, max_length: int = 200, max_sentences: Optional[int] = None) -> str:
+    """
+    TextRankでテキストを抽出型要約する
+
+    スコアの高い文から最大文字数に収まるものを選び、元の順序で連結する。
+    平均未満のスコアの文は、空いた文字数を埋めるためには使わない。
+
+    Args:
+        text: 要約するテキスト
+        max_length: 要約の最大文字数
+        max_sentences: 選ぶ文の最大数
+
+    Returns:
+        要約
+    """
+    sentences = split_sentences(text)[:MAX_SENTENCES]
+    if not sentences:
+        return ""
+    if len(sentences) == 1:
+        sentence = sentences[0]
+        return sentence if len(sentence) <= max_length else sentence[: max_length - 3] + "..."
+
+    separator = "" if is_japanese(text) else " "
+    scores = rank_sentences(sentences)
+    mean_score = scores.mean()
+    chosen: List[int] = []
+    length = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if chosen and scores[index] < mean_score:
+            break
+        added = len(sentences[index]) + (len(separator) if chosen else 0)
+        if length + added > max_length:
+            continue
+        chosen.append(int(index))
+        length += added
+        if max_sentences and len(chosen) >= max_sentences:
+            break
+
+    if not chosen:
+        # どの文も収まらない場合は最も重要な文を切り詰める
+        best = sentences[int(np.argmax(scores))]
+        return best[: max_length - 3] + "..."
+    return separator.join(sentences[i] for i in sorted(chosen))
+
+
+def select_salient(text: str, max_tokens: int) -> str:
+    """
+    重要な文を選んでテキストをトークン予算内に収める
+
+    先頭の文（リード文）を優先し、残りはスコアの高い順に予算内で選んで元の順序で連結する。
+    文に分割できない場合は先頭と末尾を残して切り詰める。
+
+    Args:
+        text: 対象のテキスト
+        max_tokens: トークン予算
+
+    Returns:
+        予算内に収めたテキスト
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    sentences = split_sentences(text)[:MAX_SENTENCES]
+    if len(sentences) < 2:
+        return truncate_head_tail(text, max_tokens)
+
+    separator = "" if is_japanese(text) else " "
+    costs = [estimate_tokens(sentence + separator) for sentence in sentences]
+    scores = rank_sentences(sentences)
+    scores[0] = np.inf
+    chosen: List[int] = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if used + costs[index] <= max_tokens:
+            chosen.append(int(index))
+            used += costs[index]
+    if not chosen:
+        return truncate_head_tail(text, max_tokens)
+    return separator.join(sentences[i] for i in sorted(chosen))
+
+
+if __name__ == "__main__":
+    # 1万文字の記事での処理時間を計測する
+    rng = random.Random(0)
+    ja_words = ["人工知能", "モデル", "性能", "企業", "市場", "開発者", "スマートフォン", "研究", "発表", "価格"]
+    en_words = ["model", "market", "company", "developer", "phone", "research", "price", "launch", "data", "chip"]
+    ja_text = "".join(
+        "".join(rng.choice(ja_words) + rng.choice(["の", "が", "を", "は"]) for _ in range(8)) + "。"
+        for _ in range(400)
+    )[:10000]
+    en_text = " ".join(
+        " ".join(rng.choice(en_words) for _ in range(12)).capitalize() + "."
+        for _ in range(300)
+    )[:10000]
+    for name, sample in (("ja", ja_text), ("en", en_text)):
+        textrank_summarize(sample, 400)
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            textrank_summarize(sample, 400)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{name}: {len(sample)}文字, {len(split_sentences(sample))}文, {elapsed * 1000:.1f}ms/記事")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI使用量の記録
+
+Gemini APIの呼び出しごとにフィードURL、タスク、モデル、入出力トークン数、レイテンシ、
+再試行回数、使用したキーを記録し、記事ストアにまとめて書き込む
+"""
+
+import uuid
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# 現在の処理に付けるタグ（フィードURL、タスク、プロンプトのID@バージョン）。asyncioのタスクごとに引き継がれる
+current_usage_tags: ContextVar[Dict[str, Any]] = ContextVar("ai_usage_tags", default={})
+
+@contextmanager
+def usage_context(**tags: Union[str, Sequence[str], None]) -> Iterator[None]:
+    """
+    ブロック内のAPI呼び出しにタグを付ける（Noneのタグは無視し、外側のタグを引き継ぐ）
+
+    Args:
+        tags: feed_url、task、promptなどのタグ（feed_urlは複数フィードの記事をまとめた呼び出しではURLのリスト）
+    """
+    merged = dict(current_usage_tags.get())
+    merged.update({name: value for name, value in tags.items() if value is not None})
+    token = current_usage_tags.set(merged)
+    try:
+        yield
+    finally:
+        current_usage_tags.reset(token)
+
+
+class UsageRecorder:
+    """API呼び出しの使用量を溜めておき、記事ストアにまとめて書き込むクラス"""
+
+    def __init__(self, max_pending: int = 10000):
+        """
+        初期化
+
+        Args:
+            max_pending: 書き込み前に保持する最大件数（超えた場合は古いものから捨てる）
+        """
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=max(1, max_pending))
+        self.recorded = 0
+
+    def record(
+        self,
+        model: str,
+        task: Optional[str],
+        input_tokens: int,
+        output_tokens: int,
+        latency: float,
+        retries: int = 0,
+        key_index: Optional[int] = None,
+        success: bool = True,
+    ) -> None:
+        """
+        API呼び出し1回分の使用量を記録する（フィードURL、タスク、プロンプトは現在のタグから取得する）
+
+        複数フィードの記事をまとめた呼び出しは、トークン数をフィードごとの記事数で按分して記録する。
+
+        Args:
+            model: モデル名
+            task: タスク名（タグにタスクがない場合に使う）
+            input_tokens: 入力トークン数
+            output_tokens: 出力トークン数
+            latency: レイテンシ（秒、再試行を含む）
+            retries: 再試行とヘッジリクエストの回数
+            key_index: 応答を返したキーのインデックス
+            success: 成功したか
+        """
+        tags = current_usage_tags.get()
+        feed_urls = tags.get("feed_url") or ""
+        if isinstance(feed_urls, str):
+            feed_urls = [feed_urls]
+        # フィードごとの記事数（リストに含まれる回数）
+        weights = Counter(feed_urls) or Counter([""])
+        total = sum(weights.values())
+        input_shares = self._split(int(input_tokens), weights, total)
+        output_shares = self._split(int(output_tokens), weights, total)
+
+        created_at = datetime.now(timezone.utc).isoformat()
+        # フィードごとに分けた記録を1回の呼び出しとして集計するためのID
+        call_id = uuid.uuid4().hex
+        for i, feed_url in enumerate(weights):
+            self._pending.append({
+                "created_at": created_at,
+                "call_id": call_id,
+                "feed_url": feed_url,
+                "task": tags.get("task") or task or "",
+                "model": model[len("models/"):] if model.startswith("models/") else model,
+                "prompt": tags.get("prompt", ""),
+                "input_tokens": input_shares[feed_url],
+                "output_tokens": output_shares[feed_url],
+                "latency": float(latency),
+                "retries": int(retries) if i == 0 else 0,
+                "key_index": key_index,
+                "success": bool(success),
+            })
+        self.recorded += 1
+
+    @staticmethod
+    def _split(tokens: int, weights: Counter, total: int) -> Dict[str, int]:
+        """トークン数を記事数で按分する（割り切れない分は先頭のフィードに加える）"""
+        shares = {feed_url: tokens * count // total for feed_url, count in weights.items()}
+        first = next(iter(shares))
+        shares[first] += tokens - sum(shares.values())
+        return shares
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """
+        溜めた記録を取り出す
+
+        Returns:
+            記録のリスト（取り出した記録は削除される）
+        """
+        records = list(self._pending)
+        self._pending.clear()
+        return records
+
+    async def flush(self, store: Any, retention_days: int = 30) -> int:
+        """
+        溜めた記録を記事ストアに書き込む
+
+        Args:
+            store: 記事ストア（add_ai_usageを持つもの）
+            retention_days: 使用量を保持する日数
+
+        Returns:
+            書き込んだ件数
+        """
+        records = self.drain()
+        if not records:
+            return 0
+        if not await store.add_ai_usage(records, retention_days):
+            # 書き込めなかった記録は次回に回す
+            self._pending.extendleft(reversed(records))
+            return 0
+        return len(records)
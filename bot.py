@@ -18,6 +18,7 @@ from discord_bot.bot_client import DiscordBot
 from discord_bot.commands import set_managers
 from rss.feed_manager import FeedManager
 from ai.ai_processor import AIProcessor
+from ai.gemini_client import close_clients
 from utils.logger import setup_logger
 from utils.scheduler import setup_scheduler
 
@@ -29,6 +30,8 @@ async def main():
     # ロガーのセットアップ
     logger = setup_logger()
     logger.info("Discord RSS Botを起動しています...")
+    discord_bot = None
+    feed_manager = None
     
     try:
         # 設定の読み込み
@@ -64,6 +67,13 @@ async def main():
     except Exception as e:
         logger.error(f"起動中にエラーが発生しました: {e}", exc_info=True)
         return
+    finally:
+        # 新しい記事の処理を止めてから、溜まっている投稿を送り切る
+        if feed_manager:
+            await feed_manager.stop_worker()
+        if discord_bot:
+            await discord_bot.close()
+        await close_clients()
 
 if __name__ == "__main__":
     # asyncioイベントループの実行
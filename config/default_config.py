@@ -19,16 +19,82 @@ DEFAULT_CONFIG = {
     "feeds": [],          # フィードリスト
     "check_interval": 15, # フィード確認間隔（分）
     "max_articles": 5,    # 1回の確認で処理する最大記事数
+    "digest_max_articles": 10,  # ダイジェスト1件にまとめる最大記事数（超えた分は次のダイジェストに回す）
+    "digest_item_max_length": 200,  # ダイジェストの記事ごとの要約の最大文字数
     
     # AI設定
     "ai_provider": "gemini",  # AIプロバイダ（geminiのみ）
     "gemini_api_key": "",  # Google Gemini API Key (旧形式)
     "gemini_api_keys": [],  # Gemini API Keyのリスト
+    "gemini_rpm_per_key": 15,         # APIキーごとの1分あたりのリクエスト数上限
+    "gemini_tpm_per_key": 1000000,    # APIキーごとの1分あたりのトークン数上限
+    "gemini_max_in_flight_per_key": 4,  # APIキーごとの同時リクエスト数上限
+    "ai_backend": "google",  # Gemini APIのバックエンド（google: 実際のAPI, fake: APIを呼ばないローカルの応答）
+    "fake_backend": {"latency_ms": 800, "latency_sigma": 0.5, "rate_limit_rate": 0.0, "rpm_limit": 0},  # fakeバックエンドの応答時間とレート制限の設定
+    "ai_max_concurrency": 6,  # 全レーン合計のGemini APIの同時リクエスト数上限
+    "ai_lane_weights": {"ingest": 2, "interactive": 3, "manual": 1},  # 記事処理・質問応答・手動確認のレーンの重み
+    "article_queue_maxsize": 100,  # 処理待ちの記事キューの上限（超えた場合やレーンが飽和した場合はフィード確認を待機させる）
+    "ai_request_timeout": 120,  # タスクを指定しないGemini API呼び出しの期限（秒）
+    "ai_task_deadlines": {"title": 30, "summary": 60, "classify": 30, "keywords": 30, "search_keywords": 30, "qa": 90},  # タスクごとのGemini API呼び出しの期限（秒）
+    "gemini_hedging": True,  # 応答が遅いリクエストを別のAPIキーで重複して送るか（ヘッジリクエスト）
+    "gemini_hedge_quantile": 0.95,  # ヘッジリクエストを送るまでの待ち時間に使うレイテンシの分位点
+    "gemini_hedge_budget": 0.1,  # リクエスト数に対するヘッジリクエストの最大割合
+    "gemini_hedge_min_samples": 20,  # ヘッジリクエストを送るのに必要なルートごとのレイテンシの記録数
+    "ai_usage_retention_days": 30,  # フィード・タスクごとのGemini API使用量の記録を保持する日数
     "ai_model": "gemini-2.0-flash",  # 使用するAIモデル
                               # gemini-2.0-flash, gemini-2.5-flash-preview-05-20
+    "qa_model": "gemini-2.5-flash",  # 記事への質問応答に使用するモデル
+    "model_routes": {},            # タスクと記事の長さごとのモデル（"summary:long": "gemini-2.5-flash"など）
+                                   # タスク: title, summary, classify, keywords, search_keywords, qa
+                                   # 長さ: short, medium, long（省略時はタスク全体）
+    "prompt_versions": {},  # プロンプトIDごとに使うバージョン（{"summary": "2"}など、省略時は最新。ai/prompts.pyに登録したもの）
+    "model_route_short_tokens": 500,  # これ未満のトークン数の記事をshortとする
+    "model_route_long_tokens": 3000,  # これ以上のトークン数の記事をlongとする
+    "qa_concurrency": 2,   # 質問応答の同時実行数
+    "qa_cache_ttl": 300,           # 質問応答の回答をキャッシュする秒数（0でキャッシュしない）
+    "qa_cache_max_entries": 256,   # 質問応答キャッシュの最大エントリ数
+    "qa_streaming": True,          # 回答を生成しながら返信を編集して表示するか
+    "qa_stream_edit_interval": 1.5,  # 生成途中の返信を編集する最小間隔（秒）
+    "qa_context_cache": True,      # 記事の内容をGeminiのコンテキストキャッシュに登録するか
+    "qa_context_cache_ttl": 3600,  # 記事ごとの質問応答コンテキストの有効期間（秒）
+    "qa_context_cache_min_tokens": 1024,  # コンテキストキャッシュを作成する最小トークン数
     "summarize": True,     # 要約（翻訳を兼ねる）を有効にするか
     "summary_length": 4000, # 要約の最大文字数
     "classify": False,     # ジャンル分類を有効にするか
+    "post_batch_window": 2.0,    # 同じチャンネルへの記事をまとめて1件のメッセージで投稿するまでの待ち時間（秒、0でまとめない）
+    "post_batch_max_embeds": 10,  # 1件のメッセージにまとめる最大記事数（Discordの上限は10）
+    "send_channel_rate": 5,      # チャンネルごとにsend_channel_per秒あたり送信するメッセージ数
+    "send_channel_per": 5.0,     # send_channel_rateの単位となる秒数
+    "send_max_retries": 3,       # 429（レート制限）が返った場合に再送する最大回数
+    "send_max_ratelimit_timeout": 30.0,  # discord.py内で待つ429の最大秒数（超える場合は送信キューで待って再送、30以上）
+    "shutdown_flush_timeout": 10.0,  # 終了時に投稿待ち・送信待ちのメッセージを送り切るまで待つ最大秒数
+    "batch_summarize": True,     # 複数記事をまとめて要約するか
+    "batch_max_articles": 5,     # 1回のバッチで処理する最大記事数
+    "batch_token_budget": 6000,  # バッチ要約1リクエストあたりの入力トークン予算
+    "skip_japanese_translation": True,  # 日本語のタイトルは翻訳しない
+    "local_summary_max_chars": 400,    # この文字数以下の日本語本文はAPIを使わずに要約する（0で無効）
+    "local_classifier_enabled": True,   # ローカル分類器でジャンル分類を行うか
+    "local_classifier_path": "data/classifier.json",  # ローカル分類器のモデルファイル
+    "local_classifier_threshold": 0.9,  # この信頼度未満の場合はAPIで分類する
+    "local_classifier_min_samples": 50, # 再学習に必要なAPI分類済み記事の最低件数
+    "keyword_extractor": "local",  # 検索用キーワードの抽出方法（local: TF-IDF, gemini: API）
+    "keyword_max_count": 7,        # 1記事あたりの検索用キーワード数
+    "keyword_corpus_size": 2000,   # TF-IDFのコーパスとして読み込む記事数
+    "fallback_summarizer": "textrank",  # APIエラー時の要約方法（textrank: 抽出型要約, simple: 先頭の文）
+    "prompt_truncation": "salient",  # 長文の切り詰め方法（salient: 重要な文を選ぶ, head_tail: 先頭と末尾を残す）
+    "prompt_token_budgets": {},      # タスクごとのトークン予算（summary, title, classify, keywords,
+                                     # search_keywords, qa_article, qa_related, digestで既定値を上書き）
+    "embedder": "hashing",         # 関連記事検索の埋め込み方法（hashing: ローカル, gemini: API）
+    "embedding_model": "models/text-embedding-004",  # gemini埋め込みのモデル名
+    "embedding_dim": 512,          # hashing埋め込みの次元数
+    "embedding_max_tokens": 2000,  # 埋め込みに使う記事本文のトークン上限
+    "vector_index_path": "data/vectors",  # ベクトル索引の保存ディレクトリ
+    "related_min_similarity": 0.3,  # 質問応答の関連記事に含める最小のコサイン類似度
+    "ai_stage_concurrency": 6,     # 記事処理ステージ（要約・翻訳・分類・キーワード）の同時実行数
+    "ai_cache_enabled": True,      # AI処理結果キャッシュを有効にするか
+    "ai_cache_path": "data/ai_cache.db",  # AI処理結果キャッシュのパス
+    "ai_cache_max_entries": 5000,  # キャッシュの最大エントリ数
+    "ai_cache_max_age_days": 30,   # キャッシュの最大保持日数
     
     # カテゴリ設定
     "categories": [
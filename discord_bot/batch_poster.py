@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+記事のまとめ投稿
+
+同じチャンネルに短い間隔で届いた記事のEmbedを1件のメッセージ（最大10個のEmbed）にまとめて投稿する。
+まとめて投稿した記事は「メッセージID:番号」のキーで記録し、返信の質問から対象の記事を選ぶ。
+"""
+
+import re
+import asyncio
+import logging
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from ai.text_utils import tokenize
+from .message_builder import EMBED_TOTAL_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# 1件のメッセージに含められるEmbedの最大数
+MAX_EMBEDS_PER_MESSAGE = 10
+
+# まとめて投稿するときに付けるフッター（記事の番号）
+BATCH_FOOTER = "{index}/{count} ・ 返信で「#{index}」と書くとこの記事について質問できます"
+
+# 送信後に記事を記録するキー（失敗した場合はNone）を受け取るコルーチン関数
+OnPosted = Callable[[Optional[str]], Awaitable[None]]
+
+# 質問から記事の番号を取り出す正規表現（#2、[2]、2番目、2つ目など）
+ARTICLE_NUMBER_RE = re.compile(r"[#\[]\s*(\d{1,2})|(\d{1,2})\s*(?:番目|つ目|個目|本目|件目)")
+
+def article_key(message_id: Any, index: int, count: int) -> str:
+    """
+    まとめて投稿した記事を記録するキーを取得する
+
+    Args:
+        message_id: メッセージID
+        index: メッセージ内の記事の番号（1から）
+        count: メッセージ内の記事数
+
+    Returns:
+        1件だけの場合はメッセージID、複数の場合は「メッセージID:番号」
+    """
+    return str(message_id) if count == 1 else f"{message_id}:{index}"
+
+
+def select_batched_article(articles: List[Dict[str, Any]], question: str) -> Optional[Dict[str, Any]]:
+    """
+    まとめて投稿した記事から質問の対象を選ぶ
+
+    質問に記事の番号があればその記事、タイトルと共通する語が最も多い記事が1件に決まればその記事、
+    決まらない場合はすべての記事をまとめた1件の記事を返す。
+
+    Args:
+        articles: 記事ストアの記事（message_idが「メッセージID:番号」のもの）
+        question: 質問
+
+    Returns:
+        質問対象の記事（記事がない場合はNone）
+    """
+    if not articles:
+        return None
+    numbered = sorted(articles, key=lambda a: int(str(a.get("message_id", "")).rpartition(":")[2] or 0))
+    if len(numbered) == 1:
+        return numbered[0]
+
+    text = unicodedata.normalize("NFKC", question or "")
+    match = ARTICLE_NUMBER_RE.search(text)
+    if match:
+        index = int(match.group(1) or match.group(2))
+        for article in numbered:
+            if str(article.get("message_id", "")).endswith(f":{index}"):
+                return article
+
+    words = set(tokenize(text))
+    scores = [len(words & set(tokenize(article.get("title") or ""))) for article in numbered]
+    best = max(scores)
+    if best > 0 and scores.count(best) == 1:
+        return numbered[scores.index(best)]
+
+    first = numbered[0]
+    return {
+        **first,
+        "message_id": str(first.get("message_id", "")).rpartition(":")[0],
+        "title": " / ".join(article.get("title") or "" for article in numbered),
+        "content": "\n\n".join(
+            f"■ {article.get('title') or ''}\n{article.get('content') or ''}" for article in numbered
+        ),
+        "keywords_en": ", ".join(article.get("keywords_en") or "" for article in numbered if article.get("keywords_en")),
+    }
+
+
+class BatchPoster:
+    """チャンネルごとに記事のEmbedをまとめて投稿するクラス
+
+    最初のEmbedが届いてからwindow秒の間に同じチャンネルに届いたEmbedを1件のメッセージで送る。
+    Embedの数か合計文字数が上限に達した場合は待たずに送る。
+    同じチャンネルのメッセージは届いた順に送る。
+    送信はバックグラウンドで行い、送信後に記事ごとのキーをon_postedに渡す。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, List[discord.Embed]], Awaitable[Optional[Any]]],
+        window: float = 2.0,
+        max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+    ):
+        """
+        初期化
+
+        Args:
+            send: チャンネルIDとEmbedのリストを受け取り、送信したメッセージのIDを返すコルーチン関数
+            window: Embedをまとめるために待つ秒数（0以下の場合はまとめない）
+            max_embeds: 1件のメッセージにまとめる最大Embed数
+        """
+        self.send = send
+        self.window = window
+        self.max_embeds = max(1, min(max_embeds, MAX_EMBEDS_PER_MESSAGE))
+        self._pending: Dict[str, List[Tuple[discord.Embed, OnPosted]]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._sending: Set[asyncio.Task] = set()
+        self.stats = {"messages": 0, "embeds": 0, "failed": 0}
+
+    async def post(self, channel_id: str, embed: discord.Embed) -> Optional[str]:
+        """
+        Embedを投稿し、送信の完了を待つ（同じチャンネルの他のEmbedとまとめて送る）
+
+        Args:
+            channel_id: 投稿先チャンネルID
+            embed: 記事のEmbed
+
+        Returns:
+            記事を記録するキー（article_key）。送信に失敗した場合はNone
+        """
+        future = asyncio.get_event_loop().create_future()
+
+        async def on_posted(key: Optional[str]) -> None:
+            if not future.done():
+                future.set_result(key)
+
+        self.submit(channel_id, embed, on_posted)
+        return await future
+
+    def submit(self, channel_id: str, embed: discord.Embed, on_posted: Optional[OnPosted] = None) -> None:
+        """
+        Embedを投稿待ちに入れる（送信の完了は待たない）
+
+        Args:
+            channel_id: 投稿先チャンネルID
+            embed: 記事のEmbed
+            on_posted: 送信後に記事を記録するキー（失敗した場合はNone）を受け取るコルーチン関数
+        """
+        channel_id = str(channel_id)
+        pending = self._pending.get(channel_id)
+        if pending and self._size(pending) + len(embed) + len(BATCH_FOOTER) > EMBED_TOTAL_LIMIT:
+            # 合計文字数の上限を超える場合は溜まっている分を先に送る
+            self._flush_now(channel_id)
+
+        self._pending.setdefault(channel_id, []).append((embed, on_posted))
+        if len(self._pending[channel_id]) >= self.max_embeds or self.window <= 0:
+            self._flush_now(channel_id)
+        elif channel_id not in self._timers:
+            self._timers[channel_id] = asyncio.create_task(self._flush_later(channel_id))
+
+    async def flush(self, wait: bool = True) -> None:
+        """
+        溜まっているEmbedを待たずに送る
+
+        Args:
+            wait: 送信と送信後の記録の完了まで待つか
+        """
+        for channel_id in list(self._pending):
+            self._flush_now(channel_id)
+        if wait and self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    def _size(self, pending: List[Tuple[discord.Embed, Optional[OnPosted]]]) -> int:
+        """溜まっているEmbedの合計文字数（フッターの分を含む）"""
+        return sum(len(embed) + len(BATCH_FOOTER) for embed, _ in pending)
+
+    def _flush_now(self, channel_id: str) -> None:
+        """待たずに送る"""
+        timer = self._timers.pop(channel_id, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(channel_id, None)
+        if batch:
+            task = asyncio.create_task(self._send(channel_id, batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _flush_later(self, channel_id: str) -> None:
+        """window秒待ってから送る"""
+        await asyncio.sleep(self.window)
+        # 自分自身をキャンセルしないように先に外してから送る
+        self._timers.pop(channel_id, None)
+        self._flush_now(channel_id)
+
+    async def _send(self, channel_id: str, batch: List[Tuple[discord.Embed, Optional[OnPosted]]]) -> None:
+        """1件のメッセージとして送り、Embedごとに記録するキーを渡す"""
+        count = len(batch)
+        embeds = [embed for embed, _ in batch]
+        if count > 1:
+            for index, embed in enumerate(embeds, 1):
+                # 既存のフッター（投稿日時など）は残し、記事の番号を後ろに付ける
+                footer = BATCH_FOOTER.format(index=index, count=count)
+                if embed.footer.text:
+                    footer = f"{embed.footer.text} ・ {footer}"
+                embed.set_footer(text=footer, icon_url=embed.footer.icon_url)
+
+        message_id = None
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        try:
+            async with lock:
+                message_id = await self.send(channel_id, embeds)
+        except Exception as e:
+            logger.error(f"記事のまとめ投稿中にエラーが発生しました: {channel_id}: {e}", exc_info=True)
+
+        if message_id:
+            self.stats["messages"] += 1
+            self.stats["embeds"] += count
+            if count > 1:
+                logger.info(f"{count}件の記事を1件のメッセージにまとめて投稿しました: {channel_id}")
+        else:
+            self.stats["failed"] += count
+        for index, (_, on_posted) in enumerate(batch, 1):
+            if on_posted is None:
+                continue
+            try:
+                await on_posted(article_key(message_id, index, count) if message_id else None)
+            except Exception as e:
+                logger.error(f"投稿した記事の記録中にエラーが発生しました: {channel_id}: {e}", exc_info=True)
@@ -17,7 +17,10 @@ from discord import app_commands
 from discord.ext import commands
 
 from .message_builder import MessageBuilder
+from .batch_poster import BatchPoster, OnPosted, select_batched_article
+from .send_queue import SendQueue
 from .commands import register_commands
+from .streaming_reply import EMPTY_ANSWER, StreamingReply, split_message
 from utils.helpers import get_channel_name_for_feed
 
 logger = logging.getLogger(__name__)
@@ -48,11 +51,29 @@ class DiscordBot:
         intents.message_content = True
         intents.members = True
         
-        # ボットの初期化
-        self.bot = commands.Bot(command_prefix="!", intents=intents)
+        # ボットの初期化（retry_afterが長い429はdiscord.py内で待たずに送信キューへ返す）
+        self.bot = commands.Bot(
+            command_prefix="!",
+            intents=intents,
+            max_ratelimit_timeout=config.get("send_max_ratelimit_timeout", 30.0),
+        )
         
         # メッセージビルダーの初期化
         self.message_builder = MessageBuilder(config)
+
+        # チャンネルへの投稿はチャンネルごとの送信キューから送る
+        self.send_queue = SendQueue(
+            rate=config.get("send_channel_rate", 5),
+            per=config.get("send_channel_per", 5.0),
+            max_retries=config.get("send_max_retries", 3),
+        )
+
+        # 同じチャンネルに続けて届いた記事を1件のメッセージにまとめて投稿する
+        self.batch_poster = BatchPoster(
+            self._send_embeds,
+            window=config.get("post_batch_window", 2.0),
+            max_embeds=config.get("post_batch_max_embeds", 10),
+        )
         
         # イベントハンドラの設定
         self._setup_event_handlers()
@@ -109,12 +130,15 @@ class DiscordBot:
                 ref = None
 
             if ref and ref.author.id == self.bot.user.id:
-                original_article = await self.feed_manager.article_store.get_full_article(str(ref.id))
+                article_store = self.feed_manager.article_store
+                original_article = await article_store.get_full_article(str(ref.id))
+                if not original_article and len(ref.embeds) > 1:
+                    # まとめて投稿した記事は質問の番号やタイトルから対象を選ぶ
+                    original_article = select_batched_article(
+                        await article_store.get_message_articles(str(ref.id)), message.content
+                    )
                 if original_article:
-                    keywords = await self.ai_processor._generate_search_keywords(original_article, message.content)
-                    related_articles = await self.feed_manager.article_store.find_related_articles(keywords, str(ref.id))
-                    answer = await self.ai_processor.answer_question(original_article, related_articles, message.content)
-                    await message.reply(answer)
+                    await self._reply_with_answer(message, original_article)
                     return
 
             await self.bot.process_commands(message)
@@ -135,6 +159,42 @@ class DiscordBot:
                 self.config_manager.save_config()
             logger.info(f"チャンネル削除に伴い {len(targets)} 件のフィードを削除しました: {channel_id}")
 
+    async def _reply_with_answer(self, message: discord.Message, original_article: Dict[str, Any]) -> None:
+        """
+        記事への質問に返信する
+
+        ストリーミングが有効な場合はプレースホルダーを投稿し、生成途中の回答で編集する。
+
+        Args:
+            message: 質問のメッセージ
+            original_article: 質問対象の記事
+        """
+        placeholder = None
+        if self.config.get("qa_streaming", True):
+            try:
+                placeholder = await message.reply("回答を生成しています…")
+            except discord.HTTPException as e:
+                logger.warning(f"プレースホルダーを投稿できませんでした: {e}")
+
+        if placeholder is None:
+            answer = await self.ai_processor.answer_reply(
+                self.feed_manager.article_store, original_article, message.content
+            )
+            for i, chunk in enumerate(split_message(answer or EMPTY_ANSWER)):
+                await (message.reply(chunk) if i == 0 else message.channel.send(chunk))
+            return
+
+        stream = StreamingReply(placeholder, self.config.get("qa_stream_edit_interval", 1.5))
+        try:
+            answer = await self.ai_processor.answer_reply(
+                self.feed_manager.article_store, original_article, message.content, on_text=stream.update
+            )
+        except Exception as e:
+            logger.error(f"回答の生成中にエラーが発生しました: {e}", exc_info=True)
+            await stream.fail()
+            return
+        await stream.finish(answer)
+
     async def start(self):
         """ボットを起動する"""
         try:
@@ -144,35 +204,100 @@ class DiscordBot:
             logger.error(f"ボット起動中にエラーが発生しました: {e}", exc_info=True)
             raise
     
-    async def post_article(self, article: Dict[str, Any], channel_id: str) -> Optional[int]:
+    async def close(self) -> None:
+        """投稿待ちと送信待ちのメッセージを送ってから送信キューを止め、Discordから切断する"""
+        try:
+            await asyncio.wait_for(self.batch_poster.flush(), self.config.get("shutdown_flush_timeout", 10.0))
+        except asyncio.TimeoutError:
+            logger.warning("終了までに送信できなかったメッセージを破棄します")
+        await self.send_queue.close()
+        if not self.bot.is_closed():
+            await self.bot.close()
+        logger.info("Discordボットを終了しました")
+
+    async def post_article(
+        self, article: Dict[str, Any], channel_id: str, on_posted: Optional[OnPosted] = None
+    ) -> bool:
         """
         記事をDiscordチャンネルに投稿する
+
+        同じチャンネルに続けて届いた記事は1件のメッセージにまとめて投稿する。
+        送信待ちに入れた時点で戻り、送信の完了（レート制限による待機を含む）は待たない。
         
         Args:
             article: 記事データ
             channel_id: 投稿先チャンネルID
+            on_posted: 送信後に記事を記録するキーを受け取るコルーチン関数
+                （1件だけのメッセージはメッセージID、まとめた場合は「メッセージID:番号」。失敗した場合はNone）
             
         Returns:
-            投稿成功の場合はTrue、失敗の場合はFalse
+            送信待ちに入れた場合はTrue
         """
         try:
-            # チャンネルの取得
-            channel = self.bot.get_channel(int(channel_id))
-            if not channel:
-                logger.warning(f"チャンネルが見つかりません: {channel_id}")
-                return False
-            
             # Embedの構築
             embed = await self.message_builder.build_article_embed(article)
-            
-            # 投稿
-            msg = await channel.send(embed=embed)
-            logger.info(f"記事を投稿しました: {article.get('title')} -> #{channel.name}")
+            title = article.get("title")
 
-            return msg.id
+            async def posted(key: Optional[str]) -> None:
+                if key:
+                    logger.info(f"記事を投稿しました: {title} -> {key}")
+                if on_posted is not None:
+                    await on_posted(key)
+
+            # 投稿
+            self.batch_poster.submit(channel_id, embed, posted)
+            return True
             
         except Exception as e:
             logger.error(f"記事投稿中にエラーが発生しました: {article.get('title')}: {e}", exc_info=True)
+            return False
+
+    async def flush_posts(self) -> None:
+        """まとめ投稿を待っている記事を待たずに送る（送信の完了は待たない）"""
+        await self.batch_poster.flush(wait=False)
+
+    async def _send_embeds(self, channel_id: str, embeds: List[discord.Embed]) -> Optional[int]:
+        """
+        Embedのリストを1件のメッセージとして送信する
+
+        Args:
+            channel_id: 投稿先チャンネルID
+            embeds: Embedのリスト（最大10個）
+
+        Returns:
+            送信したメッセージのID（チャンネルが見つからない場合はNone）
+        """
+        channel = self.bot.get_channel(int(channel_id))
+        if not channel:
+            logger.warning(f"チャンネルが見つかりません: {channel_id}")
+            return None
+        msg = await self.send_queue.send(channel_id, lambda: channel.send(embeds=embeds))
+        return msg.id
+
+    async def post_digest(self, digest: Dict[str, Any], channel_id: str) -> Optional[int]:
+        """
+        ダイジェストをDiscordチャンネルに1件のメッセージとして投稿する
+
+        Args:
+            digest: ダイジェスト（feed_title, overview, items）
+            channel_id: 投稿先チャンネルID
+
+        Returns:
+            投稿したメッセージのID（失敗した場合はNone）
+        """
+        try:
+            channel = self.bot.get_channel(int(channel_id))
+            if not channel:
+                logger.warning(f"チャンネルが見つかりません: {channel_id}")
+                return None
+
+            embed = self.message_builder.build_digest_embed(digest)
+            msg = await self.send_queue.send(channel_id, lambda: channel.send(embed=embed))
+            logger.info(f"ダイジェストを投稿しました: {len(digest.get('items', []))}件 -> #{channel.name}")
+            return msg.id
+
+        except Exception as e:
+            logger.error(f"ダイジェスト投稿中にエラーが発生しました: {e}", exc_info=True)
             return None
 
     async def send_message(self, channel_id: str, content: str) -> bool:
@@ -182,7 +307,7 @@ class DiscordBot:
             if not channel:
                 logger.warning(f"チャンネルが見つかりません: {channel_id}")
                 return False
-            await channel.send(content)
+            await self.send_queue.send(channel_id, lambda: channel.send(content))
             return True
         except Exception as e:
             logger.error(f"メッセージ送信中にエラーが発生しました: {e}", exc_info=True)
@@ -245,7 +370,7 @@ class DiscordBot:
             embed.add_field(name="フィードURL", value=feed_url, inline=False)
             embed.add_field(name="更新頻度", value=f"{self.config.get('check_interval', 15)}分ごと", inline=True)
             
-            await channel.send(embed=embed)
+            await self.send_queue.send(channel.id, lambda: channel.send(embed=embed))
             
             return str(channel.id)
             
@@ -15,7 +15,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from .ui_components import ConfigView, FeedListView
+from ai.governor import use_lane
+from .ui_components import ConfigView, FeedListView, DIGEST_INTERVALS
 
 logger = logging.getLogger(__name__)
 
@@ -104,15 +105,11 @@ async def register_commands(bot: commands.Bot, config: Dict[str, Any]):
             entry = feed_data["entries"][0]
             entry["feed_title"] = feed_data.get("feed", {}).get("title", "")
             entry["feed_url"] = feed.get("url")
-            processed = await feed_manager.ai_processor.process_article(entry, feed)
-            msg_id = await feed_manager.discord_bot.post_article(processed, channel_id)
-            if msg_id:
-                await feed_manager.article_store.add_full_article(
-                    str(msg_id),
-                    channel_id,
-                    entry,
-                    processed.get("keywords_en", ""),
-                )
+            with use_lane("manual"):
+                processed = await feed_manager.ai_processor.process_article(entry, feed)
+            # 送信後に記事のキー（まとめて投稿した場合は「メッセージID:番号」）で記事ストアに記録する
+            await feed_manager.publish_article(entry, feed, processed)
+            await feed_manager.discord_bot.flush_posts()
             await interaction.followup.send("記事を投稿しました。", ephemeral=True)
         except Exception as e:
             logger.error(f"フィード確認中にエラーが発生しました: {e}", exc_info=True)
@@ -161,12 +158,19 @@ async def register_commands(bot: commands.Bot, config: Dict[str, Any]):
         url="RSSフィードのURL",
         channel_name="チャンネル名（省略可）",
         existing_channel="既存のチャンネル",
-        summary_length="要約の長さ"
+        summary_length="要約の長さ",
+        summary_mode="要約方法",
+        digest="ダイジェスト（指定した間隔の記事をまとめて1件で投稿）"
     )
     @app_commands.choices(summary_length=[
         app_commands.Choice(name="短め", value="short"),
         app_commands.Choice(name="通常", value="normal"),
         app_commands.Choice(name="長め", value="long")
+    ], summary_mode=[
+        app_commands.Choice(name="AI要約", value="ai"),
+        app_commands.Choice(name="抽出型（API不使用）", value="extractive")
+    ], digest=[
+        app_commands.Choice(name=label, value=minutes) for minutes, label in DIGEST_INTERVALS
     ])
     async def add_rss(
         interaction: discord.Interaction,
@@ -174,6 +178,8 @@ async def register_commands(bot: commands.Bot, config: Dict[str, Any]):
         channel_name: str = None,
         existing_channel: discord.TextChannel = None,
         summary_length: str = "normal",
+        summary_mode: str = "ai",
+        digest: int = 0,
     ):
         """RSSフィードを追加するコマンド"""
         try:
@@ -187,6 +193,8 @@ async def register_commands(bot: commands.Bot, config: Dict[str, Any]):
             success, message, feed_info = await feed_manager.add_feed(
                 url,
                 summary_type=summary_length,
+                summary_mode=summary_mode,
+                digest_minutes=digest,
             )
             
             if not success:
@@ -265,6 +273,179 @@ async def register_commands(bot: commands.Bot, config: Dict[str, Any]):
             embed.add_field(name="フィード確認中", value="はい" if checking else "いいえ", inline=True)
             embed.add_field(name="AIモデル", value=config.get("ai_model", "gemini-2.0-flash"), inline=True)
             embed.add_field(name="要約", value="有効" if config.get("summarize", True) else "無効", inline=True)
+
+            # APIキープールの状態
+            key_pool = getattr(feed_manager.ai_processor, "key_pool", None)
+            if key_pool and key_pool.states:
+                keys = key_pool.snapshot()
+                available = sum(1 for k in keys if not k["cooling_down"])
+                embed.add_field(
+                    name="APIキー",
+                    value=f"利用可能 {available}/{len(keys)}\n"
+                          f"実行中 {sum(k['in_flight'] for k in keys)}件",
+                    inline=True
+                )
+
+            # 言語判定により省略したAPI呼び出し
+            ai_stats = getattr(feed_manager.ai_processor, "stats", None)
+            if ai_stats is not None:
+                embed.add_field(
+                    name="API呼び出し削減",
+                    value=f"合計 {sum(ai_stats.values())}回\n"
+                          f"翻訳省略 {ai_stats.get('title_translation_skipped', 0)}回\n"
+                          f"ローカル要約 {ai_stats.get('local_summaries', 0)}回\n"
+                          f"ローカル分類 {ai_stats.get('local_classifications', 0)}回\n"
+                          f"ローカルキーワード {ai_stats.get('local_keywords', 0)}回\n"
+                          f"抽出型要約 {ai_stats.get('extractive_summaries', 0)}回",
+                    inline=True
+                )
+
+            # タスクごとの送信トークン数
+            prompt_budget = getattr(feed_manager.ai_processor, "prompt_budget", None)
+            if prompt_budget and prompt_budget.sent:
+                embed.add_field(
+                    name="送信トークン（推定）",
+                    value="\n".join(
+                        f"{task}: {tokens:,}" + (f"（切詰 {prompt_budget.truncated[task]}件）" if task in prompt_budget.truncated else "")
+                        for task, tokens in sorted(prompt_budget.sent.items())
+                    ),
+                    inline=True
+                )
+
+            # モデルルートごとのレイテンシとトークン数
+            router = getattr(feed_manager.ai_processor, "router", None)
+            route_stats = router.get_stats() if router else []
+            if route_stats:
+                embed.add_field(
+                    name="モデルルート",
+                    value="\n".join(
+                        f"{r['route']} → {r['model']}: {r['calls']}回"
+                        + (f"（失敗 {r['errors']}）" if r['errors'] else "")
+                        + f" 平均{r['avg_latency']:.1f}秒 入力{r['input_tokens']:,}/出力{r['output_tokens']:,}"
+                        for r in route_stats
+                    )[:1024],
+                    inline=False
+                )
+
+            # AI処理結果キャッシュの統計
+            result_cache = getattr(feed_manager.ai_processor, "result_cache", None)
+            if result_cache:
+                stats = result_cache.get_stats()
+                embed.add_field(
+                    name="AIキャッシュ",
+                    value=f"ヒット率 {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})\n"
+                          f"エントリ数 {stats['entries']}",
+                    inline=True
+                )
+
+            # 質問応答キャッシュの統計
+            qa_cache = getattr(feed_manager.ai_processor, "qa_cache", None)
+            if qa_cache:
+                stats = qa_cache.get_stats()
+                embed.add_field(
+                    name="Q&Aキャッシュ",
+                    value=f"ヒット {stats['hits']}回\n"
+                          f"処理中の質問に合流 {stats['coalesced']}回\n"
+                          f"回答生成 {stats['misses']}回",
+                    inline=True
+                )
+
+            # 質問応答コンテキストの再利用の統計
+            context_cache = getattr(feed_manager.ai_processor, "context_cache", None)
+            if context_cache:
+                stats = context_cache.get_stats()
+                embed.add_field(
+                    name="Q&Aコンテキスト",
+                    value=f"再利用 {stats['hits']}回\n"
+                          f"キャッシュ作成 {stats['created']}件\n"
+                          f"省略トークン {stats['tokens_saved']:,}",
+                    inline=True
+                )
+
+            # AIレーンごとの実行中・待機中のリクエスト数と処理待ちの記事数
+            governor = getattr(feed_manager.ai_processor, "governor", None)
+            if governor:
+                lanes = governor.snapshot()
+                embed.add_field(
+                    name="AIレーン",
+                    value="\n".join(
+                        f"{lane}: 実行 {l['running']} / 待機 {l['waiting']}（平均待機 {l['avg_wait']:.1f}秒）"
+                        for lane, l in lanes.items()
+                    ) + f"\n処理待ちの記事 {feed_manager.article_queue.qsize()}件",
+                    inline=False
+                )
+
+            # 期限切れとヘッジリクエストの件数
+            hedge_policy = getattr(feed_manager.ai_processor, "hedge_policy", None)
+            if hedge_policy:
+                stats = hedge_policy.get_stats()
+                embed.add_field(
+                    name="AIリクエスト",
+                    value=f"期限切れ {stats['timeouts']}件\n"
+                          f"ヘッジ {stats['hedged']}/{stats['requests']}件（先に応答 {stats['hedge_wins']}件）\n"
+                          f"キャンセル {stats['cancelled']}件",
+                    inline=True
+                )
+
+            # 記事のまとめ投稿の件数
+            batch_poster = getattr(feed_manager.discord_bot, "batch_poster", None)
+            if batch_poster and batch_poster.stats["messages"]:
+                stats = batch_poster.stats
+                embed.add_field(
+                    name="記事の投稿",
+                    value=f"{stats['embeds']}件を{stats['messages']}メッセージで投稿\n"
+                          f"失敗 {stats['failed']}件",
+                    inline=True
+                )
+
+            # チャンネルごとの送信キュー（送信待ちの多い順に最大5件）
+            send_queue = getattr(feed_manager.discord_bot, "send_queue", None)
+            if send_queue:
+                channels = sorted(
+                    send_queue.snapshot().items(), key=lambda item: (-item[1]["depth"], -item[1]["sent"])
+                )[:5]
+                if channels:
+                    embed.add_field(
+                        name="チャンネル別の送信キュー",
+                        value="\n".join(
+                            f"<#{channel_id}>: 待機 {q['depth']}件（最大 {q['max_depth']}件）"
+                            f" / 送信 {q['sent']}件・平均 {q['avg_latency']:.1f}秒"
+                            f" / 429 {q['rate_limited']}回・失敗 {q['failed']}件"
+                            for channel_id, q in channels
+                        ),
+                        inline=False
+                    )
+
+            # フィードごとのAPI使用量（直近7日間、トークン数の多い順）
+            await feed_manager.flush_ai_usage()
+            usage = await feed_manager.article_store.get_ai_usage_summary(days=7, limit=5)
+            if usage:
+                titles = {feed.get("url"): feed.get("title") or feed.get("url") for feed in feed_manager.get_feeds()}
+                embed.add_field(
+                    name="フィード別AI使用量（7日間）",
+                    value="\n".join(
+                        f"{titles.get(u['feed_url']) or u['feed_url'] or 'その他'}: {u['calls']}回 "
+                        f"入力{u['input_tokens']:,}/出力{u['output_tokens']:,} 平均{u['avg_latency']:.1f}秒"
+                        + (f" 再試行{u['retries']}" if u['retries'] else "")
+                        + (f"（失敗 {u['errors']}）" if u['errors'] else "")
+                        + "\n  " + ", ".join(f"{task or '-'} {tokens:,}" for task, tokens in u['tasks'].items())
+                        for u in usage
+                    )[:1024],
+                    inline=False
+                )
+
+            # プロンプトのバージョンごとの1回あたりのトークン数とレイテンシ（バージョンの比較用）
+            prompt_usage = await feed_manager.article_store.get_ai_usage_by_prompt(days=7)
+            if prompt_usage:
+                embed.add_field(
+                    name="プロンプト別（7日間、1回あたり）",
+                    value="\n".join(
+                        f"{p['prompt']}: {p['calls']}回 入力{p['avg_input_tokens']:,.0f}/出力{p['avg_output_tokens']:,.0f} "
+                        f"平均{p['avg_latency']:.1f}秒" + (f"（失敗 {p['errors']}）" if p['errors'] else "")
+                        for p in prompt_usage
+                    )[:1024],
+                    inline=False
+                )
             
             # 最終更新日時
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -280,6 +461,39 @@ async def register_commands(bot: commands.Bot, config: Dict[str, Any]):
                 ephemeral=True
             )
     
+    @rss_group.command(name="retrain_classifier", description="ジャンル分類器を再学習し、精度レポートを表示します")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def rss_retrain_classifier(interaction: discord.Interaction):
+        """ローカル分類器を再学習するコマンド"""
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            report = await feed_manager.ai_processor.retrain_classifier(feed_manager.article_store)
+            if report.get("error"):
+                await interaction.followup.send(f"再学習できませんでした: {report['error']}", ephemeral=True)
+                return
+
+            embed = discord.Embed(
+                title="ジャンル分類器の再学習",
+                description=f"学習データ: {report['samples']}件（検証用 {report['test']}件）\n"
+                            f"全体の正解率: {report['accuracy']:.1%}\n"
+                            f"現在の閾値: {report['current_threshold']}",
+                color=discord.Color(config.get("embed_color", 3447003))
+            )
+            # 閾値ごとの正解率とAPI呼び出しの削減率
+            lines = [
+                f"{row['threshold']:.2f}: 正解率 {row['accuracy']:.1%} / 削減率 {row['coverage']:.1%}"
+                for row in report["thresholds"]
+            ]
+            embed.add_field(name="閾値ごとの精度と削減率", value="\n".join(lines), inline=False)
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logger.error(f"分類器の再学習中にエラーが発生しました: {e}", exc_info=True)
+            await interaction.followup.send(
+                f"エラーが発生しました: {str(e)}",
+                ephemeral=True
+            )
+
     # コマンドグループをツリーに追加
     bot.tree.add_command(rss_group)
     
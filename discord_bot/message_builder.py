@@ -16,6 +16,12 @@ import discord
 
 logger = logging.getLogger(__name__)
 
+# Embed全体の最大文字数
+EMBED_TOTAL_LIMIT = 6000
+
+# ダイジェストに載せる最大記事数（Embedのフィールド数の上限）
+DIGEST_MAX_FIELDS = 25
+
 class MessageBuilder:
     """メッセージビルダークラス"""
     
@@ -128,6 +134,40 @@ class MessageBuilder:
             )
             return embed
     
+    def build_digest_embed(self, digest: Dict[str, Any]) -> discord.Embed:
+        """
+        ダイジェストのEmbedを構築する（記事ごとに1つのフィールド）
+
+        Embed全体の文字数上限に収まるように、記事数に応じて各フィールドの要約を切り詰める。
+
+        Args:
+            digest: ダイジェスト（feed_title, overview, items）
+
+        Returns:
+            discord.Embed
+        """
+        items = digest.get("items", [])[:DIGEST_MAX_FIELDS]
+        title = f"📰 {digest.get('feed_title') or 'フィード'} ダイジェスト（{len(items)}件）"
+        embed = discord.Embed(
+            title=title[:256],
+            description=self._truncate_content(digest.get("overview", ""), 1000),
+            color=discord.Color(self.config.get("embed_color", 0x3498db)),
+        )
+
+        # タイトル・説明・フッターを除いた残りを記事ごとのフィールドで分け合う
+        remaining = EMBED_TOTAL_LIMIT - 100 - len(embed.title) - len(embed.description or "")
+        budget = remaining // max(1, len(items))
+        for item in items:
+            name = (item.get("title") or "無題")[:min(256, max(20, budget // 3))]
+            limit = min(1024, budget - len(name))
+            link = item.get("link", "")
+            suffix = f"\n[記事を読む]({link})" if link and len(link) + 12 < limit // 2 else ""
+            value = self._truncate_content(item.get("summary") or "", limit - len(suffix)) + suffix
+            embed.add_field(name=name, value=value or "-", inline=False)
+
+        embed.set_footer(text=datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return embed
+
     def _truncate_content(self, content: str, max_length: int = 4000) -> str:
         """
         コンテンツを適切な長さに切り詰める
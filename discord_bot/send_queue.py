@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+チャンネルごとの送信キュー
+
+Discordへの投稿をチャンネルごとのキューに入れ、チャンネルごとの専用ワーカーが順番に送信する。
+Discordのレート制限はチャンネル（ルート）ごとのバケットで管理されるため、
+チャンネルごとのトークンバケットで先回りして送信間隔を空け、429が返った場合は
+そのチャンネルだけretry_after秒待ってから再送する（他のチャンネルの送信は止めない）。
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import discord
+
+from utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# retry_afterが分からない429の待ち時間（秒）
+DEFAULT_RETRY_AFTER = 5.0
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    レート制限エラーの待ち時間を取得する
+
+    Args:
+        error: 送信時の例外
+
+    Returns:
+        待ち時間（秒）。レート制限エラーでない場合はNone
+    """
+    if isinstance(error, discord.RateLimited):
+        return float(error.retry_after)
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        headers = getattr(error.response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+    return None
+
+
+class _ChannelState:
+    """チャンネルごとのキュー・ワーカー・トークンバケット・統計"""
+
+    def __init__(self, rate: int, per: float):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        self.bucket = TokenBucket(rate, rate / per)
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "rate_limited": 0,
+            "max_depth": 0,
+            "total_latency": 0.0,
+            "last_latency": 0.0,
+        }
+
+
+class SendQueue:
+    """チャンネルごとの送信キュー
+
+    送信はチャンネルごとに届いた順に1件ずつ行い、チャンネル同士は独立して並行に送る。
+    """
+
+    def __init__(
+        self,
+        rate: int = 5,
+        per: float = 5.0,
+        max_retries: int = 3,
+        idle_timeout: float = 300.0,
+    ):
+        """
+        初期化
+
+        Args:
+            rate: チャンネルごとにper秒あたり送信できるメッセージ数
+            per: rateの単位となる秒数
+            max_retries: 429が返った場合に再送する最大回数
+            idle_timeout: キューが空のままこの秒数たったワーカーを終了する
+        """
+        self.rate = max(1, int(rate))
+        self.per = max(0.001, float(per))
+        self.max_retries = max(0, int(max_retries))
+        self.idle_timeout = idle_timeout
+        self._channels: Dict[str, _ChannelState] = {}
+
+    async def send(self, channel_id: Any, send: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        送信をチャンネルのキューに入れ、送信の完了を待つ
+
+        Args:
+            channel_id: 送信先チャンネルID
+            send: 送信を行うコルーチン関数（再送時にもう一度呼ぶ）
+
+        Returns:
+            sendの戻り値（送信したメッセージなど）
+
+        Raises:
+            Exception: 送信に失敗した場合はsendの例外
+        """
+        channel_id = str(channel_id)
+        state = self._channels.get(channel_id)
+        if state is None:
+            state = self._channels[channel_id] = _ChannelState(self.rate, self.per)
+
+        future = asyncio.get_event_loop().create_future()
+        state.queue.put_nowait((send, future, time.monotonic()))
+        state.stats["max_depth"] = max(state.stats["max_depth"], state.queue.qsize())
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.create_task(self._worker(channel_id, state))
+        return await future
+
+    def depth(self, channel_id: Any) -> int:
+        """チャンネルのキューで送信を待っている数を取得する"""
+        state = self._channels.get(str(channel_id))
+        return state.queue.qsize() if state else 0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        チャンネルごとの送信状況を取得する
+
+        Returns:
+            チャンネルIDごとのキューの長さ、送信数、失敗数、429の回数、送信までの平均と直近の秒数
+        """
+        result = {}
+        for channel_id, state in self._channels.items():
+            stats = state.stats
+            result[channel_id] = {
+                "depth": state.queue.qsize(),
+                "max_depth": stats["max_depth"],
+                "sent": stats["sent"],
+                "failed": stats["failed"],
+                "rate_limited": stats["rate_limited"],
+                "avg_latency": stats["total_latency"] / stats["sent"] if stats["sent"] else 0.0,
+                "last_latency": stats["last_latency"],
+            }
+        return result
+
+    async def close(self) -> None:
+        """ワーカーを停止する（キューに残っている送信はキャンセルする）"""
+        for state in self._channels.values():
+            if state.worker is not None:
+                state.worker.cancel()
+            while not state.queue.empty():
+                _, future, _ = state.queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+        workers = [state.worker for state in self._channels.values() if state.worker is not None]
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self, channel_id: str, state: _ChannelState) -> None:
+        """チャンネルのキューから1件ずつ取り出して送信する"""
+        while True:
+            try:
+                send, future, queued_at = await asyncio.wait_for(state.queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if state.queue.empty():
+                    return
+                continue
+
+            if not future.done():
+                await self._deliver(channel_id, state, send, future, queued_at)
+
+    async def _deliver(
+        self,
+        channel_id: str,
+        state: _ChannelState,
+        send: Callable[[], Awaitable[Any]],
+        future: asyncio.Future,
+        queued_at: float,
+    ) -> None:
+        """1件を送信して結果を返す（例外のトレースバックにワーカーのフレームを含めないため分けている）"""
+        try:
+            result = await self._send_with_retry(channel_id, state, send)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+        except Exception as e:
+            state.stats["failed"] += 1
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        latency = time.monotonic() - queued_at
+        state.stats["sent"] += 1
+        state.stats["total_latency"] += latency
+        state.stats["last_latency"] = latency
+        if not future.done():
+            future.set_result(result)
+
+    async def _send_with_retry(self, channel_id: str, state: _ChannelState, send: Callable[[], Awaitable[Any]]) -> Any:
+        """トークンバケットで送信間隔を空けて送信し、429の場合はretry_after秒待って再送する"""
+        attempt = 0
+        while True:
+            wait = state.bucket.time_until(1)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            state.bucket.consume(1)
+            try:
+                return await send()
+            except Exception as e:
+                retry_after = get_retry_after(e)
+                if retry_after is None:
+                    raise
+                state.stats["rate_limited"] += 1
+                if attempt >= self.max_retries:
+                    logger.error(f"レート制限のため送信できませんでした: {channel_id}")
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"チャンネル{channel_id}がレート制限されました。{retry_after:.1f}秒後に再送します"
+                    f"（{attempt}/{self.max_retries}）"
+                )
+                # バケットを空にして、待ち時間の間はこのチャンネルの送信を止める
+                state.bucket.consume(state.bucket.available())
+                await asyncio.sleep(retry_after)
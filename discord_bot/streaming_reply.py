@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ストリーミング返信
+
+生成途中の回答でプレースホルダーのメッセージを一定間隔ごとに編集する
+"""
+
+import time
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discordのメッセージの最大文字数
+MESSAGE_LIMIT = 2000
+
+# 生成途中であることを示す末尾の記号
+STREAMING_SUFFIX = " …"
+
+# 回答が空だった場合にプレースホルダーを置き換えるテキスト
+EMPTY_ANSWER = "回答を生成できませんでした。質問を変えてもう一度お試しください。"
+
+# 回答の生成中にエラーが発生した場合にプレースホルダーを置き換えるテキスト
+ERROR_ANSWER = "回答の生成中にエラーが発生しました。しばらくしてからもう一度お試しください。"
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    テキストをDiscordのメッセージの文字数上限ごとに分割する
+
+    できるだけ改行の位置で分割する。
+
+    Args:
+        text: 分割するテキスト
+        limit: 1メッセージの最大文字数
+
+    Returns:
+        分割したテキストのリスト
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text or not chunks:
+        chunks.append(text)
+    return chunks
+
+
+class StreamingReply:
+    """生成途中の回答でメッセージを間引いて編集するクラス
+
+    編集はバックグラウンドで行い、前回の編集から一定間隔が経つまで次の編集を行わない。
+    間引かれたテキストはfinishで最終的な回答に置き換える。
+    """
+
+    def __init__(
+        self,
+        message: discord.Message,
+        interval: float = 1.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            message: 編集するプレースホルダーのメッセージ
+            interval: 編集の最小間隔（秒）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.message = message
+        self.interval = interval
+        self.clock = clock
+        self.edits = 0
+        self._last_edit: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def update(self, text: str) -> None:
+        """
+        生成途中のテキストを反映する（前回の編集から間隔が空いていない場合は何もしない）
+
+        Args:
+            text: それまでに生成されたテキスト全体
+        """
+        if self._task and not self._task.done():
+            return
+        now = self.clock()
+        if self._last_edit is not None and now - self._last_edit < self.interval:
+            return
+        self._last_edit = now
+        preview = text[: MESSAGE_LIMIT - len(STREAMING_SUFFIX)] + STREAMING_SUFFIX
+        self._task = asyncio.create_task(self._edit(preview))
+
+    async def finish(self, text: str) -> None:
+        """
+        最終的な回答でメッセージを置き換える（上限を超える部分は続けて送信する）
+
+        Args:
+            text: 最終的な回答（空の場合はEMPTY_ANSWERに置き換える）
+        """
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+        # 空のテキストへの編集はDiscordに拒否され、プレースホルダーが残るため置き換える
+        chunks = split_message(text if text and text.strip() else EMPTY_ANSWER)
+        await self._edit(chunks[0])
+        for chunk in chunks[1:]:
+            try:
+                await self.message.channel.send(chunk)
+            except discord.HTTPException as e:
+                logger.warning(f"回答の続きを送信できませんでした: {e}")
+
+    async def fail(self, text: str = ERROR_ANSWER) -> None:
+        """
+        回答を生成できなかったことをプレースホルダーに表示する
+
+        Args:
+            text: 表示するメッセージ
+        """
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._edit(text)
+
+    async def _edit(self, content: str) -> None:
+        """メッセージを編集する（失敗してもストリーミングは続ける）"""
+        try:
+            await self.message.edit(content=content)
+            self.edits += 1
+        except discord.HTTPException as e:
+            logger.warning(f"回答メッセージの編集に失敗しました: {e}")
@@ -12,6 +12,7 @@ import asyncio
 from typing import Dict, Any, List, Optional
 
 from ai.ai_processor import AIProcessor
+from ai.model_router import ModelRouter
 from apscheduler.triggers.interval import IntervalTrigger
 
 import discord
@@ -19,6 +20,24 @@ from discord import ui
 
 logger = logging.getLogger(__name__)
 
+# ダイジェストの間隔の選択肢（分, 表示名）
+DIGEST_INTERVALS = [
+    (0, "なし（記事ごとに投稿）"),
+    (60, "1時間ごと"),
+    (180, "3時間ごと"),
+    (360, "6時間ごと"),
+    (720, "12時間ごと"),
+    (1440, "1日ごと"),
+]
+
+def digest_label(minutes: int) -> str:
+    """ダイジェストの間隔の表示名"""
+    for value, label in DIGEST_INTERVALS:
+        if value == minutes:
+            return label
+    return f"{minutes}分ごと" if minutes else DIGEST_INTERVALS[0][1]
+
+
 class ConfigView(ui.View):
     """設定パネルビュー"""
 
@@ -97,6 +116,11 @@ class ConfigView(ui.View):
         # カテゴリ設定モーダルを表示
         await interaction.response.send_modal(CategorySettingsModal(self.config, self.config_manager))
 
+    @ui.button(label="モデルルーティング", style=discord.ButtonStyle.secondary, custom_id="model_routing")
+    async def model_routing(self, interaction: discord.Interaction, button: ui.Button):
+        """モデルルーティング設定ボタン"""
+        await interaction.response.send_modal(ModelRoutingModal(self.config, self.config_manager, self.feed_manager))
+
     @ui.button(label="Gemini API追加", style=discord.ButtonStyle.primary, custom_id="gemini_api_add")
     async def gemini_api_add(self, interaction: discord.Interaction, button: ui.Button):
         """Gemini APIキー追加ボタン"""
@@ -155,6 +179,8 @@ class AIModelSelect(ui.Select):
             pass
         from ai.ai_processor import AIProcessor
         self.feed_manager.ai_processor = AIProcessor(self.feed_manager.config)
+        # 質問応答も新しいプロセッサー（とそのクライアント）を使う
+        self.feed_manager.discord_bot.ai_processor = self.feed_manager.ai_processor
 
         # 応答を送信
         await interaction.response.send_message(
@@ -343,6 +369,70 @@ class CategorySettingsModal(ui.Modal, title="カテゴリ設定"):
             )
 
 
+class ModelRoutingModal(ui.Modal, title="モデルルーティング設定"):
+    """モデルルーティング設定モーダル"""
+
+    def __init__(self, config: Dict[str, Any], config_manager, feed_manager):
+        """
+        初期化
+
+        Args:
+            config: 設定辞書
+            config_manager: 設定マネージャーインスタンス
+            feed_manager: フィードマネージャーインスタンス
+        """
+        super().__init__()
+        self.config = config
+        self.config_manager = config_manager
+        self.feed_manager = feed_manager
+
+        routes = config.get("model_routes", {})
+        self.routes_input = ui.TextInput(
+            label="ルート（タスク[:長さ]=モデル）",
+            style=discord.TextStyle.paragraph,
+            placeholder="title=gemini-2.0-flash-lite\nsummary:long=gemini-2.5-flash\nqa=gemini-2.5-flash",
+            default="\n".join(f"{key}={model}" for key, model in routes.items()),
+            required=False
+        )
+        self.short_input = ui.TextInput(
+            label="shortとするトークン数（未満）",
+            default=str(config.get("model_route_short_tokens", 500)),
+            required=True
+        )
+        self.long_input = ui.TextInput(
+            label="longとするトークン数（以上）",
+            default=str(config.get("model_route_long_tokens", 3000)),
+            required=True
+        )
+        self.add_item(self.routes_input)
+        self.add_item(self.short_input)
+        self.add_item(self.long_input)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        """送信時のコールバック"""
+        try:
+            routes = ModelRouter.parse_routes(self.routes_input.value)
+            short_tokens = int(self.short_input.value)
+            long_tokens = int(self.long_input.value)
+            if not 0 < short_tokens < long_tokens:
+                raise ValueError("トークン数は 0 < short < long にしてください")
+        except ValueError as e:
+            await interaction.response.send_message(f"設定を保存できませんでした: {e}", ephemeral=True)
+            return
+
+        self.config["model_routes"] = routes
+        self.config["model_route_short_tokens"] = short_tokens
+        self.config["model_route_long_tokens"] = long_tokens
+        self.config_manager.update_config(self.config)
+
+        # 実行中のプロセッサーにも反映する（キープールとクライアントはそのまま使う）
+        self.feed_manager.ai_processor.router.update(routes, short_tokens, long_tokens)
+
+        await interaction.response.send_message(
+            f"モデルルーティングを更新しました。{len(routes)}件のルートが設定されています。",
+            ephemeral=True
+        )
+
 class GeminiAPIKeyModal(ui.Modal, title="Gemini APIキー追加"):
     """Gemini APIキー追加モーダル"""
 
@@ -371,6 +461,7 @@ class GeminiAPIKeyModal(ui.Modal, title="Gemini APIキー追加"):
                 pass
             from ai.ai_processor import AIProcessor
             self.feed_manager.ai_processor = AIProcessor(self.feed_manager.config)
+            self.feed_manager.discord_bot.ai_processor = self.feed_manager.ai_processor
         await interaction.response.send_message("Gemini APIキーを追加しました", ephemeral=True)
 
 class FeedListView(ui.View):
@@ -394,7 +485,7 @@ class FeedListView(ui.View):
         
         # フィード選択メニューの追加
         if feeds:
-            self.add_item(FeedSelect(feeds))
+            self.add_item(FeedSelect(feeds, config_manager))
 
     @ui.button(label="フィード追加", style=discord.ButtonStyle.success, custom_id="add_feed")
     async def add_feed(self, interaction: discord.Interaction, button: ui.Button):
@@ -424,14 +515,16 @@ class FeedListView(ui.View):
 class FeedSelect(ui.Select):
     """フィード選択メニュー"""
     
-    def __init__(self, feeds: List[Dict[str, Any]]):
+    def __init__(self, feeds: List[Dict[str, Any]], config_manager=None):
         """
         初期化
         
         Args:
             feeds: フィードリスト
+            config_manager: 設定マネージャーインスタンス（フィード設定の保存用）
         """
         self.feeds = feeds
+        self.config_manager = config_manager
         
         # オプションの作成
         options = []
@@ -475,9 +568,60 @@ class FeedSelect(ui.Select):
         embed.add_field(name="URL", value=feed.get("url", ""), inline=False)
         embed.add_field(name="チャンネルID", value=feed.get("channel_id", "未設定"), inline=True)
         embed.add_field(name="最終更新", value=feed.get("last_updated", "未更新"), inline=True)
+        embed.add_field(name="ダイジェスト", value=digest_label(feed.get("digest_minutes", 0)), inline=True)
         
-        # 応答を送信
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        # 応答を送信（フィードごとの設定を変更できるようにする）
+        view = FeedSettingsView(feed, self.config_manager) if self.config_manager else None
+        if view:
+            await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+class FeedSettingsView(ui.View):
+    """フィードごとの設定ビュー"""
+
+    def __init__(self, feed: Dict[str, Any], config_manager):
+        """
+        初期化
+
+        Args:
+            feed: 対象のフィード情報
+            config_manager: 設定マネージャーインスタンス
+        """
+        super().__init__(timeout=300)
+        self.feed = feed
+        self.config_manager = config_manager
+        self.digest_select = DigestIntervalSelect(feed.get("digest_minutes", 0))
+        self.digest_select.callback = self.on_digest_select
+        self.add_item(self.digest_select)
+
+    async def on_digest_select(self, interaction: discord.Interaction):
+        """ダイジェストの間隔を変更する"""
+        self.feed["digest_minutes"] = int(self.digest_select.values[0])
+        self.config_manager.save_config()
+        await interaction.response.send_message(
+            f"「{self.feed.get('title', self.feed.get('url'))}」のダイジェストを"
+            f"「{digest_label(self.feed['digest_minutes'])}」に設定しました。",
+            ephemeral=True
+        )
+
+
+class DigestIntervalSelect(ui.Select):
+    """ダイジェストの間隔選択メニュー"""
+
+    def __init__(self, current: int = 0):
+        """
+        初期化
+
+        Args:
+            current: 現在の間隔（分、0の場合は記事ごとに投稿）
+        """
+        options = [
+            discord.SelectOption(label=label, value=str(minutes), default=minutes == current)
+            for minutes, label in DIGEST_INTERVALS
+        ]
+        super().__init__(placeholder="ダイジェストの間隔を選択", options=options)
 
 class AddFeedModal(ui.Modal, title="フィード追加"):
     """フィード追加モーダル"""
@@ -522,6 +666,20 @@ class AddFeedModal(ui.Modal, title="フィード追加"):
         )
         self.add_item(self.summary_select)
 
+        # 要約方法選択
+        self.summary_mode_select = ui.Select(
+            placeholder="要約方法を選択",
+            options=[
+                discord.SelectOption(label="AI要約", value="ai", default=True),
+                discord.SelectOption(label="抽出型（API不使用）", value="extractive")
+            ]
+        )
+        self.add_item(self.summary_mode_select)
+
+        # ダイジェスト選択
+        self.digest_select = DigestIntervalSelect()
+        self.add_item(self.digest_select)
+
     
     async def on_submit(self, interaction: discord.Interaction):
         """送信時のコールバック"""
@@ -533,11 +691,15 @@ class AddFeedModal(ui.Modal, title="フィード追加"):
         
         try:
             summary_type = self.summary_select.values[0]
+            summary_mode = self.summary_mode_select.values[0] if self.summary_mode_select.values else "ai"
+            digest_minutes = int(self.digest_select.values[0]) if self.digest_select.values else 0
 
             # フィードの追加
             success, message, feed_info = await self.feed_manager.add_feed(
                 self.url_input.value,
                 summary_type=summary_type,
+                summary_mode=summary_mode,
+                digest_minutes=digest_minutes,
             )
             
             if not success:
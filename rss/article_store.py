@@ -11,23 +11,29 @@ import os
 import logging
 import sqlite3
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from datetime import datetime, timezone, timedelta
 
+from .vector_index import VectorIndex
+
 logger = logging.getLogger(__name__)
 
 class ArticleStore:
     """処理済み記事管理クラス"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, vector_index: Optional[VectorIndex] = None):
         """
         初期化
         
         Args:
             db_path: データベースファイルのパス（指定がない場合はデフォルト）
+            vector_index: 関連記事検索に使うベクトル索引（省略時はキーワード検索のみ）
         """
         self.db_path = db_path or os.path.join("data", "processed_articles.db")
+        self.vector_index = vector_index
         self.lock = asyncio.Lock()  # 同時アクセス防止用ロック
+        # 件数上限により記事全文が削除されたときに呼ぶコルーチン関数
+        self._eviction_listeners: List[Callable[[List[str]], Awaitable[None]]] = []
         
         # データベースの初期化
         self._init_db()
@@ -60,11 +66,45 @@ class ArticleStore:
                     content TEXT,
                     feed_url TEXT,
                     created_at TEXT NOT NULL,
-                    keywords_en TEXT
+                    keywords_en TEXT,
+                    category TEXT,
+                    category_source TEXT
                 )
             ''')
 
+            # 分類結果の列がない既存のデータベースに列を追加する
+            cursor.execute('PRAGMA table_info(articles)')
+            columns = {row[1] for row in cursor.fetchall()}
+            for column in ("category", "category_source"):
+                if column not in columns:
+                    cursor.execute(f'ALTER TABLE articles ADD COLUMN {column} TEXT')
+
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_channel ON articles (channel_id)')
+
+            # Gemini APIの呼び出しごとの使用量
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ai_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL,
+                    feed_url TEXT NOT NULL,
+                    task TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    input_tokens INTEGER NOT NULL,
+                    output_tokens INTEGER NOT NULL,
+                    latency REAL NOT NULL,
+                    retries INTEGER NOT NULL,
+                    key_index INTEGER,
+                    success INTEGER NOT NULL,
+                    prompt TEXT NOT NULL DEFAULT '',
+                    call_id TEXT NOT NULL DEFAULT ''
+                )
+            ''')
+            cursor.execute('PRAGMA table_info(ai_usage)')
+            usage_columns = {row[1] for row in cursor.fetchall()}
+            for column in ('prompt', 'call_id'):
+                if column not in usage_columns:
+                    cursor.execute(f"ALTER TABLE ai_usage ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_usage_created ON ai_usage (created_at)')
             
             # インデックス作成
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_url ON processed_articles (feed_url)')
@@ -276,6 +316,15 @@ class ArticleStore:
         finally:
             conn.close()
 
+    def add_eviction_listener(self, listener: Callable[[List[str]], Awaitable[None]]) -> None:
+        """
+        記事全文が件数上限により削除されたときの通知先を登録する
+
+        Args:
+            listener: 削除された記事のメッセージIDのリストを受け取るコルーチン関数
+        """
+        self._eviction_listeners.append(listener)
+
     async def add_full_article(
         self,
         message_id: str,
@@ -283,23 +332,40 @@ class ArticleStore:
         article: Dict[str, Any],
         keywords_en: str,
         limit: int = 1000,
+        category: Optional[str] = None,
+        category_source: Optional[str] = None,
+        embedding: Optional[Any] = None,
     ) -> bool:
-        """記事全文を保存する"""
+        """記事全文を保存する（分類結果と分類方法（llm/local）、埋め込みベクトルも記録する）"""
         async with self.lock:
             try:
                 now = datetime.now(timezone.utc).isoformat()
                 loop = asyncio.get_event_loop()
-                await loop.run_in_executor(
+                evicted = await loop.run_in_executor(
                     None,
                     lambda: self._add_full_article(
-                        message_id, channel_id, article, keywords_en, now, limit
+                        message_id, channel_id, article, keywords_en, now, limit,
+                        category, category_source,
                     ),
                 )
-                return True
+                if embedding is not None and self.vector_index:
+                    await loop.run_in_executor(
+                        None,
+                        lambda: self.vector_index.add(channel_id, [message_id], embedding, limit),
+                    )
             except Exception as e:
                 logger.error(f"記事全文の保存中にエラーが発生しました: {e}", exc_info=True)
                 return False
 
+        # 通知先が記事ストアを参照できるよう、ロックを解放してから通知する
+        if evicted:
+            for listener in self._eviction_listeners:
+                try:
+                    await listener(evicted)
+                except Exception as e:
+                    logger.error(f"記事削除の通知中にエラーが発生しました: {e}", exc_info=True)
+        return True
+
     def _add_full_article(
         self,
         message_id: str,
@@ -308,12 +374,15 @@ class ArticleStore:
         keywords_en: str,
         created_at: str,
         limit: int,
-    ) -> None:
+        category: Optional[str] = None,
+        category_source: Optional[str] = None,
+    ) -> List[str]:
+        """記事全文を保存し、件数上限により削除した記事のメッセージIDを返す"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute(
-                'INSERT OR REPLACE INTO articles (message_id, channel_id, title, content, feed_url, created_at, keywords_en) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                'INSERT OR REPLACE INTO articles (message_id, channel_id, title, content, feed_url, created_at, keywords_en, category, category_source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
                 (
                     message_id,
                     channel_id,
@@ -322,6 +391,8 @@ class ArticleStore:
                     article.get("feed_url"),
                     created_at,
                     keywords_en,
+                    category,
+                    category_source,
                 ),
             )
             conn.commit()
@@ -331,10 +402,11 @@ class ArticleStore:
                 (channel_id,),
             )
             rows = cursor.fetchall()
-            if len(rows) > limit:
-                for mid, in rows[limit:]:
-                    cursor.execute('DELETE FROM articles WHERE message_id = ?', (mid,))
+            evicted = [mid for mid, in rows[limit:]]
+            for mid in evicted:
+                cursor.execute('DELETE FROM articles WHERE message_id = ?', (mid,))
             conn.commit()
+            return evicted
         finally:
             conn.close()
 
@@ -359,13 +431,65 @@ class ArticleStore:
         finally:
             conn.close()
 
+    async def get_message_articles(self, message_id: str) -> List[Dict[str, Any]]:
+        """
+        1件のメッセージにまとめて投稿した記事を取得する
+
+        Args:
+            message_id: メッセージID
+
+        Returns:
+            message_idが「メッセージID:番号」の記事のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_message_articles(message_id))
+            except Exception as e:
+                logger.error(f"まとめて投稿した記事の取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_message_articles(self, message_id: str) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT * FROM articles WHERE message_id >= ? AND message_id < ?",
+                (f"{message_id}:", f"{message_id};"),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
     async def find_related_articles(
-        self, keywords: List[str], original_article_id: str, limit: int = 15
+        self,
+        keywords: List[str],
+        original_article_id: str,
+        limit: int = 15,
+        embedding: Optional[Any] = None,
+        channel_id: Optional[str] = None,
+        min_score: float = 0.0,
     ) -> List[Dict[str, Any]]:
-        """キーワードで関連記事を検索する"""
+        """
+        関連記事を検索する
+
+        埋め込みベクトルが指定され、ベクトル索引がある場合はコサイン類似度の高い順に返す
+        （channel_idを指定した場合はそのチャンネルのシャードだけを検索し、類似度がmin_score未満の記事は除く）。
+        それ以外の場合はキーワードの部分一致で検索する。
+        """
         async with self.lock:
             try:
                 loop = asyncio.get_event_loop()
+                if embedding is not None and self.vector_index:
+                    related = await loop.run_in_executor(
+                        None,
+                        lambda: self._find_similar_articles(
+                            embedding, original_article_id, limit, channel_id, min_score
+                        ),
+                    )
+                    if related:
+                        return related
                 return await loop.run_in_executor(
                     None,
                     lambda: self._find_related_articles(
@@ -376,6 +500,34 @@ class ArticleStore:
                 logger.error(f"関連記事検索中にエラーが発生しました: {e}", exc_info=True)
                 return []
 
+    def _find_similar_articles(
+        self,
+        embedding: Any,
+        original_article_id: str,
+        limit: int,
+        channel_id: Optional[str] = None,
+        min_score: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """ベクトル索引で類似記事を検索し、類似度の高い順に記事を取得する"""
+        hits = self.vector_index.search(
+            embedding, limit, exclude=[original_article_id], channel_id=channel_id, min_score=min_score
+        )
+        if not hits:
+            return []
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            ids = [mid for mid, _ in hits]
+            cursor.execute(
+                f"SELECT * FROM articles WHERE message_id IN ({', '.join('?' for _ in ids)})", ids
+            )
+            rows = {row["message_id"]: dict(row) for row in cursor.fetchall()}
+            # 索引にあっても削除済みの記事は除く
+            return [rows[mid] for mid in ids if mid in rows]
+        finally:
+            conn.close()
+
     def _find_related_articles(
         self, keywords: List[str], original_article_id: str, limit: int
     ) -> List[Dict[str, Any]]:
@@ -398,3 +550,273 @@ class ArticleStore:
         finally:
             conn.close()
 
+    async def get_labeled_articles(self, source: Optional[str] = "llm", limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        分類結果が記録された記事を取得する
+
+        Args:
+            source: 分類方法で絞り込む（Noneの場合はすべて）
+            limit: 取得する最大件数（新しい順）
+
+        Returns:
+            title, content, categoryを含む記事の辞書のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_labeled_articles(source, limit))
+            except Exception as e:
+                logger.error(f"分類済み記事の取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_labeled_articles(self, source: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            query = "SELECT title, content, category FROM articles WHERE category IS NOT NULL AND category != ''"
+            params: List[Any] = []
+            if source:
+                query += " AND category_source = ?"
+                params.append(source)
+            query += " ORDER BY created_at DESC LIMIT ?"
+            params.append(limit)
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    async def get_article_texts(self, limit: int = 2000) -> List[str]:
+        """
+        保存された記事のタイトルと本文を取得する（キーワード抽出のコーパス用）
+
+        Args:
+            limit: 取得する最大件数（新しい順）
+
+        Returns:
+            「タイトル\n本文」形式の文字列のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_article_texts(limit))
+            except Exception as e:
+                logger.error(f"記事テキストの取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_article_texts(self, limit: int) -> List[str]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT title, content FROM articles ORDER BY created_at DESC LIMIT ?', (limit,))
+            return [f"{title or ''}\n{content or ''}" for title, content in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    async def get_unindexed_articles(self, limit: int = 2000) -> List[Dict[str, Any]]:
+        """
+        ベクトル索引に登録されていない記事を取得する
+
+        Args:
+            limit: 確認する最大件数（新しい順）
+
+        Returns:
+            message_id, channel_id, title, contentを含む記事の辞書のリスト
+        """
+        if not self.vector_index:
+            return []
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_unindexed_articles(limit))
+            except Exception as e:
+                logger.error(f"未索引の記事の取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_unindexed_articles(self, limit: int) -> List[Dict[str, Any]]:
+        indexed = self.vector_index.indexed_ids()
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'SELECT message_id, channel_id, title, content FROM articles ORDER BY created_at DESC LIMIT ?',
+                (limit,),
+            )
+            return [dict(row) for row in cursor.fetchall() if row["message_id"] not in indexed]
+        finally:
+            conn.close()
+
+    async def add_embeddings(self, items: List[Tuple[str, str, Any]], limit: int = 1000) -> None:
+        """
+        保存済みの記事の埋め込みベクトルを索引に登録する
+
+        Args:
+            items: (チャンネルID, メッセージID, ベクトル)のリスト
+            limit: チャンネルあたりの最大件数
+        """
+        if not self.vector_index or not items:
+            return
+        by_channel: Dict[str, Tuple[List[str], List[Any]]] = {}
+        for channel_id, message_id, vector in items:
+            ids, vectors = by_channel.setdefault(channel_id, ([], []))
+            ids.append(message_id)
+            vectors.append(vector)
+
+        def add_all() -> None:
+            for channel_id, (ids, vectors) in by_channel.items():
+                self.vector_index.add(channel_id, ids, vectors, limit)
+
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, add_all)
+            except Exception as e:
+                logger.error(f"埋め込みベクトルの登録中にエラーが発生しました: {e}", exc_info=True)
+
+    async def add_ai_usage(self, records: List[Dict[str, Any]], retention_days: int = 30) -> bool:
+        """
+        Gemini APIの使用量を記録し、保持期間を過ぎた記録を削除する
+
+        Args:
+            records: UsageRecorderの記録のリスト
+            retention_days: 保持する日数
+
+        Returns:
+            成功した場合はTrue
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, lambda: self._add_ai_usage(records, cutoff))
+                return True
+            except Exception as e:
+                logger.error(f"AI使用量の記録中にエラーが発生しました: {e}", exc_info=True)
+                return False
+
+    def _add_ai_usage(self, records: List[Dict[str, Any]], cutoff: str) -> None:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(
+                '''
+                INSERT INTO ai_usage (
+                    created_at, feed_url, task, model, input_tokens, output_tokens,
+                    latency, retries, key_index, success, prompt, call_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''',
+                [
+                    (
+                        record["created_at"], record.get("feed_url") or "", record.get("task") or "",
+                        record.get("model") or "", record.get("input_tokens", 0), record.get("output_tokens", 0),
+                        record.get("latency", 0.0), record.get("retries", 0), record.get("key_index"),
+                        1 if record.get("success", True) else 0, record.get("prompt") or "",
+                        record.get("call_id") or "",
+                    )
+                    for record in records
+                ],
+            )
+            cursor.execute('DELETE FROM ai_usage WHERE created_at < ?', (cutoff,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def get_ai_usage_summary(self, days: int = 7, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Gemini APIの使用量をフィードごとに集計する（トークン数の多い順）
+
+        Args:
+            days: 集計する日数
+            limit: 取得する最大フィード数
+
+        Returns:
+            feed_url, calls, input_tokens, output_tokens, avg_latency, retries, errors, tasksを含む辞書のリスト
+            （tasksはタスクごとのトークン数）
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_ai_usage_summary(since, limit))
+            except Exception as e:
+                logger.error(f"AI使用量の集計中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_ai_usage_summary(self, since: str, limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                '''
+                SELECT feed_url, COUNT(*) AS calls, SUM(input_tokens) AS input_tokens,
+                       SUM(output_tokens) AS output_tokens, AVG(latency) AS avg_latency,
+                       SUM(retries) AS retries, SUM(1 - success) AS errors
+                FROM ai_usage WHERE created_at >= ?
+                GROUP BY feed_url
+                ORDER BY SUM(input_tokens + output_tokens) DESC
+                LIMIT ?
+                ''',
+                (since, limit),
+            )
+            summary = [dict(row) for row in cursor.fetchall()]
+            for row in summary:
+                cursor.execute(
+                    '''
+                    SELECT task, SUM(input_tokens + output_tokens) AS tokens
+                    FROM ai_usage WHERE created_at >= ? AND feed_url = ?
+                    GROUP BY task ORDER BY tokens DESC
+                    ''',
+                    (since, row["feed_url"]),
+                )
+                row["tasks"] = {task: tokens for task, tokens in cursor.fetchall()}
+            return summary
+        finally:
+            conn.close()
+
+    async def get_ai_usage_by_prompt(self, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Gemini APIの使用量をプロンプトのバージョンごとに集計する（同じプロンプトの版の比較用）
+
+        Args:
+            days: 集計する日数
+
+        Returns:
+            prompt, calls, avg_input_tokens, avg_output_tokens, avg_latency, errorsを含む辞書のリスト
+            （プロンプトの記録がない呼び出しは除く）
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_ai_usage_by_prompt(since))
+            except Exception as e:
+                logger.error(f"プロンプトごとのAI使用量の集計中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_ai_usage_by_prompt(self, since: str) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            # 複数フィードに按分した記録は同じ呼び出しの一部のため、呼び出しIDでまとめて1回と数える
+            # （呼び出しIDがない古い記録は1行を1回とする）
+            cursor.execute(
+                '''
+                SELECT prompt, COUNT(*) AS calls, AVG(input_tokens) AS avg_input_tokens,
+                       AVG(output_tokens) AS avg_output_tokens, AVG(latency) AS avg_latency,
+                       SUM(1 - success) AS errors
+                FROM (
+                    SELECT prompt, SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens,
+                           MAX(latency) AS latency, MIN(success) AS success
+                    FROM ai_usage WHERE created_at >= ? AND prompt != ''
+                    GROUP BY CASE WHEN call_id = '' THEN 'row:' || id ELSE call_id END
+                )
+                GROUP BY prompt ORDER BY prompt
+                ''',
+                (since,),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
@@ -7,6 +7,7 @@
 RSSフィードの管理と監視を行う
 """
 
+import time
 import logging
 import asyncio
 from typing import Dict, Any, List, Optional, Tuple
@@ -14,7 +15,9 @@ from datetime import datetime, timezone, timedelta
 
 from .feed_parser import FeedParser
 from .article_store import ArticleStore
-from utils.helpers import generate_article_id, parse_datetime
+from .vector_index import VectorIndex
+from ai.governor import use_lane
+from utils.helpers import generate_article_id, parse_datetime, clean_html
 
 logger = logging.getLogger(__name__)
 
@@ -34,10 +37,19 @@ class FeedManager:
         self.ai_processor = ai_processor
         self.discord_bot = discord_bot
         self.feed_parser = FeedParser()
-        self.article_store = ArticleStore()
+        self.article_store = ArticleStore(
+            vector_index=VectorIndex(config.get("vector_index_path"), ai_processor.embedder.name)
+        )
+        # 記事が削除されたら質問応答のコンテキストキャッシュも削除する
+        self.article_store.add_eviction_listener(ai_processor.context_cache.evict)
         self.checking = False  # フィード確認中フラグ
-        self.article_queue: asyncio.Queue[Tuple[Dict[str, Any], Dict[str, Any]]] = asyncio.Queue()
+        # 上限を超えた場合はフィード確認側を待機させる（バックプレッシャー）
+        self.article_queue: asyncio.Queue[Tuple[Dict[str, Any], Dict[str, Any]]] = asyncio.Queue(
+            maxsize=max(0, config.get("article_queue_maxsize", 100))
+        )
         self.worker_task: Optional[asyncio.Task] = None
+        # ダイジェストモードのフィードの投稿待ちの記事（フィードURLごと）
+        self.digest_buffers: Dict[str, Dict[str, Any]] = {}
 
         logger.info("フィードマネージャーを初期化しました")
 
@@ -47,30 +59,88 @@ class FeedManager:
             self.worker_task = asyncio.create_task(self._queue_worker())
             logger.info("記事処理ワーカーを開始しました")
 
+    async def stop_worker(self) -> None:
+        """記事処理用ワーカーを停止する"""
+        if self.worker_task:
+            self.worker_task.cancel()
+            await asyncio.gather(self.worker_task, return_exceptions=True)
+            self.worker_task = None
+            logger.info("記事処理ワーカーを停止しました")
+
     async def _queue_worker(self) -> None:
-        """キュー内の記事を順番に処理する"""
+        """キュー内の記事をまとめて処理する"""
         while True:
-            article, feed = await self.article_queue.get()
+            batch = [await self.article_queue.get()]
+            # 既にキューに溜まっている記事はまとめて処理する
+            max_batch = self.config.get("batch_max_articles", 5)
+            while len(batch) < max_batch and not self.article_queue.empty():
+                batch.append(self.article_queue.get_nowait())
             try:
-                channel_id = feed.get("channel_id")
-                url = feed.get("url")
-                processed = await self.ai_processor.process_article(article, feed)
-                message_id = await self.discord_bot.post_article(processed, channel_id)
-                if message_id:
-                    await self.article_store.add_full_article(
-                        str(message_id),
-                        channel_id,
-                        article,
-                        processed.get("keywords_en", ""),
-                    )
-                article_id = generate_article_id(article)
-                await self.article_store.add_processed_article(article_id, url, channel_id)
+                with use_lane("ingest"):
+                    await self.ai_processor.load_keyword_corpus(self.article_store)
+                    await self.ai_processor.index_missing_articles(self.article_store)
+                    processed_list = await self.ai_processor.process_articles(batch)
+                # 同じチャンネルの記事を1件のメッセージにまとめられるように投稿待ちに入れ、
+                # バッチの記事がそろったらまとめる時間を待たずに送る（送信の完了は待たない）
+                for (article, feed), processed in zip(batch, processed_list):
+                    await self.publish_article(article, feed, processed)
+                await self.discord_bot.flush_posts()
+                await self.flush_ai_usage()
             except Exception as e:
                 logger.error(f"キュー処理中にエラーが発生しました: {e}", exc_info=True)
             finally:
                 await asyncio.sleep(10)
-                self.article_queue.task_done()
+                for _ in batch:
+                    self.article_queue.task_done()
+
+    async def publish_article(
+        self, article: Dict[str, Any], feed: Dict[str, Any], processed: Dict[str, Any]
+    ) -> None:
+        """
+        処理済み記事を投稿待ちに入れ、送信後に記事ストアに記録する
+
+        記事ストアには送信したメッセージの記事のキー（まとめて投稿した場合は「メッセージID:番号」）で記録する。
+
+        Args:
+            article: 元の記事データ
+            feed: フィード情報
+            processed: 処理済み記事データ
+        """
+        channel_id = feed.get("channel_id")
+        url = feed.get("url")
+
+        async def on_posted(message_id: Optional[str]) -> None:
+            # まとめて投稿した場合は「メッセージID:番号」のキーで記録する
+            if message_id:
+                await self.article_store.add_full_article(
+                    str(message_id),
+                    channel_id,
+                    article,
+                    processed.get("keywords_en", ""),
+                    category=processed.get("category"),
+                    category_source=processed.get("category_source"),
+                    embedding=processed.get("embedding"),
+                )
+
+        try:
+            await self.discord_bot.post_article(processed, channel_id, on_posted)
+            article_id = generate_article_id(article)
+            await self.article_store.add_processed_article(article_id, url, channel_id)
+        except Exception as e:
+            logger.error(f"記事投稿中にエラーが発生しました: {article.get('title')}: {e}", exc_info=True)
     
+    async def flush_ai_usage(self) -> int:
+        """
+        溜めたAPI呼び出しの使用量を記事ストアに書き込む
+
+        Returns:
+            書き込んだ件数
+        """
+        recorder = getattr(self.ai_processor, "usage_recorder", None)
+        if recorder is None:
+            return 0
+        return await recorder.flush(self.article_store, self.config.get("ai_usage_retention_days", 30))
+
     async def check_feeds(self) -> None:
         """すべてのフィードを確認する"""
         if self.checking:
@@ -89,11 +159,13 @@ class FeedManager:
             for feed in feeds:
                 try:
                     await self.check_feed(feed)
+                    await self.flush_digest(feed)
                     # フィード間の処理に少し間隔を空ける
                     await asyncio.sleep(1)
                 except Exception as e:
                     logger.error(f"フィード確認中にエラーが発生しました: {feed.get('url')}: {e}", exc_info=True)
             
+            await self.flush_ai_usage()
             logger.info("すべてのフィード確認が完了しました")
             
         except Exception as e:
@@ -131,6 +203,11 @@ class FeedManager:
             return
         
         logger.info(f"{len(new_articles)}件の新しい記事を見つけました: {url}")
+
+        # ダイジェストモードのフィードは期間が過ぎるまで溜めておく
+        if self._digest_minutes(feed) > 0:
+            self._buffer_digest(feed, new_articles)
+            return
         
         # 最大処理数を制限
         max_articles = self.config.get("max_articles", 5)
@@ -138,10 +215,128 @@ class FeedManager:
             logger.info(f"処理数を{max_articles}件に制限します")
             new_articles = new_articles[:max_articles]
         
-        # 記事をキューに追加
+        # 記事をキューに追加（ingestレーンが飽和している間とキューが満杯の間は待機する）
         for article in new_articles:
+            await self.ai_processor.governor.wait_for_capacity("ingest")
             await self.article_queue.put((article, feed))
     
+    @staticmethod
+    def _digest_minutes(feed: Dict[str, Any]) -> int:
+        """フィードのダイジェストの間隔（分、0の場合はダイジェストモードでない）"""
+        try:
+            return max(0, int(feed.get("digest_minutes") or 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _buffer_digest(self, feed: Dict[str, Any], articles: List[Dict[str, Any]]) -> None:
+        """
+        ダイジェストモードのフィードの新しい記事を溜める（溜めている記事は追加しない）
+
+        Args:
+            feed: フィード情報
+            articles: 新しい記事のリスト
+        """
+        buffer = self.digest_buffers.setdefault(
+            feed.get("url"), {"started": time.monotonic(), "articles": [], "ids": set()}
+        )
+        added = 0
+        for article in articles:
+            article_id = generate_article_id(article)
+            if article_id in buffer["ids"]:
+                continue
+            buffer["ids"].add(article_id)
+            buffer["articles"].append(article)
+            added += 1
+        if added:
+            logger.info(f"ダイジェスト用に{added}件の記事を溜めました（計{len(buffer['articles'])}件）: {feed.get('url')}")
+
+    async def flush_digest(self, feed: Dict[str, Any], force: bool = False) -> bool:
+        """
+        溜めた記事を1回のAI処理でダイジェストにまとめ、1件のメッセージとして投稿する
+
+        最初の記事を溜めてからダイジェストの間隔が過ぎた場合か、記事数が上限に達した場合に投稿する。
+        上限を超えた分は次のダイジェストに回す。
+
+        Args:
+            feed: フィード情報
+            force: 間隔が過ぎていなくても投稿するか
+
+        Returns:
+            投稿した場合はTrue
+        """
+        url = feed.get("url")
+        channel_id = feed.get("channel_id")
+        buffer = self.digest_buffers.get(url)
+        if not buffer or not buffer["articles"] or not channel_id:
+            return False
+        max_articles = max(1, self.config.get("digest_max_articles", 10))
+        due = time.monotonic() - buffer["started"] >= self._digest_minutes(feed) * 60
+        if not (force or due or len(buffer["articles"]) >= max_articles):
+            return False
+
+        started = buffer["started"]
+        articles = buffer["articles"][:max_articles]
+        rest = buffer["articles"][max_articles:]
+        if rest:
+            self.digest_buffers[url] = {
+                "started": time.monotonic(),
+                "articles": rest,
+                "ids": {generate_article_id(article) for article in rest},
+            }
+        else:
+            del self.digest_buffers[url]
+
+        try:
+            await self.ai_processor.governor.wait_for_capacity("ingest")
+            with use_lane("ingest"):
+                digest = await self.ai_processor.build_digest(articles, feed)
+            message_id = await self.discord_bot.post_digest(digest, channel_id)
+            if not message_id:
+                logger.warning(f"ダイジェストを投稿できなかったため、記事を次のダイジェストに回します: {url}")
+                self._requeue_digest(url, articles, started)
+                return False
+            # ダイジェストへの返信で質問できるように、まとめた記事を1件の記事として記録する
+            await self.article_store.add_full_article(
+                str(message_id), channel_id, self._digest_article(digest, articles), ""
+            )
+            for article in articles:
+                await self.article_store.add_processed_article(generate_article_id(article), url, channel_id)
+            return True
+        except Exception as e:
+            logger.error(f"ダイジェストの投稿中にエラーが発生しました: {url}: {e}", exc_info=True)
+            self._requeue_digest(url, articles, started)
+            return False
+
+    def _requeue_digest(self, url: str, articles: List[Dict[str, Any]], started: float) -> None:
+        """
+        投稿できなかった記事を溜めている記事の先頭に戻す（次の確認時に投稿する）
+
+        Args:
+            url: フィードURL
+            articles: 投稿できなかった記事のリスト
+            started: 記事を溜め始めた時刻
+        """
+        buffer = self.digest_buffers.setdefault(url, {"started": started, "articles": [], "ids": set()})
+        buffer["started"] = min(buffer["started"], started)
+        buffer["articles"] = list(articles) + buffer["articles"]
+        buffer["ids"].update(generate_article_id(article) for article in articles)
+
+    def _digest_article(self, digest: Dict[str, Any], articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ダイジェストを質問応答用の1件の記事データにまとめる"""
+        sections = [digest.get("overview", "")]
+        for item, article in zip(digest.get("items", []), articles):
+            sections.append(
+                f"■ {item.get('title', '')}\n{item.get('summary', '')}\n{item.get('link', '')}\n"
+                f"{clean_html(article.get('content', '') or '')[:1000]}"
+            )
+        return {
+            "title": f"{digest.get('feed_title', '')} ダイジェスト",
+            "link": articles[0].get("feed_url", "") if articles else "",
+            "feed_url": articles[0].get("feed_url", "") if articles else "",
+            "content": "\n\n".join(section for section in sections if section),
+            "feed_title": digest.get("feed_title", ""),
+        }
+
     async def _get_new_articles(self, feed_data: Dict[str, Any], feed_info: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         新しい記事を取得する
@@ -205,6 +400,8 @@ class FeedManager:
         title: str = None,
         channel_id: str = None,
         summary_type: str = "normal",
+        summary_mode: str = "ai",
+        digest_minutes: int = 0,
     ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
         """
         フィードを追加する
@@ -214,6 +411,8 @@ class FeedManager:
             title: フィードタイトル（オプション）
             channel_id: チャンネルID（オプション）
             summary_type: 要約タイプ（short/normal/long）
+            summary_mode: 要約方法（ai: Gemini, extractive: TextRankによる抽出型要約）
+            digest_minutes: ダイジェストの間隔（分、0の場合は記事ごとに投稿）
             
         Returns:
             (成功フラグ, メッセージ, フィード情報)のタプル
@@ -240,6 +439,8 @@ class FeedManager:
                 "channel_id": channel_id,  # Noneの場合は後でチャンネル作成時に設定
                 "added_at": datetime.now(timezone.utc).isoformat(),
                 "summary_type": summary_type,
+                "summary_mode": summary_mode,
+                "digest_minutes": digest_minutes,
             }
             
             # 設定に追加
@@ -271,6 +472,7 @@ class FeedManager:
                     # フィードを削除
                     removed_feed = feeds.pop(i)
                     self.config["feeds"] = feeds
+                    self.digest_buffers.pop(url, None)
 
                     channel_id = removed_feed.get("channel_id")
                     if notify_channel and channel_id:
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ベクトル索引
+
+記事の埋め込みベクトルをチャンネルごとのファイルに保存し、コサイン類似度で検索する
+"""
+
+import os
+import re
+import json
+import glob
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class VectorIndex:
+    """チャンネルごとに分割した埋め込みベクトルの索引
+
+    各シャードは「チャンネルID.npy」（L2正規化済みベクトル）と「チャンネルID.json」
+    （メッセージIDと埋め込み方法の名前）で構成し、検索時はベクトルをメモリマップで読み込む。
+    埋め込み方法が異なるシャードは空として扱う。
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, embedder_name: str = ""):
+        """
+        初期化
+
+        Args:
+            base_dir: シャードを保存するディレクトリ（指定がない場合はデフォルト）
+            embedder_name: ベクトルを計算した埋め込み方法の名前
+        """
+        self.base_dir = base_dir or os.path.join("data", "vectors")
+        self.embedder_name = embedder_name
+        self._shards: Dict[str, Tuple[float, List[str], Optional[np.ndarray]]] = {}
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _paths(self, channel_id: str) -> Tuple[str, str]:
+        """シャードのベクトルファイルとメタデータファイルのパス"""
+        name = re.sub(r"[^0-9A-Za-z_-]", "_", str(channel_id))
+        return os.path.join(self.base_dir, f"{name}.npy"), os.path.join(self.base_dir, f"{name}.json")
+
+    def channels(self) -> List[str]:
+        """シャードが存在するチャンネルIDのリスト"""
+        return [
+            os.path.splitext(os.path.basename(path))[0]
+            for path in glob.glob(os.path.join(self.base_dir, "*.json"))
+        ]
+
+    def _load(self, channel_id: str) -> Tuple[List[str], Optional[np.ndarray]]:
+        """シャードを読み込む（更新されていなければ前回の読み込み結果を使う）"""
+        vector_path, meta_path = self._paths(channel_id)
+        if not os.path.exists(meta_path) or not os.path.exists(vector_path):
+            return [], None
+        mtime = os.path.getmtime(meta_path)
+        cached = self._shards.get(channel_id)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("embedder") != self.embedder_name:
+            ids, vectors = [], None
+        else:
+            ids = meta.get("ids", [])
+            vectors = np.load(vector_path, mmap_mode="r")
+        self._shards[channel_id] = (mtime, ids, vectors)
+        return ids, vectors
+
+    def add(self, channel_id: str, ids: List[str], vectors: np.ndarray, limit: int = 1000) -> None:
+        """
+        ベクトルをシャードに追加する
+
+        既に登録されているIDは置き換え、件数が上限を超えた場合は古いものから削除する。
+
+        Args:
+            channel_id: チャンネルID
+            ids: メッセージIDのリスト
+            vectors: L2正規化済みのベクトル（IDと同じ順序）
+            limit: シャードあたりの最大件数
+        """
+        if not ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        old_ids, old_vectors = self._load(channel_id)
+        if old_vectors is not None and old_vectors.shape[1] == vectors.shape[1]:
+            replaced = set(ids)
+            keep = [i for i, mid in enumerate(old_ids) if mid not in replaced]
+            all_ids = [old_ids[i] for i in keep] + list(ids)
+            all_vectors = np.concatenate([np.asarray(old_vectors[keep]), vectors])
+        else:
+            all_ids, all_vectors = list(ids), vectors
+        all_ids, all_vectors = all_ids[-limit:], all_vectors[-limit:]
+
+        # メモリマップを解放してから書き込み、一時ファイルを置き換えて反映する
+        self._shards.pop(channel_id, None)
+        vector_path, meta_path = self._paths(channel_id)
+        with open(f"{vector_path}.tmp", "wb") as f:
+            np.save(f, all_vectors)
+        os.replace(f"{vector_path}.tmp", vector_path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder_name, "dim": int(all_vectors.shape[1]), "ids": all_ids}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def indexed_ids(self) -> Set[str]:
+        """索引に登録されている全メッセージID"""
+        ids: Set[str] = set()
+        for channel_id in self.channels():
+            ids.update(self._load(channel_id)[0])
+        return ids
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 15,
+        exclude: Iterable[str] = (),
+        channel_id: Optional[str] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[str, float]]:
+        """
+        コサイン類似度の高い順にメッセージIDを検索する
+
+        Args:
+            query: L2正規化済みのクエリベクトル
+            k: 取得する件数
+            exclude: 除外するメッセージID
+            channel_id: 検索するチャンネルID（指定がない場合は全シャード）
+            min_score: 結果に含める最小の類似度
+
+        Returns:
+            (メッセージID, 類似度)のリスト
+        """
+        excluded = set(exclude)
+        query = np.asarray(query, dtype=np.float32)
+        candidates: List[Tuple[str, float]] = []
+        for shard in [str(channel_id)] if channel_id is not None else self.channels():
+            ids, vectors = self._load(shard)
+            if vectors is None or not ids or vectors.shape[1] != query.shape[0]:
+                continue
+            scores = vectors @ query
+            # 除外分を見込んでシャードごとに上位を取り出す
+            top = min(len(ids), k + len(excluded))
+            for i in np.argpartition(-scores, top - 1)[:top]:
+                if ids[i] not in excluded and scores[i] >= min_score:
+                    candidates.append((ids[i], float(scores[i])))
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return candidates[:k]
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+テストの共通処理
+"""
+
+import asyncio
+
+
+def run_async(coro):
+    """新しいイベントループでコルーチンを実行する"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
@@ -160,6 +160,69 @@ class TestArticleStore(unittest.TestCase):
         all_articles = await self.article_store.get_processed_articles(limit=10)
         self.assertEqual(len(all_articles), 3)
 
+    def test_get_labeled_articles(self):
+        """分類方法で絞り込んで分類済み記事を取得できるか"""
+        async def run():
+            await self.article_store.add_full_article(
+                "1", "channel1", {"title": "A", "content": "a"}, "", category="technology", category_source="llm"
+            )
+            await self.article_store.add_full_article(
+                "2", "channel1", {"title": "B", "content": "b"}, "", category="business", category_source="local"
+            )
+            await self.article_store.add_full_article("3", "channel1", {"title": "C", "content": "c"}, "")
+            return (
+                await self.article_store.get_labeled_articles("llm"),
+                await self.article_store.get_labeled_articles(None),
+            )
+
+        loop = asyncio.new_event_loop()
+        try:
+            llm_rows, all_rows = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual([row["category"] for row in llm_rows], ["technology"])
+        self.assertEqual(len(all_rows), 2)
+
+    def test_migrates_category_columns(self):
+        """分類結果の列がない既存のデータベースに列を追加するか"""
+        db_path = os.path.join(self.temp_dir.name, "old.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE articles (message_id TEXT PRIMARY KEY, channel_id TEXT NOT NULL, title TEXT, "
+            "content TEXT, feed_url TEXT, created_at TEXT NOT NULL, keywords_en TEXT)"
+        )
+        conn.commit()
+        conn.close()
+
+        ArticleStore(db_path)
+        conn = sqlite3.connect(db_path)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+        conn.close()
+        self.assertIn("category", columns)
+        self.assertIn("category_source", columns)
+
+    def test_eviction_listener(self):
+        """件数上限で削除した記事を通知するか"""
+        evicted = []
+
+        async def listener(message_ids):
+            evicted.extend(message_ids)
+
+        self.article_store.add_eviction_listener(listener)
+
+        async def run():
+            for i in range(3):
+                await self.article_store.add_full_article(str(i), "channel1", {"title": str(i)}, "", limit=2)
+                # 保存日時の順序を確定させる
+                await asyncio.sleep(0.01)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(evicted, ["0"])
+
 # 非同期テストのためのヘルパー関数
 def run_async_test(coro):
     return asyncio.get_event_loop().run_until_complete(coro)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gemini APIのバックエンドと負荷試験のテスト
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from google.api_core import exceptions as google_exceptions
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.backends import FakeGeminiBackend, GoogleBackend, create_backend
+from ai.gemini_api import GeminiAPI
+from ai.ai_processor import AIProcessor
+from ai.load_harness import percentile, run_load
+from config.default_config import DEFAULT_CONFIG
+from tests.helpers import run_async
+
+
+class TestFakeGeminiBackend(unittest.TestCase):
+    """フェイクのバックエンドのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.patcher = patch.dict(os.environ, {}, clear=True)
+        self.patcher.start()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.patcher.stop()
+
+    def test_generate_and_account_tokens(self):
+        """GeminiAPIからテキストを生成し、キーごとのトークン数を記録するか"""
+        backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0, output_tokens=50)
+        api = GeminiAPI(api_keys=["key1"], model="gemini-2.0-flash", backend=backend)
+
+        text = run_async(api.generate_text("prompt", system_instruction="A"))
+
+        self.assertTrue(text)
+        stats = backend.stats["key1"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertGreater(stats["input_tokens"], 0)
+        self.assertGreater(stats["output_tokens"], 0)
+
+    def test_rpm_limit_injects_rate_limits(self):
+        """RPMの上限を超えたキーで429を返し、GeminiAPIが別のキーで再試行するか"""
+        backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0, rpm_limit=1, retry_after=5)
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash", backend=backend)
+
+        async def run():
+            return [await api.generate_text("prompt") for _ in range(2)]
+
+        self.assertEqual(len(run_async(run())), 2)
+        self.assertEqual(backend.get_stats()["rate_limited"], 0)
+
+        # 固定したキーは上限に達しているため再試行せずにエラーになる
+        with self.assertRaises(google_exceptions.TooManyRequests):
+            run_async(api.generate_text("prompt", key_index=0))
+        self.assertEqual(backend.get_stats()["rate_limited"], 1)
+
+    def test_stream_and_cached_content(self):
+        """ストリーミングとコンテキストキャッシュが動作するか"""
+        backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0)
+        api = GeminiAPI(api_keys=["key1"], model="gemini-2.0-flash", backend=backend)
+        updates = []
+
+        async def on_text(text):
+            updates.append(text)
+
+        async def run():
+            name, key_index = await api.create_cached_content("記事の内容", 60)
+            text = await api.stream_text("質問", on_text, cached_content=name, key_index=key_index)
+            await api.delete_cached_content(name, key_index)
+            return text
+
+        text = run_async(run())
+        self.assertGreater(len(updates), 1)
+        self.assertEqual(updates[-1].strip(), text)
+        self.assertEqual(backend._caches, {})
+
+    def test_create_backend(self):
+        """設定に応じたバックエンドが生成されるか"""
+        self.assertIsInstance(create_backend({}), GoogleBackend)
+        backend = create_backend({"ai_backend": "fake", "fake_backend": {"latency_ms": 5}})
+        self.assertIsInstance(backend, FakeGeminiBackend)
+        self.assertEqual(backend.latency_ms, 5)
+
+
+class TestLoadHarness(unittest.TestCase):
+    """負荷試験のテストケース"""
+
+    def test_percentile(self):
+        """最近傍法で分位点を求めるか"""
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_run_load(self):
+        """フェイクのバックエンドで記事を処理し、結果を集計するか"""
+        with tempfile.TemporaryDirectory() as data_dir, patch.dict(os.environ, {}, clear=True):
+            config = copy.deepcopy(DEFAULT_CONFIG)
+            config.update({
+                "gemini_api_keys": ["fake-key-1", "fake-key-2"],
+                "ai_cache_enabled": False,
+                "local_classifier_path": os.path.join(data_dir, "classifier.json"),
+            })
+            backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0)
+            processor = AIProcessor(config, backend=backend)
+
+            report = run_async(run_load(processor, rps=200, count=5))
+
+        self.assertEqual(report["completed"], 5)
+        self.assertEqual(report["failed"], 0)
+        self.assertGreater(report["throughput"], 0)
+        self.assertLessEqual(report["p50"], report["p99"])
+        self.assertGreater(backend.get_stats()["requests"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
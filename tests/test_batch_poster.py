@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+記事のまとめ投稿のテスト
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import asyncio
+
+import discord
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from discord_bot.batch_poster import BatchPoster, select_batched_article
+from rss.article_store import ArticleStore
+from tests.helpers import run_async
+
+
+class StubSender:
+    """送信したメッセージを記録する送信関数"""
+
+    def __init__(self, fail: bool = False):
+        self.messages = []
+        self.fail = fail
+
+    async def __call__(self, channel_id, embeds):
+        if self.fail:
+            raise discord.DiscordException("送信失敗")
+        self.messages.append((channel_id, [embed.title for embed in embeds]))
+        return 1000 + len(self.messages)
+
+
+class TestBatchPoster(unittest.TestCase):
+    """まとめ投稿のテストケース"""
+
+    def test_coalesces_per_channel(self):
+        """チャンネルごとにEmbedをまとめ、記事ごとに「メッセージID:番号」のキーを返すか"""
+        sender = StubSender()
+        poster = BatchPoster(sender, window=0.05)
+
+        async def run():
+            return await asyncio.gather(
+                poster.post("1", discord.Embed(title="a")),
+                poster.post("2", discord.Embed(title="b")),
+                poster.post("1", discord.Embed(title="c")),
+            )
+
+        keys = run_async(run())
+        self.assertEqual(sorted(sender.messages), [("1", ["a", "c"]), ("2", ["b"])])
+        message_ids = {channel: 1000 + i for i, (channel, _) in enumerate(sender.messages, 1)}
+        self.assertEqual(keys, [f"{message_ids['1']}:1", str(message_ids["2"]), f"{message_ids['1']}:2"])
+        self.assertEqual(poster.stats, {"messages": 2, "embeds": 3, "failed": 0})
+
+    def test_splits_at_limits(self):
+        """Embedの数と合計文字数の上限で別のメッセージに分けるか"""
+        sender = StubSender()
+        poster = BatchPoster(sender, window=0.05, max_embeds=2)
+
+        async def run():
+            await asyncio.gather(*(poster.post("1", discord.Embed(title=str(i))) for i in range(3)))
+            await asyncio.gather(
+                poster.post("2", discord.Embed(title="x", description="a" * 3000)),
+                poster.post("2", discord.Embed(title="y", description="b" * 3000)),
+            )
+
+        run_async(run())
+        self.assertEqual(
+            sender.messages,
+            [("1", ["0", "1"]), ("1", ["2"]), ("2", ["x"]), ("2", ["y"])],
+        )
+
+    def test_submit_records_after_send(self):
+        """送信を待たずに戻り、flushで送ったあとにキーを渡すか"""
+        sender = StubSender()
+        poster = BatchPoster(sender, window=60)
+        keys = []
+
+        async def on_posted(key):
+            keys.append(key)
+
+        async def run():
+            poster.submit("1", discord.Embed(title="a"), on_posted)
+            poster.submit("1", discord.Embed(title="b"), on_posted)
+            self.assertEqual(sender.messages, [])
+            await poster.flush()
+
+        run_async(run())
+        self.assertEqual(sender.messages, [("1", ["a", "b"])])
+        self.assertEqual(keys, ["1001:1", "1001:2"])
+
+    def test_appends_to_existing_footer(self):
+        """まとめて投稿するときに既存のフッターを残して記事の番号を付けるか"""
+        sender = StubSender()
+        poster = BatchPoster(sender, window=60)
+        first = discord.Embed(title="a")
+        first.set_footer(text="2026-01-01 09:00")
+        second = discord.Embed(title="b")
+
+        async def run():
+            poster.submit("1", first)
+            poster.submit("1", second)
+            await poster.flush()
+
+        run_async(run())
+        self.assertTrue(first.footer.text.startswith("2026-01-01 09:00 ・ 1/2"))
+        self.assertTrue(second.footer.text.startswith("2/2"))
+
+    def test_failure_returns_none(self):
+        """送信に失敗した場合はキーの代わりにNoneを返すか"""
+        poster = BatchPoster(StubSender(fail=True), window=0)
+        self.assertIsNone(run_async(poster.post("1", discord.Embed(title="a"))))
+        self.assertEqual(poster.stats["failed"], 1)
+
+
+class TestSelectBatchedArticle(unittest.TestCase):
+    """まとめて投稿した記事の選択のテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.articles = [
+            {"message_id": "10:2", "title": "新型スマートフォンが発表", "content": "phone", "keywords_en": "phone"},
+            {"message_id": "10:1", "title": "半導体の輸出規制", "content": "chip", "keywords_en": "chip"},
+        ]
+
+    def test_select_by_number_and_title(self):
+        """番号の指定かタイトルとの一致で記事を選ぶか"""
+        self.assertEqual(select_batched_article(self.articles, "#2 の発売日は？")["message_id"], "10:2")
+        self.assertEqual(select_batched_article(self.articles, "１番目の背景を教えて")["message_id"], "10:1")
+        self.assertEqual(select_batched_article(self.articles, "スマートフォンの価格は？")["message_id"], "10:2")
+
+    def test_combines_when_ambiguous(self):
+        """対象が決まらない場合はすべての記事をまとめるか"""
+        article = select_batched_article(self.articles, "どう思いますか？")
+        self.assertEqual(article["message_id"], "10")
+        self.assertTrue(article["content"].startswith("■ 半導体の輸出規制"))
+        self.assertEqual(article["keywords_en"], "chip, phone")
+        self.assertIsNone(select_batched_article([], "質問"))
+
+    def test_get_message_articles(self):
+        """記事ストアから同じメッセージの記事だけを取得するか"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = ArticleStore(os.path.join(temp_dir, "articles.db"))
+
+            async def run():
+                for message_id in ("10:1", "10:2", "100:1", "10"):
+                    await store.add_full_article(message_id, "1", {"title": message_id}, "")
+                return await store.get_message_articles("10")
+
+            rows = run_async(run())
+        self.assertEqual(sorted(row["message_id"] for row in rows), ["10:1", "10:2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Discordコマンドのテスト
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.ai_processor import AIProcessor
+from ai.backends import FakeGeminiBackend
+from config.default_config import DEFAULT_CONFIG
+from discord_bot.bot_client import DiscordBot
+from discord_bot.commands import register_commands, set_managers
+from rss.feed_manager import FeedManager
+from tests.helpers import run_async
+
+
+class StubChannel:
+    """送信したEmbedのタイトルを記録し、連番のメッセージIDを返すチャンネル"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, embeds):
+        self.sent.append([embed.title for embed in embeds])
+        return SimpleNamespace(id=500 + len(self.sent))
+
+
+class TestCheckNow(unittest.TestCase):
+    """/rss check_nowのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        self.patcher = patch.dict(os.environ, {}, clear=True)
+        self.patcher.start()
+        self.feed = {"url": "https://example.com/feed", "channel_id": "1", "title": "Example"}
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        self.config.update({
+            "discord_token": "token",
+            "gemini_api_keys": ["fake-key"],
+            "ai_cache_enabled": False,
+            "local_classifier_path": "classifier.json",
+            "vector_index_path": "vectors",
+            "post_batch_window": 60,
+            "feeds": [self.feed],
+        })
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        set_managers(None, None)
+        self.patcher.stop()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def test_records_article_with_posted_key(self):
+        """手動で取得した記事を、まとめて投稿したメッセージの記事のキーで記録するか"""
+        channel = StubChannel()
+        interaction = SimpleNamespace(
+            channel=SimpleNamespace(id=1),
+            response=SimpleNamespace(send_message=AsyncMock()),
+            followup=SimpleNamespace(send=AsyncMock()),
+        )
+        entry = {"title": "手動で取得した記事", "link": "https://example.com/2", "content": "本文です。" * 20}
+        queued = {"title": "キューの記事", "link": "https://example.com/1", "content": "本文です。" * 20}
+
+        async def run():
+            processor = AIProcessor(self.config, backend=FakeGeminiBackend(latency_ms=1, latency_sigma=0))
+            bot = DiscordBot(self.config, processor)
+            bot.bot.get_channel = lambda channel_id: channel
+            feed_manager = FeedManager(self.config, processor, bot)
+            feed_manager.feed_parser.parse_feed = AsyncMock(return_value={"entries": [entry], "feed": {}})
+            set_managers(feed_manager, None)
+            with patch.object(bot.bot.tree, "sync", AsyncMock()):
+                await register_commands(bot.bot, self.config)
+            check_now = bot.bot.tree.get_command("rss").get_command("check_now")
+
+            # フィード確認で投稿待ちになっている記事と同じメッセージにまとめて投稿される
+            await feed_manager.publish_article(queued, self.feed, {**queued, "summary": "要約"})
+            await check_now.callback(interaction)
+            await bot.batch_poster.flush()
+            await bot.send_queue.close()
+            store = feed_manager.article_store
+            return (
+                await store.get_full_article("501:2"),
+                await store.get_full_article("True"),
+            )
+
+        article, wrong = run_async(run())
+        self.assertEqual(len(channel.sent), 1)
+        self.assertEqual(article["title"], "手動で取得した記事")
+        self.assertIsNone(wrong)
+
+
+if __name__ == "__main__":
+    unittest.main()
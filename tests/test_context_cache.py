@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+質問応答のコンテキストキャッシュのテスト
+"""
+
+import os
+import sys
+import unittest
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.context_cache import ContextCache
+from tests.helpers import run_async
+
+
+class StubAPI:
+    """コンテキストキャッシュAPIのスタブ"""
+
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+
+    async def create_cached_content(self, contents, ttl_seconds):
+        name = f"cachedContents/{len(self.created)}"
+        self.created.append((name, ttl_seconds))
+        return name, 1
+
+    async def delete_cached_content(self, name, key_index):
+        self.deleted.append((name, key_index))
+
+
+class TestContextCache(unittest.TestCase):
+    """質問応答のコンテキストキャッシュのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.now = 0.0
+        self.builds = 0
+        self.api = StubAPI()
+
+    async def build(self):
+        """呼び出し回数を数えるコンテキストの組み立て"""
+        self.builds += 1
+        await asyncio.sleep(0)
+        return "記事" * 600
+
+    def test_reuses_context_per_article(self):
+        """同じ記事のコンテキストを1回だけ作成し、Geminiのキャッシュを作成したキーを記録するか"""
+        cache = ContextCache(ttl=600, min_tokens=1000)
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_create("1", self.build, self.api) for _ in range(3)))
+
+        entries = run_async(run())
+        self.assertEqual(self.builds, 1)
+        self.assertTrue(all(entry is entries[0] for entry in entries))
+        self.assertEqual(entries[0].cache_name, "cachedContents/0")
+        self.assertEqual(entries[0].key_index, 1)
+        self.assertEqual(self.api.created, [("cachedContents/0", 600)])
+        self.assertEqual(cache.get_stats()["hits"], 2)
+
+    def test_short_context_is_not_cached_remotely(self):
+        """最小トークン数未満のコンテキストはGeminiのキャッシュを作成しないか"""
+        cache = ContextCache(min_tokens=5000)
+        entry = run_async(cache.get_or_create("1", self.build, self.api))
+        self.assertIsNone(entry.cache_name)
+        self.assertEqual(self.api.created, [])
+
+    def test_expiry_and_eviction(self):
+        """期限切れで作り直し、記事の削除時にGeminiのキャッシュを削除するか"""
+        cache = ContextCache(ttl=600, min_tokens=1000, clock=lambda: self.now)
+        run_async(cache.get_or_create("1", self.build, self.api))
+        self.now = 599.0
+        run_async(cache.get_or_create("1", self.build, self.api))
+        self.assertEqual(self.builds, 2)
+
+        run_async(cache.evict(["1", "2"]))
+        self.assertEqual(self.api.deleted, [("cachedContents/1", 1)])
+        self.assertEqual(cache.get_stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gemini API連携のテスト
+"""
+
+import os
+import sys
+import unittest
+import asyncio
+from unittest.mock import patch, MagicMock
+
+from google.api_core import exceptions as google_exceptions
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.gemini_api import GeminiAPI
+from ai.governor import AIGovernor
+from ai.hedging import HedgePolicy
+from ai.key_pool import GeminiKeyPool
+from ai.gemini_client import GeminiClient, close_clients, get_client
+from tests.helpers import run_async
+
+
+class StubModel:
+    """GenerativeModelのスタブ"""
+
+    instances = 0
+    limited_keys = set()
+    # 先頭から順に呼び出しごとの応答までの秒数
+    delays = []
+
+    def __init__(self, model_name, system_instruction=None, **kwargs):
+        StubModel.instances += 1
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.api_key = None
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False):
+        if self.api_key in StubModel.limited_keys:
+            raise google_exceptions.TooManyRequests("Quota exceeded. Please retry in 7.5s.")
+        if StubModel.delays:
+            await asyncio.sleep(StubModel.delays.pop(0))
+        if stream:
+            return stream_chunks(["ok", ":", self.api_key])
+        response = MagicMock()
+        response.text = f"ok:{self.system_instruction}:{self.api_key}"
+        return response
+
+
+async def stream_chunks(texts):
+    """ストリーミングレスポンスのスタブ"""
+    for text in texts:
+        chunk = MagicMock()
+        chunk.text = text
+        chunk.usage_metadata.total_token_count = 10
+        yield chunk
+
+
+def bind_stub(self, model, api_key):
+    """モデルにAPIキーを記録する（_bind_modelの代替）"""
+    model.api_key = api_key
+
+
+class TestGeminiAPI(unittest.TestCase):
+    """Gemini API連携のテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        StubModel.instances = 0
+        StubModel.limited_keys = set()
+        StubModel.delays = []
+        self.patchers = [
+            patch("ai.gemini_api.genai.GenerativeModel", StubModel),
+            patch("ai.gemini_api.GeminiAPI._bind_model", bind_stub),
+            patch("ai.gemini_api.genai.configure"),
+            patch.dict(os.environ, {}, clear=True),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+
+    def test_model_cached_per_system_instruction(self):
+        """system_instructionごとにモデルが再利用されるか"""
+        api = GeminiAPI(api_keys=["key1"], model="gemini-2.0-flash")
+        base = StubModel.instances
+
+        async def run():
+            for _ in range(3):
+                await api.generate_text("prompt", system_instruction="A")
+            await api.generate_text("prompt", system_instruction="B")
+            return await api.generate_text("prompt", system_instruction="A")
+
+        self.assertEqual(run_async(run()), "ok:A:key1")
+        self.assertEqual(StubModel.instances - base, 2)
+
+    def test_model_cached_per_key(self):
+        """APIキーごとに別のモデルを使い、同じキーでは再利用するか"""
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash")
+        first = api._get_model("A", api_key="key1")
+        self.assertIs(api._get_model("A", api_key="key1"), first)
+
+        second = api._get_model("A", api_key="key2")
+
+        self.assertIsNot(second, first)
+        self.assertEqual((first.api_key, second.api_key), ("key1", "key2"))
+
+    def test_rate_limited_key_cools_down(self):
+        """レート制限を受けたキーがRetry-Afterに従って休止し、別のキーで再試行されるか"""
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash")
+        StubModel.limited_keys = {"key1"}
+
+        result = run_async(api.generate_text("prompt", system_instruction="A"))
+
+        self.assertEqual(result, "ok:A:key2")
+        state = api.key_pool.states[0]
+        self.assertTrue(state.cooling_down())
+        self.assertAlmostEqual(state.cooldown_until - api.key_pool.clock(), 7.5, delta=0.5)
+
+    def test_pinned_key_does_not_fall_back(self):
+        """キーを固定した呼び出しはそのキーを使い、レート制限時は再試行しないか"""
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash")
+        self.assertEqual(run_async(api.generate_text("prompt", key_index=0)), "ok:None:key1")
+
+        StubModel.limited_keys = {"key1"}
+        with self.assertRaises(google_exceptions.TooManyRequests):
+            run_async(api.generate_text("prompt", key_index=0))
+
+    def test_stream_text(self):
+        """生成途中のテキストが順に渡され、レート制限時は別のキーで生成されるか"""
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash")
+        StubModel.limited_keys = {"key1"}
+        updates = []
+
+        async def on_text(text):
+            updates.append(text)
+
+        result = run_async(api.stream_text("prompt", on_text))
+
+        self.assertEqual(result, "ok:key2")
+        self.assertEqual(updates, ["ok", "ok:", "ok:key2"])
+
+    def test_deadline(self):
+        """期限を過ぎた呼び出しがキャンセルされ、キーが返却されるか"""
+        policy = HedgePolicy()
+        api = GeminiAPI(api_keys=["key1"], model="gemini-2.0-flash", hedge_policy=policy, timeout=0.05)
+        StubModel.delays = [1.0]
+
+        with self.assertRaises(asyncio.TimeoutError):
+            run_async(api.generate_text("prompt"))
+
+        self.assertEqual(policy.timeouts, 1)
+        self.assertEqual(api.key_pool.states[0].in_flight, 0)
+
+    def test_hedged_request(self):
+        """p95を過ぎても応答がない場合に別のキーで送り、先に返った応答を使うか"""
+        policy = HedgePolicy(min_samples=5, min_delay=0.01)
+        for _ in range(5):
+            policy.record("route", 0.01)
+        # 予算内に収まるようにリクエスト数を増やしておく
+        policy.requests = 10
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash", hedge_policy=policy)
+        StubModel.delays = [1.0]
+
+        result = run_async(api.generate_text("prompt", latency_key="route"))
+
+        # 遅い主リクエストとヘッジリクエストが別のキーで送られる
+        self.assertEqual([state.requests for state in api.key_pool.states], [1, 1])
+        self.assertTrue(result.startswith("ok:None:key"))
+        self.assertEqual(policy.get_stats()["hedged"], 1)
+        self.assertEqual(policy.hedge_wins, 1)
+        self.assertEqual(policy.cancelled, 1)
+        self.assertTrue(all(state.in_flight == 0 for state in api.key_pool.states))
+
+    def test_deadline_excludes_queueing(self):
+        """実行枠を待つ時間は期限に含めず、ヘッジのレイテンシにも記録しないか"""
+        governor = AIGovernor(max_concurrency=1)
+        policy = HedgePolicy()
+        api = GeminiAPI(
+            api_keys=["key1", "key2"], model="gemini-2.0-flash",
+            governor=governor, hedge_policy=policy, timeout=0.1,
+        )
+
+        async def run():
+            async with governor.slot("interactive"):
+                waiting = asyncio.create_task(api.generate_text("prompt", latency_key="route"))
+                await asyncio.sleep(0.3)
+            return await waiting
+
+        self.assertEqual(run_async(run())[:7], "ok:None")
+        self.assertEqual(policy.timeouts, 0)
+        self.assertLess(max(policy._latencies["route"]), 0.1)
+
+    def test_no_hedge_when_saturated(self):
+        """実行枠の待機が飽和している間はヘッジリクエストを送らないか"""
+        policy = HedgePolicy(min_samples=5, min_delay=0.01)
+        for _ in range(5):
+            policy.record("route", 0.01)
+        policy.requests = 10
+        governor = AIGovernor(max_concurrency=2, saturation=1)
+        api = GeminiAPI(api_keys=["key1", "key2"], model="gemini-2.0-flash", governor=governor, hedge_policy=policy)
+        StubModel.delays = [0.3]
+
+        async def run():
+            first = asyncio.create_task(api.generate_text("prompt", latency_key="route"))
+            await asyncio.sleep(0)
+            # もう1つの実行枠を埋め、ingestレーンに待機を作って飽和させる
+            async with governor.slot("ingest"):
+                blocked = asyncio.create_task(governor.acquire("ingest"))
+                result = await first
+            governor.release(await blocked)
+            return result
+
+        self.assertTrue(run_async(run()).startswith("ok:None:key"))
+        self.assertEqual(policy.get_stats()["hedged"], 0)
+
+    def test_slot_released_while_waiting_for_rpm(self):
+        """キーのRPMの回復を待つ間は実行枠を返し、他のレーンが実行枠を使えるか"""
+        governor = AIGovernor(max_concurrency=1)
+        key_pool = GeminiKeyPool(["key1"], rpm_per_key=60)
+        api = GeminiAPI(key_pool=key_pool, model="gemini-2.0-flash", governor=governor)
+        # 1秒後までRPMの余裕がない状態にする
+        key_pool.states[0].rpm.consume(60)
+
+        async def run():
+            waiting = asyncio.create_task(api.generate_text("prompt"))
+            await asyncio.sleep(0.1)
+            in_flight = governor.in_flight
+            async with governor.slot("interactive"):
+                pass
+            return in_flight, await waiting
+
+        in_flight, result = run_async(run())
+        self.assertEqual(in_flight, 0)
+        self.assertEqual(result, "ok:None:key1")
+        self.assertEqual(governor.snapshot()["ingest"]["completed"], 1)
+
+    def test_hedge_budget(self):
+        """予算を超えるヘッジリクエストを送らないか"""
+        policy = HedgePolicy(budget=0.1)
+        policy.requests = 9
+        self.assertFalse(policy.allow())
+        policy.requests = 10
+        self.assertTrue(policy.allow())
+        self.assertFalse(policy.allow())
+
+
+class TestGeminiClient(unittest.TestCase):
+    """キーごとのGeminiクライアントのテストケース"""
+
+    def test_clients_shared_per_key(self):
+        """同じキーではクライアントが共有され、キーごとに別になるか"""
+        self.assertIs(get_client("key-a"), get_client("key-a"))
+        self.assertIsNot(get_client("key-a"), get_client("key-b"))
+
+    def test_credentials_bound_without_global_configure(self):
+        """genai.configureを呼ばずにキーごとの認証情報が使われるか"""
+        with patch("google.generativeai.configure") as configure:
+            async def run():
+                first = GeminiClient("key-a").async_client
+                second = GeminiClient("key-b").async_client
+                return first.transport._credentials.token, second.transport._credentials.token
+
+            tokens = run_async(run())
+
+        self.assertEqual(tokens, ("key-a", "key-b"))
+        configure.assert_not_called()
+
+    def test_close_clients(self):
+        """終了時にすべてのキーのクライアントを閉じ、次の取得で作り直すか"""
+        async def run():
+            client = get_client("key-close")
+            client.async_client
+            await close_clients()
+            return client
+
+        client = run_async(run())
+        self.assertIsNone(client._async_client)
+        self.assertIsNot(get_client("key-close"), client)
+
+
+if __name__ == "__main__":
+    unittest.main()
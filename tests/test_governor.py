@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI同時実行数の制御のテスト
+"""
+
+import os
+import sys
+import unittest
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.governor import AIGovernor, current_lane, use_lane
+from tests.helpers import run_async
+
+
+class TestAIGovernor(unittest.TestCase):
+    """AI同時実行数の制御のテストケース"""
+
+    def test_limits_concurrency(self):
+        """全レーン合計の同時実行数が上限を超えないか"""
+        governor = AIGovernor(max_concurrency=2)
+        peak = 0
+
+        async def work(lane):
+            nonlocal peak
+            async with governor.slot(lane):
+                peak = max(peak, governor.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(work(lane) for lane in ["ingest", "interactive", "manual"] * 3))
+
+        run_async(run())
+        self.assertEqual(peak, 2)
+        self.assertEqual(governor.in_flight, 0)
+        self.assertEqual(sum(l["completed"] for l in governor.snapshot().values()), 9)
+
+    def test_weighted_dispatch(self):
+        """空いた枠が重みに応じて待機中のレーンに割り当てられるか"""
+        governor = AIGovernor(max_concurrency=1, weights={"ingest": 1, "interactive": 3})
+        order = []
+
+        async def work(lane):
+            async with governor.slot(lane):
+                order.append(lane)
+                await asyncio.sleep(0)
+
+        async def run():
+            # 先にingestが枠を取り、残りは待機する
+            await asyncio.gather(*(work("ingest") for _ in range(4)), *(work("interactive") for _ in range(3)))
+
+        run_async(run())
+        self.assertEqual(order[0], "ingest")
+        # 待機中のinteractiveがingestより先に処理される
+        self.assertEqual(order[1:4], ["interactive"] * 3)
+
+    def test_lane_from_context(self):
+        """レーンを指定しない場合に現在のコンテキストのレーンを使うか"""
+        governor = AIGovernor()
+
+        async def run():
+            with use_lane("interactive"):
+                async with governor.slot() as lane:
+                    return lane
+
+        self.assertEqual(run_async(run()), "interactive")
+        self.assertEqual(current_lane.get(), "ingest")
+
+    def test_backpressure(self):
+        """レーンが飽和している間はwait_for_capacityが待機するか"""
+        governor = AIGovernor(max_concurrency=1, saturation=2)
+        events = []
+
+        async def work():
+            async with governor.slot("ingest"):
+                await asyncio.sleep(0.01)
+
+        async def intake():
+            await governor.wait_for_capacity("ingest")
+            events.append(governor.snapshot()["ingest"]["waiting"])
+
+        async def run():
+            tasks = [asyncio.create_task(work()) for _ in range(3)]
+            await asyncio.sleep(0)
+            self.assertTrue(governor.saturated("ingest"))
+            await intake()
+            await asyncio.gather(*tasks)
+
+        run_async(run())
+        self.assertEqual(len(events), 1)
+        self.assertLess(events[0], 2)
+
+    def test_cancelled_waiter(self):
+        """待機中にキャンセルされた処理が枠を消費しないか"""
+        governor = AIGovernor(max_concurrency=1)
+
+        async def run():
+            await governor.acquire("ingest")
+            waiter = asyncio.create_task(governor.acquire("manual"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            governor.release("ingest")
+            return governor.in_flight, governor.snapshot()["manual"]["waiting"]
+
+        self.assertEqual(run_async(run()), (0, 0))
+
+    def test_cancelled_waiter_already_dispatched(self):
+        """キャンセル後、再開前に枠が返却されてもCancelledErrorを送出し、枠を消費しないか"""
+        governor = AIGovernor(max_concurrency=1)
+
+        async def run():
+            await governor.acquire("ingest")
+            waiter = asyncio.create_task(governor.acquire("manual"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            # 待機中の処理が再開する前に返却し、キャンセル済みの待機を取り出させる
+            governor.release("ingest")
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            return governor.in_flight, governor.snapshot()["manual"]["waiting"]
+
+        self.assertEqual(run_async(run()), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
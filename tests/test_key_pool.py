@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+APIキープールのテスト
+"""
+
+import os
+import sys
+import unittest
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.key_pool import GeminiKeyPool
+from tests.helpers import run_async
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGeminiKeyPool(unittest.TestCase):
+    """APIキープールのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.clock = FakeClock()
+
+    def test_routes_to_key_with_most_headroom(self):
+        """余裕の最も大きいキーに割り当てられるか"""
+        pool = GeminiKeyPool(["a", "b", "c"], rpm_per_key=10, tpm_per_key=1000, clock=self.clock)
+
+        async def run():
+            used = []
+            for _ in range(6):
+                state = await pool.acquire(100)
+                used.append(state.api_key)
+                pool.release(state, 100, 100)
+            return used
+
+        used = run_async(run())
+        self.assertEqual(sorted(used), ["a", "a", "b", "b", "c", "c"])
+
+    def test_cooldown_excludes_key(self):
+        """クールダウン中のキーが使われず、期限後に復帰するか"""
+        pool = GeminiKeyPool(["a", "b"], clock=self.clock)
+        pool.cooldown(pool.states[0], 30)
+
+        async def acquire_key():
+            state = await pool.acquire(10)
+            pool.release(state)
+            return state.api_key
+
+        self.assertEqual(run_async(acquire_key()), "b")
+        self.assertEqual(run_async(acquire_key()), "b")
+
+        self.clock.now += 31
+        self.assertFalse(pool.states[0].cooling_down())
+
+    def test_actual_tokens_adjust_budget(self):
+        """実使用トークン数で予算が補正されるか"""
+        pool = GeminiKeyPool(["a"], tpm_per_key=1000, clock=self.clock)
+
+        async def run():
+            state = await pool.acquire(500)
+            pool.release(state, 500, 100)
+            return state
+
+        state = run_async(run())
+        self.assertAlmostEqual(state.tpm.available(), 900)
+
+    def test_concurrent_requests_spread_across_keys(self):
+        """同時リクエストが全キーに分散されるか"""
+        pool = GeminiKeyPool(["a", "b"], max_in_flight_per_key=1)
+
+        async def worker(log):
+            state = await pool.acquire(10)
+            log.append(state.api_key)
+            await asyncio.sleep(0.01)
+            pool.release(state)
+
+        async def run():
+            log = []
+            await asyncio.gather(*(worker(log) for _ in range(4)))
+            return log
+
+        log = run_async(run())
+        self.assertEqual(len(log), 4)
+        self.assertEqual(set(log[:2]), {"a", "b"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+キーワード抽出のテスト
+"""
+
+import os
+import sys
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.keyword_extractor import KeywordExtractor
+
+
+CORPUS = [
+    "Apple releases new iPhone with faster processor",
+    "Google announces Gemini model update for developers",
+    "Stock market rallies as Apple earnings beat forecasts",
+    "Developers report faster builds after compiler update",
+] * 10
+
+
+class TestKeywordExtractor(unittest.TestCase):
+    """キーワード抽出のテストケース"""
+
+    def test_rare_terms_rank_higher(self):
+        """コーパスで頻出する語より珍しい語を上位にするか"""
+        extractor = KeywordExtractor(max_keywords=3).fit(CORPUS)
+        keywords = extractor.extract("Apple update adds satellite messaging", update=False)
+        self.assertEqual(len(keywords), 3)
+        self.assertIn("satellite", keywords)
+        self.assertNotIn("apple", keywords)
+
+    def test_batch_matches_single(self):
+        """一括抽出と1件ずつの抽出の結果が一致するか"""
+        texts = ["Gemini model pricing for developers", "", "新しいスマートフォンのカメラ性能"]
+        extractor = KeywordExtractor().fit(CORPUS)
+        batch = extractor.extract_batch(texts, update=False)
+        single = [extractor.extract(text, update=False) for text in texts]
+        self.assertEqual(batch, single)
+        self.assertEqual(batch[1], [])
+        self.assertIn("スマートフォン", batch[2])
+
+    def test_update_adds_documents(self):
+        """抽出したテキストをコーパスに追加するかどうかを選べるか"""
+        extractor = KeywordExtractor().fit(CORPUS)
+        vocab = len(extractor.vocab)
+        extractor.extract("quantum networking", update=False)
+        self.assertEqual((extractor.num_docs, len(extractor.vocab)), (len(CORPUS), vocab))
+        extractor.extract("quantum networking")
+        self.assertEqual(extractor.num_docs, len(CORPUS) + 1)
+        self.assertEqual(extractor.doc_freq[extractor.vocab["quantum"]], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
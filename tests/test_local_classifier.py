@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ローカルジャンル分類器のテスト
+"""
+
+import os
+import sys
+import unittest
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.local_classifier import LocalClassifier, evaluate_thresholds
+
+
+SAMPLES = [
+    ("新しいスマートフォンのプロセッサ性能が向上", "technology"),
+    ("AIモデルの推論速度を改善するソフトウェア", "technology"),
+    ("New smartphone processor benchmark software", "technology"),
+    ("クラウドサービスのソフトウェア更新", "technology"),
+    ("半導体メーカーが次世代プロセッサを発表", "technology"),
+    ("スマートフォン向けの新しいAIアプリ", "technology"),
+    ("Cloud software update improves AI model speed", "technology"),
+    ("ソフトウェアの脆弱性を修正する更新プログラム", "technology"),
+    ("AI chip startup unveils new processor", "technology"),
+    ("クラウドとAIを使った新しいサービス", "technology"),
+    ("株価が上昇し企業の決算が好調", "business"),
+    ("企業の売上と利益が市場予想を上回る", "business"),
+    ("Stock market rally as company earnings beat forecasts", "business"),
+    ("市場の株価と為替の動向", "business"),
+    ("大手企業の決算発表で株価が下落", "business"),
+    ("為替市場で円安が進み輸出企業の利益が増加", "business"),
+    ("Company profits rise as market forecasts improve", "business"),
+    ("企業の利益見通しを受けて市場が反発", "business"),
+    ("Investors react to quarterly earnings and stock prices", "business"),
+    ("売上高が過去最高となり株価が上昇", "business"),
+]
+
+
+class TestLocalClassifier(unittest.TestCase):
+    """ローカル分類器のテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, "classifier.json")
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def test_untrained(self):
+        """未学習の場合は予測しないか"""
+        classifier = LocalClassifier(self.model_path)
+        self.assertFalse(classifier.is_trained)
+        self.assertEqual(classifier.predict("株価"), (None, 0.0))
+
+    def test_fit_and_predict(self):
+        """学習したカテゴリを高い信頼度で予測できるか"""
+        classifier = LocalClassifier(self.model_path).fit(SAMPLES)
+        label, confidence = classifier.predict("プロセッサとソフトウェアの性能")
+        self.assertEqual(label, "technology")
+        self.assertGreater(confidence, 0.9)
+        label, _ = classifier.predict("company earnings and stock prices")
+        self.assertEqual(label, "business")
+
+    def test_save_and_load(self):
+        """保存したモデルを読み込んで同じ予測ができるか"""
+        classifier = LocalClassifier(self.model_path).fit(SAMPLES)
+        classifier.save()
+        loaded = LocalClassifier(self.model_path)
+        self.assertEqual(loaded.samples, len(SAMPLES))
+        self.assertEqual(loaded.predict("企業の決算"), classifier.predict("企業の決算"))
+
+    def test_evaluate_thresholds(self):
+        """重複を除いてから分割し、評価用の記事で閾値ごとの削減率と正解率を求めるか"""
+        report = evaluate_thresholds(SAMPLES * 3, thresholds=(0.0, 0.9, 1.01), holdout=0.5)
+        # 重複した記事は1件として数え、学習用と評価用に分ける
+        self.assertEqual((report["train"], report["test"]), (10, 10))
+        everything, confident, nothing = report["thresholds"]
+        self.assertEqual(everything["coverage"], 1.0)
+        self.assertEqual(everything["accuracy"], report["accuracy"])
+        self.assertGreaterEqual(report["accuracy"], 0.8)
+        self.assertLess(confident["coverage"], 1.0)
+        self.assertGreater(confident["coverage"], 0.0)
+        self.assertEqual((nothing["coverage"], nothing["accuracy"]), (0.0, 0.0))
+
+if __name__ == "__main__":
+    unittest.main()
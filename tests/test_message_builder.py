@@ -24,5 +24,18 @@ class TestMessageBuilder(unittest.TestCase):
         )
         self.assertEqual(embed.thumbnail.url, "https://example.com/image.jpg")
 
+    def test_digest_embed_within_limits(self):
+        items = [
+            {"title": f"記事{i}" * 50, "summary": "要約" * 600, "link": f"https://example.com/{i}"}
+            for i in range(30)
+        ]
+        embed = self.builder.build_digest_embed({"feed_title": "Feed", "overview": "概要" * 1000, "items": items})
+        self.assertEqual(len(embed.fields), 25)
+        self.assertLessEqual(len(embed), 6000)
+        self.assertTrue(all(len(field.value) <= 1024 for field in embed.fields))
+
+        embed = self.builder.build_digest_embed({"feed_title": "Feed", "overview": "概要", "items": items[:2]})
+        self.assertIn("https://example.com/0", embed.fields[0].value)
+
 if __name__ == "__main__":
     unittest.main()
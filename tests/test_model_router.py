@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+モデルルーティングのテスト
+"""
+
+import os
+import re
+import sys
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.classifier import Classifier
+from ai.model_router import ModelRouter, route_text
+from ai.summarizer import Summarizer
+from tests.helpers import run_async
+
+
+class ModelAPI:
+    """モデル名ごとにプロンプトを記録するダミーAPI"""
+
+    def __init__(self, model, fail=False):
+        self.model = model
+        self.fail = fail
+        self.prompts = []
+
+    async def generate_text(self, prompt, max_tokens=1000, temperature=0.7, **kwargs):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise RuntimeError("error")
+        numbers = re.findall(r"^\[\[(\d+)\]\]$", prompt, re.MULTILINE)
+        return "\n".join(f"[[{n}]]\n{self.model}" for n in numbers) or self.model
+
+
+class TestModelRouter(unittest.TestCase):
+    """モデルルーティングのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.apis = {}
+        self.router = ModelRouter(
+            "base",
+            self.create_api,
+            routes={"title": "lite", "summary:long": "pro"},
+            short_tokens=10,
+            long_tokens=100,
+            task_defaults={"qa": "qa-model"},
+        )
+
+    def create_api(self, model):
+        """モデルごとのダミーAPIを生成する"""
+        self.apis[model] = ModelAPI(model, fail=model == "broken")
+        return self.apis[model]
+
+    def test_model_for(self):
+        """長さの区分、タスク、タスクの既定値、既定のモデルの順に選ぶか"""
+        self.assertEqual(self.router.model_for("summary", "x" * 400), "pro")
+        self.assertEqual(self.router.model_for("summary", "x" * 40), "base")
+        self.assertEqual(self.router.model_for("title", "x" * 400), "lite")
+        self.assertEqual(self.router.model_for("qa"), "qa-model")
+        self.assertEqual(self.router.size_class("x" * 8), "short")
+        self.assertIsNone(self.router.size_class(None))
+
+    def test_stats_per_route(self):
+        """ルートごとに呼び出し数と失敗数を集計し、APIをモデルごとに共有するか"""
+        self.router.update({"classify": "broken", "title": "lite"})
+
+        async def run():
+            await self.router.api_for("title", "短い").generate_text("prompt")
+            await self.router.api_for("title", "x" * 400).generate_text("prompt")
+            with self.assertRaises(RuntimeError):
+                await self.router.api_for("classify", "x").generate_text("prompt")
+
+        run_async(run())
+        stats = {(r["route"], r["model"]): r for r in self.router.get_stats()}
+        self.assertEqual(stats[("title/short", "lite")]["calls"], 1)
+        self.assertEqual(stats[("title/long", "lite")]["calls"], 1)
+        self.assertEqual(stats[("classify/short", "broken")]["errors"], 1)
+        self.assertEqual(len(self.apis["lite"].prompts), 2)
+
+    def test_parse_routes(self):
+        """ルートの行を解析し、不正なタスクや長さを拒否するか"""
+        self.assertEqual(
+            ModelRouter.parse_routes("title = lite\n\nsummary:long=pro\n"),
+            {"title": "lite", "summary:long": "pro"},
+        )
+        for text in ("unknown=model", "summary:huge=model", "summary"):
+            with self.assertRaises(ValueError):
+                ModelRouter.parse_routes(text)
+
+    def test_summarize_batch_routes_by_size(self):
+        """バッチ要約を長さの区分ごとに分け、それぞれのモデルで要約するか"""
+        summarizer = Summarizer(ModelAPI("unused"), router=self.router)
+        texts = {"a": "y" * 400, "b": "z" * 420, "c": "短い本文です", "d": "別の短い本文"}
+        results = run_async(summarizer.summarize_batch(texts, 200, "normal"))
+        self.assertEqual(results, {"a": "pro", "b": "pro", "c": "base", "d": "base"})
+        self.assertEqual(len(self.apis["pro"].prompts), 1)
+        self.assertEqual(len(self.apis["base"].prompts), 1)
+
+    def test_classify_routes_on_title_and_content(self):
+        """分類の呼び出しとキャッシュのモデル名がタイトルを含む同じテキストで長さの区分を決めるか"""
+        self.router.update({"classify:long": "pro"})
+        classifier = Classifier(ModelAPI("unused"), router=self.router)
+        title, content = "t" * 400, "短い"
+
+        run_async(classifier.classify(title, content, ["technology"]))
+        self.assertEqual(self.router.model_for("classify", route_text(title, content)), "pro")
+        self.assertEqual(len(self.apis["pro"].prompts), 1)
+        self.assertNotEqual(self.router.model_for("classify", content), "pro")
+
+
+if __name__ == "__main__":
+    unittest.main()
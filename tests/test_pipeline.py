@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+処理パイプラインのテスト
+"""
+
+import os
+import sys
+import time
+import unittest
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.pipeline import StageGraph
+from tests.helpers import run_async
+
+
+class TestStageGraph(unittest.TestCase):
+    """ステージ依存グラフのテストケース"""
+
+    def test_independent_stages_run_concurrently(self):
+        """独立したステージが並行に実行され、依存ステージが結果を受け取るか"""
+        async def slow(value):
+            await asyncio.sleep(0.05)
+            return value
+
+        async def run():
+            graph = StageGraph()
+            graph.add("a", lambda _: slow(1))
+            graph.add("b", lambda _: slow(2))
+            graph.add("c", lambda r: slow(r["a"] + r["b"]), deps=["a", "b"])
+            start = time.perf_counter()
+            results = await graph.run()
+            return graph, results, time.perf_counter() - start
+
+        graph, results, elapsed = run_async(run())
+        self.assertEqual(results, {"a": 1, "b": 2, "c": 3})
+        self.assertLess(elapsed, 0.14)
+        path, _ = graph.critical_path()
+        self.assertEqual(path[-1], "c")
+        self.assertEqual(set(graph.timings), {"a", "b", "c"})
+
+    def test_failed_stage_skips_dependents(self):
+        """失敗したステージの依存先が実行されないか"""
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def ok():
+            return "ok"
+
+        async def run():
+            graph = StageGraph(asyncio.Semaphore(1))
+            graph.add("a", lambda _: fail())
+            graph.add("b", lambda _: ok(), deps=["a"])
+            graph.add("c", lambda _: ok())
+            await graph.run()
+            return graph
+
+        graph = run_async(run())
+        self.assertEqual(graph.results, {"c": "ok"})
+        self.assertIn("a", graph.errors)
+        self.assertIn("b", graph.errors)
+
+
+if __name__ == "__main__":
+    unittest.main()
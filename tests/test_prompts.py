@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+プロンプトの登録簿のテスト
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.ai_processor import AIProcessor
+from ai.backends import FakeGeminiBackend
+from ai.context_cache import QAContext
+from ai.prompts import PromptRegistry, PromptTemplate
+from ai.summarizer import Summarizer
+from ai.text_utils import estimate_tokens
+from ai.usage import current_usage_tags
+from config.default_config import DEFAULT_CONFIG
+from tests.helpers import run_async
+
+
+class RecordingAPI:
+    """プロンプトと使用量のタグを記録するAPI"""
+
+    def __init__(self):
+        self.prompts = []
+        self.tags = []
+
+    async def generate_text(self, prompt, max_tokens=1000, temperature=0.7):
+        self.prompts.append(prompt)
+        self.tags.append(dict(current_usage_tags.get()))
+        return "要約結果"
+
+
+class TestPromptTemplate(unittest.TestCase):
+    """プロンプトテンプレートのテストケース"""
+
+    def test_render_and_estimate(self):
+        """値を埋め込んで組み立て、固定部分と値からトークン数を見積もるか"""
+        template = PromptTemplate("greeting", "2", "Hello {name}, {name}! {{literal}}")
+
+        self.assertEqual(template.fields, ("name",))
+        self.assertEqual(template.key, "greeting@2")
+        prompt = template.render(name="世界")
+        self.assertEqual(prompt, "Hello 世界, 世界! {literal}")
+        self.assertEqual(template.base_tokens, estimate_tokens("Hello , ! {literal}"))
+        self.assertEqual(template.estimate_tokens(name="世界"), template.base_tokens + 2)
+
+        with self.assertRaises(KeyError):
+            template.render()
+
+    def test_rejects_format_spec(self):
+        """書式指定や位置指定の値を含むテンプレートを拒否するか"""
+        with self.assertRaises(ValueError):
+            PromptTemplate("bad", "1", "{value:>10}")
+        with self.assertRaises(ValueError):
+            PromptTemplate("bad", "1", "{}")
+
+
+class TestPromptRegistry(unittest.TestCase):
+    """プロンプトの登録簿のテストケース"""
+
+    def test_builtin_prompts_match_previous_text(self):
+        """組み込みのプロンプトが従来の文言と同じプロンプトを組み立てるか"""
+        registry = PromptRegistry()
+
+        self.assertEqual(
+            registry.render("summary", instruction="指示", text="本文", label="要約:"),
+            "指示\n\n本文\n\n要約:",
+        )
+        self.assertEqual(
+            registry.render("qa_question", question="なぜ？"),
+            "**User's Question:**\nなぜ？\n\n**Answer (in Japanese):**",
+        )
+        self.assertEqual(registry.version("summary"), "1")
+
+    def test_select_version(self):
+        """設定したバージョンを使い、登録されていないバージョンは無視するか"""
+        registry = PromptRegistry()
+        registry.register(PromptTemplate("summary", "2", "{instruction}\n{text}\n{label}"), activate=False)
+        self.assertEqual(registry.version("summary"), "1")
+
+        registry = PromptRegistry(
+            templates=[
+                PromptTemplate("summary", "1", "{instruction}\n\n{text}\n\n{label}"),
+                PromptTemplate("summary", "2", "{instruction}\n{text}\n{label}"),
+            ],
+            versions={"summary": "1"},
+        )
+        self.assertEqual(registry.get("summary").key, "summary@1")
+        self.assertFalse(registry.select("summary", "3"))
+        self.assertTrue(registry.select("summary", "2"))
+        self.assertEqual(registry.version("summary"), "2")
+        self.assertEqual(registry.snapshot()["summary"]["versions"], ["1", "2"])
+
+        with self.assertRaises(KeyError):
+            registry.get("unknown")
+
+    def test_summarizer_uses_selected_version(self):
+        """要約で選んだバージョンのプロンプトを使い、使用量のタグにバージョンを付けるか"""
+        registry = PromptRegistry()
+        registry.register(PromptTemplate("summary", "2", "[v2] {instruction} {text} {label}"))
+        api = RecordingAPI()
+        summarizer = Summarizer(api, prompts=registry)
+
+        result = run_async(summarizer.summarize("本文のテキスト", summary_type="short"))
+
+        self.assertEqual(result, "要約結果")
+        self.assertTrue(api.prompts[0].startswith("[v2] "))
+        self.assertEqual(api.tags[0]["prompt"], "summary@2")
+
+
+class TestProcessorPrompts(unittest.TestCase):
+    """AI処理でのプロンプトのバージョンのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.patcher = patch.dict(os.environ, {}, clear=True)
+        self.patcher.start()
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config.update({
+            "gemini_api_keys": ["fake-key"],
+            "ai_cache_enabled": False,
+            "local_classifier_path": os.path.join(self.temp_dir.name, "classifier.json"),
+        })
+        self.processor = AIProcessor(config, backend=FakeGeminiBackend(latency_ms=1, latency_sigma=0))
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_usage_tagged_with_sent_prompts(self):
+        """使用量の記録に、実際に送ったテンプレートとシステムインストラクションのバージョンを付けるか"""
+        async def run():
+            await self.processor.summarizer.summarize("記事の本文です。" * 20)
+            await self.processor._generate_answer(QAContext("コンテキスト", 0.0), "質問")
+
+        run_async(run())
+        prompts = [record["prompt"] for record in self.processor.usage_recorder.drain()]
+        self.assertEqual(prompts, ["summary@1+summary_system@1", "qa_context@1+qa_question@1"])
+
+    def test_summary_cache_version_covers_batch_and_system(self):
+        """要約キャッシュのバージョンがバッチのテンプレートとシステムインストラクションの変更でも変わるか"""
+        before = self.processor._summary_version()
+        self.processor.prompts.register(PromptTemplate("summary_batch", "2", "{count}{instruction}{what}{blocks}"))
+        after_batch = self.processor._summary_version()
+        self.processor.prompts.register(PromptTemplate("summary_system", "2", "編集者です。"))
+
+        self.assertNotEqual(before, after_batch)
+        self.assertNotEqual(after_batch, self.processor._summary_version())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+質問応答キャッシュのテスト
+"""
+
+import os
+import sys
+import unittest
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.qa_cache import QACache
+from tests.helpers import run_async
+
+
+class TestQACache(unittest.TestCase):
+    """質問応答キャッシュのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.now = 0.0
+        self.calls = 0
+
+    async def answer(self, text="回答", cacheable=True):
+        """呼び出し回数を数える回答生成"""
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return text, cacheable
+
+    def test_normalize_question(self):
+        """表記の揺れと末尾の記号を無視するか"""
+        self.assertEqual(QACache.normalize_question("  値段は？ "), "値段は")
+        self.assertEqual(QACache.normalize_question("ＷＨＹ  Now?"), "why now")
+
+    def test_coalesces_in_flight_requests(self):
+        """処理中の同じ質問が1回の回答生成にまとめられるか"""
+        cache = QACache()
+
+        async def run():
+            return await asyncio.gather(
+                cache.get_or_create("1", "値段は？", self.answer),
+                cache.get_or_create("1", "値段は", self.answer),
+                cache.get_or_create("2", "値段は", self.answer),
+            )
+
+        self.assertEqual(run_async(run()), ["回答", "回答", "回答"])
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(cache.coalesced, 1)
+
+    def test_ttl_expiry(self):
+        """回答が期限内はキャッシュから返され、期限後に再生成されるか"""
+        cache = QACache(ttl=60, clock=lambda: self.now)
+        run_async(cache.get_or_create("1", "質問", self.answer))
+        run_async(cache.get_or_create("1", "質問", self.answer))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.hits, 1)
+
+        self.now = 61.0
+        run_async(cache.get_or_create("1", "質問", self.answer))
+        self.assertEqual(self.calls, 2)
+
+    def test_failures_are_not_cached(self):
+        """失敗した回答と例外をキャッシュしないか"""
+        cache = QACache()
+        run_async(cache.get_or_create("1", "質問", lambda: self.answer("失敗", False)))
+        self.assertEqual(run_async(cache.get_or_create("1", "質問", self.answer)), "回答")
+
+        async def fail():
+            raise RuntimeError("error")
+
+        with self.assertRaises(RuntimeError):
+            run_async(cache.get_or_create("2", "質問", fail))
+        self.assertEqual(run_async(cache.get_or_create("2", "質問", self.answer)), "回答")
+        self.assertEqual(cache.get_stats()["entries"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
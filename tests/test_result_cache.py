@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI処理結果キャッシュのテスト
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import unittest
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.result_cache import AIResultCache
+from tests.helpers import run_async
+
+
+class TestAIResultCache(unittest.TestCase):
+    """AI処理結果キャッシュのテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "ai_cache.db")
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def test_normalized_content_hits(self):
+        """体裁の異なる同一コンテンツがヒットするか"""
+        cache = AIResultCache(self.db_path)
+
+        async def run():
+            await cache.set("summary", "<p>Hello   World</p>", "normal", "gemini", "1", "要約")
+            hit = await cache.get("summary", "hello world", "normal", "gemini", "1")
+            miss = await cache.get("summary", "hello world", "normal", "gemini", "2")
+            return hit, miss
+
+        hit, miss = run_async(run())
+        self.assertEqual(hit, "要約")
+        self.assertIsNone(miss)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertAlmostEqual(cache.hit_rate, 0.5)
+
+    def test_eviction_by_size(self):
+        """上限を超えたエントリが削除されるか"""
+        cache = AIResultCache(self.db_path, max_entries=3, evict_interval=1)
+
+        async def run():
+            for i in range(5):
+                await cache.set("summary", f"content {i}", "normal", "gemini", "1", f"value {i}")
+
+        run_async(run())
+        self.assertEqual(cache.get_stats()["entries"], 3)
+
+    def test_eviction_by_age(self):
+        """期限切れのエントリが返されず削除されるか"""
+        cache = AIResultCache(self.db_path, max_age_days=1)
+        run_async(cache.set("title", "old", "title", "gemini", "1", "古い"))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE ai_results SET created_at = ?", (time.time() - 2 * 86400,))
+        conn.commit()
+        conn.close()
+
+        self.assertIsNone(run_async(cache.get("title", "old", "title", "gemini", "1")))
+        self.assertEqual(cache._evict(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
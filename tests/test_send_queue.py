@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+チャンネルごとの送信キューのテスト
+"""
+
+import os
+import sys
+import time
+import unittest
+import asyncio
+
+import discord
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from discord_bot.batch_poster import BatchPoster
+from discord_bot.send_queue import SendQueue
+from tests.helpers import run_async
+
+
+class StubChannel:
+    """送信した内容と時刻を記録するチャンネル"""
+
+    def __init__(self, rate_limits: int = 0, retry_after: float = 0.05):
+        self.sent = []
+        self.rate_limits = rate_limits
+        self.retry_after = retry_after
+
+    async def send(self, content):
+        if self.rate_limits:
+            self.rate_limits -= 1
+            raise discord.RateLimited(self.retry_after)
+        self.sent.append((content, time.monotonic()))
+        return content
+
+
+class TestSendQueue(unittest.TestCase):
+    """送信キューのテストケース"""
+
+    def test_keeps_order_within_channel(self):
+        """同じチャンネルの送信を届いた順に行い、送信数と送信待ちの最大数を記録するか"""
+        channel = StubChannel()
+        queue = SendQueue(rate=100, per=1.0)
+
+        async def run():
+            results = await asyncio.gather(*(queue.send("1", lambda i=i: channel.send(i)) for i in range(5)))
+            await queue.close()
+            return results
+
+        self.assertEqual(run_async(run()), [0, 1, 2, 3, 4])
+        self.assertEqual([content for content, _ in channel.sent], [0, 1, 2, 3, 4])
+        stats = queue.snapshot()["1"]
+        self.assertEqual(stats["sent"], 5)
+        self.assertEqual(stats["depth"], 0)
+        self.assertEqual(stats["max_depth"], 5)
+
+    def test_channels_are_independent(self):
+        """レート制限で待っているチャンネルが他のチャンネルの送信を止めないか"""
+        slow = StubChannel(rate_limits=1, retry_after=0.3)
+        fast = StubChannel()
+        queue = SendQueue(rate=100, per=1.0)
+
+        async def run():
+            started = time.monotonic()
+            await asyncio.gather(
+                queue.send("slow", lambda: slow.send("a")),
+                queue.send("fast", lambda: fast.send("b")),
+            )
+            await queue.close()
+            return started
+
+        started = run_async(run())
+        self.assertLess(fast.sent[0][1] - started, 0.2)
+        self.assertGreaterEqual(slow.sent[0][1] - started, 0.3)
+        self.assertEqual(queue.snapshot()["slow"]["rate_limited"], 1)
+        self.assertEqual(queue.snapshot()["fast"]["rate_limited"], 0)
+
+    def test_paces_with_channel_bucket(self):
+        """チャンネルごとのトークンバケットで送信間隔を空けるか"""
+        channel = StubChannel()
+        queue = SendQueue(rate=2, per=0.2)
+
+        async def run():
+            await asyncio.gather(*(queue.send("1", lambda i=i: channel.send(i)) for i in range(4)))
+            await queue.close()
+
+        run_async(run())
+        times = [sent_at for _, sent_at in channel.sent]
+        # 2件は続けて送り、残りは1件ずつ0.1秒の間隔を空ける
+        self.assertGreaterEqual(times[3] - times[0], 0.18)
+
+    def test_gives_up_after_retries(self):
+        """429が続く場合は再送の上限で例外を返し、失敗として記録するか"""
+        channel = StubChannel(rate_limits=5, retry_after=0.01)
+        queue = SendQueue(rate=100, per=1.0, max_retries=2)
+
+        async def run():
+            try:
+                with self.assertRaises(discord.RateLimited):
+                    await queue.send("1", lambda: channel.send("a"))
+                with self.assertRaises(ValueError):
+                    await queue.send("1", self._raise_value_error)
+            finally:
+                await queue.close()
+
+        run_async(run())
+        stats = queue.snapshot()["1"]
+        self.assertEqual(stats["rate_limited"], 3)
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(stats["sent"], 0)
+
+    def test_posting_does_not_wait_for_rate_limit(self):
+        """レート制限で再送を待っている間も記事の投稿が待たされず、終了時に送り切るか"""
+        channel = StubChannel(rate_limits=1, retry_after=0.3)
+        queue = SendQueue(rate=100, per=1.0)
+
+        async def send(channel_id, embeds):
+            return await queue.send(channel_id, lambda: channel.send("".join(embed.title for embed in embeds)))
+
+        poster = BatchPoster(send, window=0)
+        keys = []
+
+        async def on_posted(key):
+            keys.append(key)
+
+        async def run():
+            started = time.monotonic()
+            for title in ("a", "b"):
+                poster.submit("1", discord.Embed(title=title), on_posted)
+            submitted = time.monotonic() - started
+            # 終了時の順序（投稿待ちを送り切ってから送信キューを止める）
+            await poster.flush()
+            await queue.close()
+            return submitted
+
+        self.assertLess(run_async(run()), 0.1)
+        self.assertEqual([content for content, _ in channel.sent], ["a", "b"])
+        self.assertEqual(keys, ["a", "b"])
+
+    @staticmethod
+    async def _raise_value_error():
+        raise ValueError("送信失敗")
+
+
+if __name__ == "__main__":
+    unittest.main()
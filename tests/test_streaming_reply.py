@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ストリーミング返信のテスト
+"""
+
+import os
+import sys
+import unittest
+import asyncio
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from discord_bot.streaming_reply import (
+    EMPTY_ANSWER, ERROR_ANSWER, MESSAGE_LIMIT, StreamingReply, split_message,
+)
+from tests.helpers import run_async
+
+
+class StubChannel:
+    """チャンネルのスタブ"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class StubMessage:
+    """メッセージのスタブ"""
+
+    def __init__(self):
+        self.edits = []
+        self.channel = StubChannel()
+
+    async def edit(self, content):
+        self.edits.append(content)
+
+
+class TestStreamingReply(unittest.TestCase):
+    """ストリーミング返信のテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.now = 0.0
+
+    def test_edits_are_throttled(self):
+        """編集の間隔が空くまで途中のテキストを反映しないか"""
+        message = StubMessage()
+        stream = StreamingReply(message, interval=1.0, clock=lambda: self.now)
+
+        async def run():
+            for i, text in enumerate(["あ", "あい", "あいう", "あいうえ"]):
+                self.now = i * 0.4
+                await stream.update(text)
+                await asyncio.sleep(0)
+            await stream.finish("あいうえお")
+
+        run_async(run())
+        self.assertEqual(message.edits, ["あ …", "あいうえ …", "あいうえお"])
+
+    def test_long_answer_is_split(self):
+        """上限を超える回答を分割して続けて送信するか"""
+        message = StubMessage()
+        text = "a" * (MESSAGE_LIMIT - 5) + "\n" + "b" * 10
+        run_async(StreamingReply(message).finish(text))
+        self.assertEqual(message.edits, ["a" * (MESSAGE_LIMIT - 5)])
+        self.assertEqual(message.channel.sent, ["b" * 10])
+
+    def test_empty_answer_and_failure(self):
+        """空の回答やエラーの場合にプレースホルダーを説明のメッセージに置き換えるか"""
+        message = StubMessage()
+        run_async(StreamingReply(message).finish(" \n"))
+        run_async(StreamingReply(message).fail())
+        self.assertEqual(message.edits, [EMPTY_ANSWER, ERROR_ANSWER])
+        self.assertEqual(message.channel.sent, [])
+
+    def test_split_message(self):
+        """改行がない場合は文字数で分割するか"""
+        self.assertEqual(split_message("x" * 5, limit=2), ["xx", "xx", "x"])
+        self.assertEqual(split_message(""), [""])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+要約機能のテスト
+"""
+
+import os
+import sys
+import re
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.summarizer import Summarizer
+from ai.text_utils import PromptBudget, estimate_tokens
+from tests.helpers import run_async
+
+
+class BatchAPI:
+    """バッチ形式の応答を返すダミーAPI"""
+
+    def __init__(self, drop=None):
+        self.prompts = []
+        self.drop = set(drop or [])
+
+    async def generate_text(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7, **kwargs):
+        self.prompts.append(prompt)
+        numbers = re.findall(r"^\[\[(\d+)\]\]$", prompt, re.MULTILINE)
+        if not numbers:
+            return "要約: 個別要約"
+        return "\n".join(
+            f"[[{n}]]\n要約{n}" for n in numbers if int(n) not in self.drop
+        )
+
+
+class TestSummarizer(unittest.TestCase):
+    """要約機能のテストケース"""
+
+    def test_summarize_batch_single_request(self):
+        """複数記事が1回のリクエストで要約されるか"""
+        api = BatchAPI()
+        summarizer = Summarizer(api)
+        texts = {"a": "first article", "b": "second article", "c": "third article"}
+
+        results = run_async(summarizer.summarize_batch(texts, 200, "normal"))
+
+        self.assertEqual(len(api.prompts), 1)
+        self.assertEqual(results, {"a": "要約1", "b": "要約2", "c": "要約3"})
+
+    def test_summarize_batch_retries_missing(self):
+        """バッチ応答に含まれなかった記事が個別に要約されるか"""
+        api = BatchAPI(drop=[2])
+        summarizer = Summarizer(api)
+        texts = {"a": "first article", "b": "second article"}
+
+        results = run_async(summarizer.summarize_batch(texts, 200, "normal"))
+
+        self.assertEqual(len(api.prompts), 2)
+        self.assertEqual(results["a"], "要約1")
+        self.assertEqual(results["b"], "個別要約")
+
+    def test_summarize_batch_respects_token_budget(self):
+        """トークン予算を超える場合にリクエストが分割されるか"""
+        api = BatchAPI()
+        summarizer = Summarizer(api)
+        texts = {str(i): "x" * 400 for i in range(4)}
+
+        results = run_async(summarizer.summarize_batch(texts, 200, "normal", token_budget=450))
+
+        self.assertEqual(len(api.prompts), 2)
+        self.assertEqual(len(results), 4)
+
+    def test_summarize_truncates_to_budget(self):
+        """長い本文がトークン予算内に切り詰められ、送信トークン数が記録されるか"""
+        api = BatchAPI()
+        budget = PromptBudget({"summary": 100}, strategy="head_tail")
+        summarizer = Summarizer(api, budget=budget)
+
+        run_async(summarizer.summarize("start " + "x" * 4000 + " end", 200, "normal"))
+
+        self.assertLess(estimate_tokens(api.prompts[0]), 200)
+        self.assertIn("start", api.prompts[0])
+        self.assertIn("end", api.prompts[0])
+        self.assertEqual(budget.truncated, {"summary": 1})
+        self.assertEqual(budget.sent["summary"], estimate_tokens(api.prompts[0]))
+
+    def test_summarize_digest(self):
+        """複数記事が1回のリクエストでダイジェストになり、欠けた記事は簡易要約で補われるか"""
+
+        class DigestAPI:
+            def __init__(self):
+                self.prompts = []
+
+            async def generate_text(self, prompt, max_tokens=1000, temperature=0.7, **kwargs):
+                self.prompts.append(prompt)
+                return "[[0]]\n全体の要点\n[[1]]\nタイトル: 記事1\n要約1"
+
+        api = DigestAPI()
+        summarizer = Summarizer(api, fallback_summarize=lambda text, length: f"簡易:{text}")
+        articles = [{"title": "First", "content": "first body"}, {"title": "Second", "content": "second body"}]
+
+        digest = run_async(summarizer.summarize_digest(articles, item_length=100))
+
+        self.assertEqual(len(api.prompts), 1)
+        self.assertEqual(digest["overview"], "全体の要点")
+        self.assertEqual(digest["items"][0], {"title": "記事1", "summary": "要約1"})
+        self.assertEqual(digest["items"][1], {"title": "Second", "summary": "簡易:second body"})
+
+
+if __name__ == "__main__":
+    unittest.main()
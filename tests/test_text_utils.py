@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+テキストユーティリティのテスト
+"""
+
+import os
+import sys
+import unittest
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.text_utils import (
+    estimate_tokens, detect_language, is_japanese, tokenize, truncate_head_tail, truncate_to_tokens,
+)
+
+
+class TestTextUtils(unittest.TestCase):
+    """テキストユーティリティのテストケース"""
+
+    def test_estimate_tokens(self):
+        """ASCIIと非ASCIIのトークン数を見積もれるか"""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcd"), 1)
+        self.assertEqual(estimate_tokens("日本語"), 3)
+
+    def test_detect_language(self):
+        """文字種の統計から言語を判定できるか"""
+        self.assertEqual(detect_language("新しいAIモデルが発表された"), "ja")
+        self.assertEqual(detect_language("OpenAIがGPT-5を発表"), "ja")
+        self.assertEqual(detect_language("iPhone 16 レビュー"), "ja")
+        self.assertEqual(detect_language("Apple releases new iPhone"), "en")
+        self.assertEqual(detect_language("苹果发布新手机"), "other")
+        self.assertEqual(detect_language("2024-01-01 !!"), "other")
+
+    def test_is_japanese(self):
+        """日本語判定が英語のテキストを除外するか"""
+        self.assertTrue(is_japanese("今日は良い天気です。"))
+        self.assertFalse(is_japanese("The quick brown fox jumps over the lazy dog"))
+        self.assertFalse(is_japanese(""))
+
+    def test_tokenize(self):
+        """英単語と日本語のbigramに分割できるか"""
+        self.assertEqual(tokenize("The new AIモデル"), ["ai", "モデ", "デル"])
+        self.assertEqual(tokenize("新型スマートフォン", bigrams=False), ["新型", "スマートフォン"])
+
+    def test_truncate_head_tail(self):
+        """先頭と末尾を残して予算内に切り詰めるか"""
+        text = "始" * 300 + "中" * 300 + "終" * 300
+        truncated = truncate_head_tail(text, 100)
+        self.assertLessEqual(estimate_tokens(truncated), 100)
+        self.assertTrue(truncated.startswith("始"))
+        self.assertTrue(truncated.endswith("終"))
+        self.assertEqual(truncate_head_tail("短い", 100), "短い")
+
+    def test_truncate_salient(self):
+        """重要な文を選ぶ切り詰めでリード文を残し、予算を守るか"""
+        text = "新型AIモデルが発表された。" + "".join(f"関係のない話題{i}について。" for i in range(50))
+        truncated = truncate_to_tokens(text, 60, "salient")
+        self.assertLessEqual(estimate_tokens(truncated), 60)
+        self.assertTrue(truncated.startswith("新型AIモデルが発表された。"))
+
+
+if __name__ == "__main__":
+    unittest.main()
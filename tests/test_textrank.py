@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抽出型要約（TextRank）のテスト
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.textrank import split_sentences, pagerank, textrank_summarize
+
+
+class TestTextRank(unittest.TestCase):
+    """TextRankのテストケース"""
+
+    def test_split_sentences(self):
+        """日本語と英語の文末で分割できるか"""
+        text = "今日は晴れ。明日は雨です！ Version 3.5 is out. Is it fast?\n改行の後"
+        self.assertEqual(
+            split_sentences(text),
+            ["今日は晴れ。", "明日は雨です！", "Version 3.5 is out.", "Is it fast?", "改行の後"],
+        )
+
+    def test_pagerank(self):
+        """PageRankのスコアが正規化され、多く参照されるノードが高くなるか"""
+        matrix = np.array([[0, 1, 0], [0, 0, 0], [0, 1, 0]], dtype=float)
+        scores = pagerank(matrix)
+        self.assertAlmostEqual(scores.sum(), 1.0, places=5)
+        self.assertEqual(int(np.argmax(scores)), 1)
+
+    def test_summarize_prefers_central_sentences(self):
+        """他の文と共通する内容の文を選び、元の順序で連結するか"""
+        text = (
+            "The weather was pleasant yesterday. "
+            "Apple launched a new phone with a fast chip. "
+            "Analysts say the new phone chip is fast. "
+            "The phone launch drew large crowds."
+        )
+        summary = textrank_summarize(text, 90)
+        self.assertLessEqual(len(summary), 90)
+        self.assertNotIn("weather", summary)
+        self.assertTrue(summary.startswith("Apple launched"))
+
+    def test_summarize_japanese(self):
+        """日本語の文を区切り文字なしで連結し、最大文字数を守るか"""
+        text = "新しいAIモデルが発表された。AIモデルの性能は従来より高い。昼食はカレーだった。AIモデルは来月公開される。"
+        summary = textrank_summarize(text, 40)
+        self.assertLessEqual(len(summary), 40)
+        self.assertNotIn(" ", summary)
+        self.assertNotIn("カレー", summary)
+        self.assertEqual(textrank_summarize("", 40), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI使用量の記録のテスト
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.backends import FakeGeminiBackend
+from ai.gemini_api import GeminiAPI
+from ai.usage import UsageRecorder, usage_context
+from rss.article_store import ArticleStore
+from tests.helpers import run_async
+
+
+class TestUsageRecorder(unittest.TestCase):
+    """AI使用量の記録のテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.patcher = patch.dict(os.environ, {}, clear=True)
+        self.patcher.start()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_records_tags_from_context(self):
+        """API呼び出しにフィードURL・タスク・モデル・キーを付けて記録するか"""
+        recorder = UsageRecorder()
+        backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0, output_tokens=50)
+        api = GeminiAPI(
+            api_keys=["key1"], model="gemini-2.0-flash", backend=backend, usage_recorder=recorder
+        )
+
+        async def run():
+            with usage_context(feed_url="https://example.com/feed1"):
+                await api.generate_text("prompt", latency_key="summary")
+            await api.generate_text("prompt")
+
+        run_async(run())
+        first, second = recorder.drain()
+        self.assertEqual(first["feed_url"], "https://example.com/feed1")
+        self.assertEqual(first["task"], "summary")
+        self.assertEqual(first["model"], "gemini-2.0-flash")
+        self.assertEqual(first["key_index"], 0)
+        self.assertEqual(first["retries"], 0)
+        self.assertGreater(first["input_tokens"], 0)
+        self.assertGreater(first["output_tokens"], 0)
+        self.assertTrue(first["success"])
+        self.assertEqual(second["feed_url"], "")
+        self.assertEqual(recorder.drain(), [])
+
+    def test_records_retries(self):
+        """レート制限で別のキーに再試行した回数と応答したキーを記録するか"""
+        recorder = UsageRecorder()
+        backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0, rate_limit_rate=0.5, retry_after=5)
+        # 1回目の試行だけレート制限エラーにする
+        draws = [0.0]
+        backend._random.random = lambda: draws.pop() if draws else 0.9
+        api = GeminiAPI(
+            api_keys=["key1", "key2"], model="gemini-2.0-flash", backend=backend, usage_recorder=recorder
+        )
+
+        run_async(api.generate_text("prompt"))
+        record = recorder.drain()[0]
+        self.assertEqual(record["retries"], 1)
+        answered = api.key_pool.states[record["key_index"]].api_key
+        self.assertEqual(backend.stats[answered]["rate_limited"], 0)
+
+    def test_records_embeddings_and_context_cache(self):
+        """埋め込みとコンテキストキャッシュの作成も呼び出しごとに記録するか"""
+        recorder = UsageRecorder()
+        backend = FakeGeminiBackend(latency_ms=1, latency_sigma=0)
+        api = GeminiAPI(
+            api_keys=["key1"], model="gemini-2.0-flash", backend=backend, usage_recorder=recorder
+        )
+
+        async def run():
+            with usage_context(feed_url="https://example.com/feed1"):
+                await api.embed_texts(["記事の本文", "別の記事"])
+            await api.create_cached_content("共通のコンテキスト" * 10, ttl_seconds=60)
+
+        run_async(run())
+        embedding, cache = recorder.drain()
+        self.assertEqual(embedding["task"], "embedding")
+        self.assertEqual(embedding["model"], "text-embedding-004")
+        self.assertEqual(embedding["feed_url"], "https://example.com/feed1")
+        self.assertGreater(embedding["input_tokens"], 0)
+        self.assertEqual(cache["task"], "context_cache")
+        self.assertEqual(cache["model"], "gemini-2.0-flash")
+        self.assertEqual(cache["key_index"], 0)
+
+    def test_split_between_feeds(self):
+        """複数フィードの記事をまとめた呼び出しのトークン数をフィードごとの記事数で按分するか"""
+        recorder = UsageRecorder()
+        with usage_context(feed_url=["a", "b", "a", "a", "a"], task="summary"):
+            recorder.record("models/gemini-2.0-flash", None, 101, 50, 1.0, retries=1)
+
+        records = recorder.drain()
+        self.assertEqual([r["feed_url"] for r in records], ["a", "b"])
+        # 4件と1件の記事なので4:1で按分し、割り切れない分は先頭のフィードに加える
+        self.assertEqual([r["input_tokens"] for r in records], [81, 20])
+        self.assertEqual([r["output_tokens"] for r in records], [40, 10])
+        self.assertEqual(sum(r["retries"] for r in records), 1)
+        self.assertEqual(records[0]["model"], "gemini-2.0-flash")
+
+    def test_flush_and_summarize_per_feed(self):
+        """記事ストアに書き込み、フィードごとにトークン数の多い順で集計するか"""
+        store = ArticleStore(os.path.join(self.temp_dir.name, "usage.db"))
+        recorder = UsageRecorder()
+        with usage_context(feed_url="feed1"):
+            recorder.record("gemini-2.0-flash", "summary", 100, 50, 1.0)
+            recorder.record("gemini-2.0-flash", "title", 10, 5, 0.5, success=False)
+        with usage_context(feed_url="feed2"):
+            recorder.record("gemini-2.5-flash", "summary", 1000, 500, 3.0, retries=2)
+
+        async def run():
+            written = await recorder.flush(store)
+            return written, await store.get_ai_usage_summary(days=7)
+
+        written, summary = run_async(run())
+        self.assertEqual(written, 3)
+        self.assertEqual([row["feed_url"] for row in summary], ["feed2", "feed1"])
+        feed1 = summary[1]
+        self.assertEqual(feed1["calls"], 2)
+        self.assertEqual(feed1["input_tokens"], 110)
+        self.assertEqual(feed1["output_tokens"], 55)
+        self.assertEqual(feed1["errors"], 1)
+        self.assertAlmostEqual(feed1["avg_latency"], 0.75)
+        self.assertEqual(feed1["tasks"], {"summary": 150, "title": 15})
+        self.assertEqual(summary[0]["retries"], 2)
+
+    def test_summarize_per_prompt_version(self):
+        """プロンプトのバージョンごとに、フィードに按分した記録を1回の呼び出しとして集計するか"""
+        store = ArticleStore(os.path.join(self.temp_dir.name, "usage.db"))
+        recorder = UsageRecorder()
+        with usage_context(feed_url=["feed1", "feed2"], prompt="summary_batch@1"):
+            recorder.record("gemini-2.0-flash", "summary", 200, 100, 2.0)
+        with usage_context(feed_url="feed1", prompt="summary@2"):
+            # 同じ時刻・同じレイテンシの別の呼び出しもまとめない
+            recorder.record("gemini-2.0-flash", "summary", 50, 20, 1.0)
+            recorder.record("gemini-2.0-flash", "summary", 50, 20, 1.0)
+        recorder.record("gemini-2.0-flash", "summary", 10, 10, 1.0)
+
+        async def run():
+            await recorder.flush(store)
+            return await store.get_ai_usage_by_prompt(days=7)
+
+        rows = {row["prompt"]: row for row in run_async(run())}
+        self.assertEqual(set(rows), {"summary_batch@1", "summary@2"})
+        self.assertEqual(rows["summary_batch@1"]["calls"], 1)
+        self.assertEqual(rows["summary_batch@1"]["avg_input_tokens"], 200)
+        self.assertEqual(rows["summary@2"]["calls"], 2)
+        self.assertEqual(rows["summary@2"]["avg_output_tokens"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ベクトル索引と埋め込みのテスト
+"""
+
+import os
+import sys
+import unittest
+import tempfile
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# テスト対象のモジュールをインポート
+from ai.embeddings import HashingEmbedder
+from rss.vector_index import VectorIndex
+from rss.article_store import ArticleStore
+from tests.helpers import run_async
+
+
+class TestVectorIndex(unittest.TestCase):
+    """ベクトル索引のテストケース"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.embedder = HashingEmbedder(256)
+        self.index = VectorIndex(os.path.join(self.temp_dir.name, "vectors"), self.embedder.name)
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        self.temp_dir.cleanup()
+
+    def embed(self, texts):
+        return run_async(self.embedder.embed(texts))
+
+    def test_hashing_embedder_is_deterministic(self):
+        """同じテキストから同じ正規化済みベクトルを計算するか"""
+        first = self.embed(["新型スマートフォンの発表", "Apple releases a new phone"])
+        second = run_async(HashingEmbedder(256).embed(["新型スマートフォンの発表", "Apple releases a new phone"]))
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+        self.assertEqual(first.dtype, np.float32)
+
+    def test_search_ranks_by_similarity(self):
+        """類似度の高い順に返し、除外したIDを含めないか"""
+        texts = ["新型スマートフォンの発表", "スマートフォンの価格改定", "株式市場の動向"]
+        self.index.add("channel1", ["1", "2"], self.embed(texts[:2]))
+        self.index.add("channel2", ["3"], self.embed(texts[2:]))
+        query = self.embed(["スマートフォンの新型モデル"])[0]
+
+        hits = self.index.search(query, k=3)
+        self.assertEqual([mid for mid, _ in hits][:2], ["1", "2"])
+        hits = self.index.search(query, k=3, exclude=["1"])
+        self.assertNotIn("1", [mid for mid, _ in hits])
+        self.assertEqual(self.index.indexed_ids(), {"1", "2", "3"})
+
+    def test_search_within_channel_and_score_floor(self):
+        """指定したチャンネルのシャードだけを検索し、類似度が下限未満の記事を返さないか"""
+        self.index.add("channel1", ["1", "2"], self.embed(["新型スマートフォンの発表", "株式市場の動向"]))
+        self.index.add("channel2", ["3"], self.embed(["スマートフォンの新型モデル"]))
+        query = self.embed(["スマートフォンの新型モデル"])[0]
+
+        hits = self.index.search(query, k=3, channel_id="channel1")
+        self.assertEqual(sorted(mid for mid, _ in hits), ["1", "2"])
+        hits = self.index.search(query, k=3, channel_id="channel1", min_score=0.2)
+        self.assertEqual([mid for mid, _ in hits], ["1"])
+        self.assertEqual(self.index.search(query, k=3, channel_id="unknown"), [])
+
+    def test_add_replaces_and_trims(self):
+        """同じIDは置き換え、上限を超えた古いベクトルを削除するか"""
+        self.index.add("channel1", ["1", "2"], self.embed(["a記事", "b記事"]))
+        self.index.add("channel1", ["2", "3"], self.embed(["b記事", "c記事"]), limit=2)
+        self.assertEqual(self.index.indexed_ids(), {"2", "3"})
+
+    def test_ignores_other_embedder_shards(self):
+        """別の埋め込み方法で作られたシャードを検索対象にしないか"""
+        self.index.add("channel1", ["1"], self.embed(["新型スマートフォン"]))
+        other = VectorIndex(self.index.base_dir, "gemini:models/text-embedding-004")
+        self.assertEqual(other.indexed_ids(), set())
+        self.assertEqual(other.search(self.embed(["新型スマートフォン"])[0]), [])
+
+    def test_article_store_finds_similar_articles(self):
+        """記事ストアが埋め込みベクトルで関連記事を検索するか"""
+        store = ArticleStore(os.path.join(self.temp_dir.name, "articles.db"), self.index)
+        articles = [
+            ("1", {"title": "新型スマートフォン発表", "content": "カメラ性能が向上"}),
+            ("2", {"title": "スマートフォン値下げ", "content": "価格改定"}),
+            ("3", {"title": "株式市場", "content": "日経平均が上昇"}),
+        ]
+        vectors = self.embed([f"{a['title']}\n{a['content']}" for _, a in articles])
+
+        async def run():
+            for (message_id, article), vector in zip(articles, vectors):
+                await store.add_full_article(message_id, "channel1", article, "", embedding=vector)
+            query = (await self.embedder.embed(["スマートフォン"]))[0]
+            return await store.find_related_articles([], "1", limit=1, embedding=query)
+
+        related = run_async(run())
+        self.assertEqual([row["message_id"] for row in related], ["2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
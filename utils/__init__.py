@@ -9,6 +9,7 @@
 
 from .logger import setup_logger
 from .scheduler import setup_scheduler
+from .rate_limit import TokenBucket
 from .helpers import (
     generate_article_id,
     parse_datetime,
@@ -19,6 +20,7 @@ from .helpers import (
 __all__ = [
     "setup_logger",
     "setup_scheduler",
+    "TokenBucket",
     "generate_article_id",
     "parse_datetime",
     "clean_html",
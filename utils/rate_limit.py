@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+レート制限ユーティリティ
+
+トークンバケットによるレート制限を提供する
+"""
+
+import time
+from typing import Callable
+
+class TokenBucket:
+    """トークンバケット
+
+    容量capacityまでトークンを蓄え、毎秒refill_rateずつ補充する。
+    consumeは残量が足りなくても消費でき（残量は負になる）、事後に判明した
+    実使用量との差分を反映するのに使う。
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, clock: Callable[[], float] = time.monotonic):
+        """
+        初期化
+
+        Args:
+            capacity: バケットの容量
+            refill_rate: 1秒あたりの補充量
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        """経過時間に応じてトークンを補充する"""
+        now = self.clock()
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        """現在のトークン残量を取得する"""
+        self._refill()
+        return self.tokens
+
+    def fill_ratio(self) -> float:
+        """容量に対する残量の割合（0〜1）を取得する"""
+        if self.capacity <= 0:
+            return 0.0
+        return max(0.0, self.available() / self.capacity)
+
+    def try_consume(self, amount: float = 1.0) -> bool:
+        """
+        トークンが足りる場合のみ消費する
+
+        Returns:
+            消費できた場合はTrue
+        """
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def consume(self, amount: float) -> None:
+        """残量に関係なくトークンを消費する（負の値で返却）"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def time_until(self, amount: float = 1.0) -> float:
+        """
+        指定量のトークンが溜まるまでの秒数を取得する
+
+        Returns:
+            待機秒数（容量を超える量の場合は満タンになるまでの秒数）
+        """
+        amount = min(amount, self.capacity)
+        shortage = amount - self.available()
+        if shortage <= 0:
+            return 0.0
+        if self.refill_rate <= 0:
+            return float("inf")
+        return shortage / self.refill_rate